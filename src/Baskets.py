@@ -0,0 +1,124 @@
+""" Valuation of baskets and portfolios of products. """
+
+from math import lcm
+
+from Solution1.Pricing import Price
+
+_INT64_MAX = 2 ** 63 - 1
+
+
+def value_basket(knowledge_base, quantities) -> Price:
+    """
+    Calculates the exact total price of a basket as dot product of the quantities and the product prices.
+    :param knowledge_base: Product prices by product name.
+    :param quantities: Iterable of (quantity, product) pairs.
+    :return: Total price in coins.
+    :raises KeyError: If a product is unknown.
+    """
+    numerator, denominator = 0, 1
+    for quantity, product in quantities:
+        price = knowledge_base[product]
+        # sum of fractions over the least common denominator
+        common = lcm(denominator, price.denominator)
+        numerator = numerator * (common // denominator) + quantity * price.numerator * (common // price.denominator)
+        denominator = common
+    return Price(numerator, denominator)
+
+
+class PriceVector:
+    """
+    Vectors of all product prices, indexed by product id (the position in the knowledge base): the reduced numerators
+    as int64 array and the group of every product, the position of its denominator in the sorted array of all
+    distinct denominators. The items of a portfolio are summed per group with integer arithmetic and only these few
+    sums are added as fractions, since one common denominator of all prices would overflow int64 with a few dozen
+    different denominators. Requires NumPy.
+    """
+
+    def __init__(self, knowledge_base):
+        """
+        :param knowledge_base: Product prices by product name.
+        """
+        import numpy as np
+
+        self.ids = {product: index for index, product in enumerate(knowledge_base)}
+        prices = list(knowledge_base.values())
+        numerators = [price.numerator for price in prices]
+        denominators = [price.denominator for price in prices]
+        self.max_numerator = max(map(abs, numerators), default=0)
+        # prices which do not fit into int64 are calculated with Python integers (slow, but exact)
+        dtype = np.int64 if self.max_numerator <= _INT64_MAX and max(denominators, default=1) <= _INT64_MAX \
+            else object
+        self.numerators = np.array(numerators, dtype=dtype)
+        self.denominators, self.groups = np.unique(np.array(denominators, dtype=dtype), return_inverse=True)
+
+    def value(self, lengths, product_ids, quantities):
+        """
+        Values many portfolios at once without creating an object per item.
+        :param lengths: Int64 array with the number of items of every portfolio.
+        :param product_ids: Int64 array with the product id of every item, the items of one portfolio after another.
+        :param quantities: Int64 array with the quantity of every item.
+        :return: Tuple of arrays with the reduced numerator and denominator of the total price of every portfolio.
+        """
+        import numpy as np
+
+        numerators, groups, denominators = self.numerators, self.groups, self.denominators
+        if len(numerators) == 0:
+            # no products, all items are invalid
+            numerators, groups, denominators = np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64), \
+                np.ones(1, dtype=np.int64)
+        elif numerators.dtype != object and int(np.abs(quantities).sum()) * self.max_numerator > _INT64_MAX:
+            # the sums would overflow int64, so they are calculated with Python integers
+            numerators = numerators.astype(object)
+            quantities = quantities.astype(object)
+
+        # the items are sorted by portfolio and group, every run of equal keys is summed into one fraction
+        keys = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths) * len(denominators) + groups[product_ids]
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])) if len(keys) else keys
+        sums = np.add.reduceat(quantities[order] * numerators[product_ids[order]], starts) if len(keys) \
+            else np.zeros(0, dtype=np.int64)
+        portfolios, sum_denominators = keys[starts] // len(denominators), denominators[keys[starts] % len(denominators)]
+
+        totals = np.zeros(len(lengths), dtype=sums.dtype)
+        total_denominators = np.ones(len(lengths), dtype=sum_denominators.dtype)
+        # the k-th sums of all portfolios are added at once, a portfolio has at most one sum per group
+        firsts = np.flatnonzero(np.concatenate([[True], portfolios[1:] != portfolios[:-1]])) if len(keys) else starts
+        ranks = np.arange(len(portfolios)) - np.repeat(firsts, np.diff(np.append(firsts, len(portfolios))))
+        for rank in range(int(ranks.max()) + 1 if len(ranks) else 0):
+            selected = ranks == rank
+            indexes = portfolios[selected]
+            totals, total_denominators = _add_fractions(totals, total_denominators, indexes, sums[selected],
+                                                        sum_denominators[selected])
+        return totals, total_denominators
+
+
+def _add_fractions(numerators, denominators, indexes, other_numerators, other_denominators):
+    """
+    Adds fractions to the ones at the given indexes and reduces them. Falls back to Python integers if int64 could
+    overflow.
+    :return: Tuple of the numerator and denominator arrays.
+    """
+    import numpy as np
+
+    arrays = (numerators, denominators, other_numerators, other_denominators)
+    if any(array.dtype == object for array in arrays):
+        numerators, denominators, other_numerators, other_denominators = (array.astype(object) for array in arrays)
+    else:
+        numerators, denominators = numerators.copy(), denominators.copy()
+    numerator, denominator = numerators[indexes], denominators[indexes]
+    divisor = np.gcd(denominator, other_denominators)
+    factor, other_factor = other_denominators // divisor, denominator // divisor
+    if numerators.dtype != object:
+        # bound of the new numerator and denominator, calculated with floats
+        bound = max((np.abs(numerator) * factor.astype(float) + np.abs(other_numerators) * other_factor.astype(float)
+                     ).max(initial=0), (denominator * factor.astype(float)).max(initial=0))
+        if bound > _INT64_MAX // 2:
+            return _add_fractions(numerators.astype(object), denominators, indexes, other_numerators,
+                                  other_denominators)
+    numerator = numerator * factor + other_numerators * other_factor
+    denominator = denominator * factor
+    divisor = np.gcd(numerator, denominator)
+    numerators[indexes] = numerator // divisor
+    denominators[indexes] = denominator // divisor
+    return numerators, denominators
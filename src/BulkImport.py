@@ -0,0 +1,79 @@
+""" Quiet bulk import of foreign numbers and product prices from CSV / JSONL streams. """
+
+ENTRY_TYPES = ("foreign_number", "product")
+
+
+class BulkLoadSummary:
+    """Counts of a bulk load and a few samples of every outcome."""
+
+    def __init__(self, max_samples: int = 5):
+        self.max_samples = max_samples
+        self.counts = {"added": 0, "overwritten": 0, "duplicate": 0, "rejected": 0}
+        self.samples = {outcome: [] for outcome in self.counts}
+
+    def count(self, outcome: str, sample: str):
+        self.counts[outcome] += 1
+        if len(self.samples[outcome]) < self.max_samples:
+            self.samples[outcome].append(sample)
+
+    def __str__(self):
+        lines = [", ".join(f"{count} {outcome}" for outcome, count in self.counts.items())]
+        for outcome in ("overwritten", "duplicate", "rejected"):
+            if self.samples[outcome]:
+                lines.append(f"  {outcome}: {'; '.join(self.samples[outcome])}")
+        return "\n".join(lines)
+
+
+def read_csv_entries(stream):
+    """
+    Streams entries from CSV rows "type,name,value". A header row with these column names is skipped.
+    :param stream: Text stream of the CSV file.
+    :return: Generator over (type, name, value) tuples.
+    """
+    import csv
+
+    for row in csv.reader(stream):
+        if not row or row == ["type", "name", "value"]:
+            continue
+        if len(row) != 3:
+            yield None, ",".join(row), None
+            continue
+        yield row[0].strip(), row[1].strip(), row[2].strip()
+
+
+def read_jsonl_entries(stream):
+    """
+    Streams entries from JSON lines like {"type": "product", "name": "Silver", "value": 17}.
+    :param stream: Text stream of the JSONL file.
+    :return: Generator over (type, name, value) tuples.
+    """
+    import json
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            yield entry["type"], entry["name"], entry["value"]
+        except (ValueError, KeyError, TypeError):
+            yield None, line.strip(), None
+
+
+def import_file(translator, path: str, batch_size: int = 10000) -> BulkLoadSummary:
+    """
+    Streams all entries of a CSV or JSONL file (by its extension) into the translator.
+    :param translator: Translator instance receiving the entries.
+    :param path: Path of a .csv, .jsonl or .ndjson file.
+    :param batch_size: Number of entries inserted at once.
+    :return: Summary of the import.
+    :raises ValueError: If the file type is not supported.
+    """
+    if path.lower().endswith(".csv"):
+        reader = read_csv_entries
+    elif path.lower().endswith((".jsonl", ".ndjson")):
+        reader = read_jsonl_entries
+    else:
+        raise ValueError("Only .csv and .jsonl files can be imported")
+
+    with open(path, "r", newline="") as stream:
+        return translator.bulk_load(reader(stream), batch_size=batch_size)
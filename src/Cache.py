@@ -0,0 +1,107 @@
+""" Bounded caches for the translator application. """
+
+from collections import OrderedDict
+# the lock of the threading module, without importing threading at startup
+from _thread import allocate_lock
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded least-recently-used cache with hit, miss and eviction counters."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for the key and marks it as recently used.
+        :param key: Hashable cache key.
+        :param default: Value returned if the key is not cached.
+        :return: The cached value or the default value.
+        """
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores a value and evicts the least recently used entry if the cache is full.
+        :param key: Hashable cache key.
+        :param value: Value to be cached.
+        """
+        if self.max_size <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Removes all entries. The counters are kept."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+class ResponseCache:
+    """
+    Bounded cache of the printed answers of question lines. All answers belong to one generation of the translator's
+    knowledge (see Translator.generation) and are dropped as soon as the knowledge changed. It can be used by many
+    threads, e.g. the ones of a ConcurrentTranslator.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.entries = LRUCache(max_size)
+        self.generation = None
+        self._lock = allocate_lock()
+
+    def get(self, line: str, generation: int):
+        """
+        :param line: Normalized input line.
+        :param generation: Current generation of the knowledge.
+        :return: The cached answer or None.
+        """
+        with self._lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+                return None
+            return self.entries.get(line)
+
+    def put(self, line: str, answer: str, generation: int):
+        """
+        Stores an answer, if it belongs to the current generation.
+        :param line: Normalized input line.
+        :param answer: Everything printed for the line.
+        :param generation: Generation of the knowledge the answer was calculated with.
+        """
+        with self._lock:
+            if generation == self.generation:
+                self.entries.put(line, answer)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.entries.stats(), generation=self.generation)
@@ -1,7 +1,11 @@
 """ Command handlers for the translator application."""
 
+import sys
 from abc import ABC, abstractmethod
 
+from Solution1.BulkImport import import_file
+from Solution1.Listing import write_entries
+from Solution1.Metrics import METRICS
 from Solution1.Translator import Translator
 
 
@@ -27,8 +31,26 @@ class LoadCommand(CommandHandlerInterface):
     def handle(self, inputs, translator):
         print("Loading knowledge from file...")
         translator.load_data()
-        print("Product knowledge: ", translator.get_knowledge_base())
-        print("Foreign numbers: ", translator.get_foreign_numbers())
+        print(f"Loaded {len(translator.get_knowledge_base())} product prices, "
+              f"{len(translator.get_foreign_numbers())} foreign numbers and "
+              f"{len(translator.currencies.rates)} exchange rates")
+
+
+class ImportCommand(CommandHandlerInterface):
+    """Command to bulk import foreign numbers and product prices from a CSV or JSONL file."""
+
+    def handle(self, inputs, translator):
+        import csv
+
+        if len(inputs) < 2:
+            print("Specify the file to import: import <file.csv | file.jsonl>")
+            return
+        try:
+            summary = import_file(translator, inputs[1])
+        except (OSError, ValueError, csv.Error) as e:
+            print(f"Import failed: {e}")
+            return
+        print(f"Imported {inputs[1]}: {summary}")
 
 
 class ExitCommand(CommandHandlerInterface):
@@ -40,19 +62,88 @@ class ExitCommand(CommandHandlerInterface):
 
 
 class PrintCommand(CommandHandlerInterface):
-    """Command to print the current knowledge base or foreign numbers."""
+    """
+    Command to print the current knowledge base or foreign numbers. The entries are printed one page at a time in the
+    order of their names, optionally filtered by a prefix or a glob pattern, or streamed into a file.
+    """
+
+    PAGE_SIZE = 50
+    USAGE = "print <knowledge_base> | <foreign_numbers> [prefix <text>] [pattern <glob>] [page <n> | all] " \
+            "[size <n>] [> <file>]"
 
     def handle(self, inputs, translator):
         if len(inputs) < 2:
             print("Specify what to print: <knowledge_base> or <foreign_numbers>")
             return
         arg = inputs[1].lower()
+        # the names and the entries are read from the same knowledge, e.g. one snapshot of a ConcurrentTranslator
+        translator = translator.reader()
         if arg == "knowledge_base":
-            print(translator.get_knowledge_base())
+            operation, dictionary = "knowledge_base", translator.get_knowledge_base()
         elif arg == "foreign_numbers":
-            print(translator.get_foreign_numbers())
+            operation, dictionary = "foreign_number", translator.get_foreign_numbers()
         else:
             print("Only <knowledge_base> or <foreign_numbers> are valid inputs")
+            return
+        try:
+            options = self.parse_options(inputs[2:])
+        except ValueError:
+            print(f"Usage: {self.USAGE}")
+            return
+
+        page, size = options["page"], options["size"]
+        count, names = translator.get_name_index(operation).select(
+            options["prefix"], options["pattern"], *((0, None) if page is None else ((page - 1) * size, size)))
+
+        if options["file"] is not None:
+            try:
+                with open(options["file"], "w") as f:
+                    written = write_entries(f, dictionary, names)
+            except OSError as e:
+                print(f"Print failed: {e}")
+                return
+            print(f"Wrote {written} of {count} entries to {options['file']}")
+            return
+        written = write_entries(sys.stdout, dictionary, names)
+        if count == 0:
+            print("No entries")
+        elif page is not None and count > size:
+            pages = (count + size - 1) // size
+            print(f"Page {page} of {pages} ({written} of {count} entries)")
+
+    def parse_options(self, inputs: list[str]) -> dict:
+        """
+        Parses the options after the printed dictionary.
+        :param inputs: Input list of strings, e.g. ["prefix", "Si", "page", "2"].
+        :return: Dictionary of the prefix, pattern, page, page size and file. The page is None for all entries, which
+            is the default for a file; the terminal gets the first page by default.
+        :raises ValueError: If an option is unknown or has an invalid value.
+        """
+        options = {"prefix": "", "pattern": None, "page": None, "size": self.PAGE_SIZE, "file": None}
+        page = None
+        if len(inputs) % 2:
+            raise ValueError("every option needs a value")
+        for name, value in zip(inputs[::2], inputs[1::2]):
+            name = name.lower()
+            if name in ("prefix", "pattern"):
+                options[name] = value
+            elif name == ">":
+                options["file"] = value
+            elif name == "page":
+                page = value.lower()
+            elif name == "size":
+                options["size"] = int(value)
+                if options["size"] < 1:
+                    raise ValueError("the page size must be positive")
+            else:
+                raise ValueError(f"unknown option {name}")
+        if page is not None and page != "all":
+            options["page"] = int(page)
+            if options["page"] < 1:
+                raise ValueError("the page must be positive")
+        elif page is None and options["file"] is None:
+            options["page"] = 1
+        return options
 
 
 class ClearCommand(CommandHandlerInterface):
@@ -61,6 +152,7 @@ class ClearCommand(CommandHandlerInterface):
     def handle(self, inputs, translator):
         translator.clear_foreign_numbers()
         translator.clear_knowledge_base()
+        translator.clear_exchange_rates()
         print("Cleared runtime knowledge...")
 
 
@@ -72,6 +164,37 @@ class ResetCommand(CommandHandlerInterface):
         print("Reset backed knowledge...")
 
 
+class StatsCommand(CommandHandlerInterface):
+    """Command to show, export or control the handler metrics."""
+
+    def handle(self, inputs, translator):
+        arg = inputs[1].lower() if len(inputs) > 1 else "show"
+        if arg == "show":
+            print(METRICS.snapshot())
+        elif arg in ("on", "off"):
+            METRICS.enabled = arg == "on"
+            print(f"Metrics {'enabled' if METRICS.enabled else 'disabled'}")
+        elif arg == "reset":
+            METRICS.reset()
+            print("Metrics reset")
+        elif arg == "export" and len(inputs) > 2:
+            try:
+                with open(inputs[2], "w") as f:
+                    f.write(METRICS.snapshot() + "\n")
+            except OSError as e:
+                print(f"Export failed: {e}")
+                return
+            print(f"Metrics exported to {inputs[2]}")
+        elif arg == "profile" and len(inputs) > 2 and inputs[2].lower() == "start":
+            METRICS.start_profile()
+            print("Profiling started")
+        elif arg == "profile" and len(inputs) > 2 and inputs[2].lower() == "stop":
+            print(METRICS.stop_profile(inputs[3] if len(inputs) > 3 else None))
+        else:
+            print("Only stats [on | off | reset | export <file> | profile start | profile stop [<file>]] "
+                  "are valid inputs")
+
+
 class HelpCommand(CommandHandlerInterface):
     """Command to print the help message."""
 
@@ -79,10 +202,16 @@ class HelpCommand(CommandHandlerInterface):
         print("\nAvailable Commands:\n"
               "  save      - Saves current knowledge to file\n"
               "  load      - Load backed knowledge from file\n"
+              "  import <file.csv | file.jsonl>\n"
+              "            - Imports foreign numbers and product prices (rows: type,name,value)\n"
               "  clear     - Deletes all currently known (runtime) knowledge\n"
               "  reset     - Resets the backed (saved) knowledge\n"
-              "  print <knowledge_base> | <foreign_numbers>\n"
-              "            - Prints either all known product prices or foreign-roman translations\n"
+              "  print <knowledge_base> | <foreign_numbers> [prefix <text>] [pattern <glob>] [page <n> | all]\n"
+              "        [size <n>] [> <file>]\n"
+              "            - Prints one page of the known product prices or foreign-roman translations, sorted by\n"
+              "              name and optionally filtered, or writes them into a file\n"
+              "  stats [on | off | reset | export <file> | profile start | profile stop [<file>]]\n"
+              "            - Shows, exports or controls the handler metrics and a cProfile capture\n"
               "  help      - Prints this help message\n"
               "  exit      - Exits the program\n"
               "\n"
@@ -94,7 +223,15 @@ class HelpCommand(CommandHandlerInterface):
               "following syntax: <foreign_number> is <roman_number>.\n"
               "- You can also define product prices with the syntax: <foreign numbers seperated with spaces> is <coin_value> coins\n"
               "- You can then ask for the price of a product with the syntax: how many coins is <foreign numbers seperated with spaces> <product_name> ?\n"
+              "- You can ask for the price of several products at once by joining them with \"and\":\n"
+              "    how many coins is <foreign numbers> <product_name> and <foreign numbers> <product_name> ?\n"
               "- You can also ask for the roman value of a foreign number with the syntax: how much is <foreign numbers seperated with spaces> ?\n"
+              "- You can ask how to write a number with foreign numbers with the syntax: how do you say <number> ?\n"
+              "- You can define exchange rates between units with the syntax: <number> <unit> is <number> <unit>\n"
+              "    e.g. 1 credit is 3 coins. Then ask: how many <unit> is <number> <unit> ? or\n"
+              "    how many <unit> is <foreign numbers seperated with spaces> <product_name> ?\n"
+              "- With --price-history you can ask for old prices with the syntax:\n"
+              "    how many coins was <foreign numbers seperated with spaces> <product_name> at <entry> ?\n"
               "\n"
               "Note:\n"
               "- Invalid input (wrong syntax, unknown words, or undefined products) will result in:\n"
@@ -0,0 +1,152 @@
+""" Compact storage of product prices for very large knowledge bases. """
+
+from array import array
+from collections.abc import MutableMapping
+
+from Solution1.Pricing import Price
+
+_EMPTY = -1
+_DELETED = -2
+
+
+class CompactKnowledgeBase(MutableMapping):
+    """
+    Product prices by product name, stored without any Python object per product except its name. Every product gets
+    an integer id (its position in the name list), the reduced prices are kept in two int64 arrays (numerators and
+    denominators) indexed by the id, and the ids are found through an open addressing hash table in an int64 array.
+    Prices not fitting into int64 are kept as Price objects. Behaves like a dict of product names to Price, including
+    the insertion order.
+    """
+
+    __slots__ = ("_names", "_numerators", "_denominators", "_slots", "_large", "_size", "_used_slots")
+
+    def __init__(self, entries=()):
+        """
+        :param entries: Mapping or iterable of (product, price) pairs, see Price.from_value for the prices.
+        """
+        self._names = []
+        self._numerators = array("q")
+        self._denominators = array("q")
+        self._slots = array("q", [_EMPTY]) * 8
+        # prices beyond int64 by id, their denominator in the array is 0
+        self._large = {}
+        self._size = 0
+        # slots which are not empty, including the ones of deleted products
+        self._used_slots = 0
+        self.update(entries)
+
+    def _find(self, product: str):
+        """
+        Looks up the slot of a product with linear probing.
+        :return: Tuple of the id of the product (-1 if it is missing) and the slot where it is or can be inserted.
+        """
+        slots = self._slots
+        names = self._names
+        mask = len(slots) - 1
+        slot = hash(product) & mask
+        free_slot = -1
+        while True:
+            index = slots[slot]
+            if index == _EMPTY:
+                return -1, slot if free_slot < 0 else free_slot
+            if index == _DELETED:
+                if free_slot < 0:
+                    free_slot = slot
+            elif names[index] == product:
+                return index, slot
+            slot = (slot + 1) & mask
+
+    def _rebuild(self):
+        """Drops deleted products and rebuilds the hash table with a load factor of at most 1/4."""
+        if self._size < len(self._names):
+            keep = [index for index, name in enumerate(self._names) if name is not None]
+            self._large = {position: self._large[index] for position, index in enumerate(keep)
+                           if index in self._large}
+            self._names = [self._names[index] for index in keep]
+            self._numerators = array("q", (self._numerators[index] for index in keep))
+            self._denominators = array("q", (self._denominators[index] for index in keep))
+
+        capacity = 8
+        while capacity < 4 * self._size:
+            capacity *= 2
+        slots = array("q", [_EMPTY]) * capacity
+        mask = capacity - 1
+        for index, name in enumerate(self._names):
+            slot = hash(name) & mask
+            while slots[slot] != _EMPTY:
+                slot = (slot + 1) & mask
+            slots[slot] = index
+        self._slots = slots
+        self._used_slots = self._size
+
+    def __getitem__(self, product: str) -> Price:
+        index = self._find(product)[0]
+        if index < 0:
+            raise KeyError(product)
+        denominator = self._denominators[index]
+        if denominator == 0:
+            return self._large[index]
+        return Price.from_reduced(self._numerators[index], denominator)
+
+    def __setitem__(self, product: str, price):
+        price = Price.from_value(price)
+        index, slot = self._find(product)
+        if index < 0:
+            index = len(self._names)
+            self._names.append(product)
+            self._numerators.append(0)
+            self._denominators.append(0)
+            if self._slots[slot] == _EMPTY:
+                self._used_slots += 1
+            self._slots[slot] = index
+            self._size += 1
+        else:
+            self._large.pop(index, None)
+
+        try:
+            self._numerators[index] = price.numerator
+            self._denominators[index] = price.denominator
+        except OverflowError:
+            self._numerators[index] = 0
+            self._denominators[index] = 0
+            self._large[index] = price
+
+        # rebuild when the table is half full or when mostly deleted products are left in the name list
+        if 2 * self._used_slots > len(self._slots) or len(self._names) > 2 * self._size + 8:
+            self._rebuild()
+
+    def __delitem__(self, product: str):
+        index, slot = self._find(product)
+        if index < 0:
+            raise KeyError(product)
+        self._slots[slot] = _DELETED
+        self._names[index] = None
+        self._large.pop(index, None)
+        self._size -= 1
+
+    def __iter__(self):
+        return (name for name in self._names if name is not None)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, product):
+        return self._find(product)[0] >= 0
+
+    def copy(self) -> "CompactKnowledgeBase":
+        """Returns a copy, made by copying the arrays instead of inserting every product again."""
+        other = CompactKnowledgeBase.__new__(CompactKnowledgeBase)
+        other._names = self._names.copy()
+        other._numerators = array("q", self._numerators)
+        other._denominators = array("q", self._denominators)
+        other._slots = array("q", self._slots)
+        other._large = self._large.copy()
+        other._size = self._size
+        other._used_slots = self._used_slots
+        return other
+
+    def __reduce__(self):
+        return CompactKnowledgeBase, (dict(self.items()),)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
@@ -0,0 +1,293 @@
+""" Thread-safe Translator for threaded services, with lock-free readers (read-copy-update). """
+
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from Solution1.Baskets import value_basket
+from Solution1.Currencies import CurrencyGraph
+from Solution1.Numerals import NumeralTable
+from Solution1.Pricing import Price
+from Solution1.Translator import Translator
+
+
+class LayeredKnowledgeBase(Mapping):
+    """
+    Read-only knowledge base of a snapshot: a copy of the writer's knowledge base (of the same storage type, e.g. a
+    CompactKnowledgeBase) and the prices changed after the copy in a few dicts on top of it, the newest last. A new
+    snapshot shares the copy and the older layers and only merges the newest ones (like a binary counter), so
+    publishing a change takes amortized O(log n) instead of copying the whole knowledge base.
+    """
+
+    __slots__ = ("base", "layers", "_size")
+
+    def __init__(self, base, layers: tuple, size: int):
+        """
+        :param base: Copy of the knowledge base, which is not changed anymore.
+        :param layers: Tuple of dicts of the changed prices by product name, the newest last.
+        :param size: Number of products.
+        """
+        self.base = base
+        self.layers = layers
+        self._size = size
+
+    def __getitem__(self, product: str) -> Price:
+        for layer in reversed(self.layers):
+            price = layer.get(product)
+            if price is not None:
+                return price
+        return self.base[product]
+
+    def __contains__(self, product) -> bool:
+        return any(product in layer for layer in self.layers) or product in self.base
+
+    def __iter__(self):
+        yield from self.base
+        base = self.base
+        yield from {product: None for layer in self.layers for product in layer if product not in base}
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class KnowledgeSnapshot:
+    """
+    Knowledge of a ConcurrentTranslator at one point in time. A snapshot is never changed after it was published, so
+    any number of threads can read it without locks, and all reads of one snapshot see the same knowledge.
+    """
+
+    __slots__ = ("knowledge_base", "foreign_numbers", "numeral_table", "currencies", "generation", "_name_indexes")
+
+    def __init__(self, knowledge_base: dict, foreign_numbers: dict, numeral_table: NumeralTable,
+                 currencies: CurrencyGraph, generation: int):
+        self.knowledge_base = knowledge_base
+        self.foreign_numbers = foreign_numbers
+        self.numeral_table = numeral_table
+        # every unit points to its root, so conversions do not compress paths (see CurrencyGraph.compressed_copy)
+        self.currencies = currencies
+        self.generation = generation
+        # Listing.SortedNameIndex by operation, built on first use
+        self._name_indexes = {}
+
+    def calc_foreign_numbers(self, values: list[str]) -> int:
+        return self.numeral_table.calculate(values)
+
+    def evaluate_foreign_numbers(self, values: list[str]) -> int:
+        return self.numeral_table.evaluate(values)
+
+    def int_to_foreign(self, number: int) -> str:
+        return self.numeral_table.encode(number)
+
+    def get_product_price(self, product: str) -> Price:
+        return self.knowledge_base[product]
+
+    def get_product_price_in(self, product: str, unit: str) -> Price:
+        return self.currencies.convert(self.knowledge_base[product], "coins", unit)
+
+    def convert(self, amount, unit: str, other_unit: str) -> Price:
+        return self.currencies.convert(Price.from_value(amount), unit, other_unit)
+
+    def value_basket(self, items) -> Price:
+        return value_basket(self.knowledge_base, (
+            (self.numeral_table.evaluate(numerals.split() if isinstance(numerals, str) else numerals), product)
+            for numerals, product in items))
+
+    def get_knowledge_base(self) -> dict:
+        return self.knowledge_base
+
+    def get_foreign_numbers(self) -> dict:
+        return self.foreign_numbers
+
+    def get_name_index(self, operation: str):
+        """
+        Returns the sorted names of the products or foreign numbers of this snapshot, see Translator.get_name_index.
+        """
+        index = self._name_indexes.get(operation)
+        if index is None:
+            from Solution1.Listing import SortedNameIndex
+
+            index = SortedNameIndex(self.knowledge_base if operation == "knowledge_base" else self.foreign_numbers)
+            self._name_indexes[operation] = index
+        return index
+
+
+class PinnedTranslator:
+    """
+    View of a ConcurrentTranslator whose lock-free reads all use one snapshot, so e.g. a handler evaluating the
+    foreign numbers and then reading the price of a product sees the knowledge of one point in time. All other
+    methods are the ones of the ConcurrentTranslator.
+    """
+
+    __slots__ = ("_translator", "snapshot")
+
+    def __init__(self, translator: "ConcurrentTranslator", snapshot: KnowledgeSnapshot):
+        self._translator = translator
+        self.snapshot = snapshot
+
+    def __getattr__(self, name: str):
+        if name in _SNAPSHOT_READS:
+            return getattr(self.snapshot, name)
+        return getattr(self._translator, name)
+
+    @property
+    def generation(self) -> int:
+        return self.snapshot.generation
+
+    def reader(self) -> "PinnedTranslator":
+        return self
+
+
+# methods answered by KnowledgeSnapshot
+_SNAPSHOT_READS = {"calc_foreign_numbers", "evaluate_foreign_numbers", "int_to_foreign", "get_product_price",
+                   "get_product_price_in", "convert", "value_basket", "get_knowledge_base", "get_foreign_numbers",
+                   "get_name_index"}
+
+
+class ConcurrentTranslator:
+    """
+    Translator shared by many threads. Readers use the current KnowledgeSnapshot and never wait: they read one
+    attribute, which is replaced atomically. Writers are serialized by a lock, change a private Translator and publish
+    a new snapshot when they are done, so a reader sees either all or nothing of a change (e.g. of a load_data).
+    Publishing a change takes amortized O(log n) (see LayeredKnowledgeBase), but every publish builds a new snapshot,
+    so many changes should be made in one batch:
+
+        with concurrent_translator.batch() as translator:
+            translator.add_knowledge_base("Silver", 17)
+            translator.add_knowledge_base("Gold", 14450)
+
+    All Translator methods without a lock-free variant here (e.g. save_data, clear_knowledge_base, suggest_product)
+    are called on the private Translator under the lock, so a ConcurrentTranslator can be used wherever a Translator
+    is expected, e.g. by MainSolution1.dispatch.
+    """
+
+    def __init__(self, translator: Translator = None):
+        """
+        :param translator: Translator holding the initial knowledge. It must not be used directly afterwards.
+        """
+        self._writer = Translator(backup_path=None) if translator is None else translator
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self.snapshot = None
+        # products changed since the last publish, found through the events of the private Translator
+        self._changed_products = {}
+        # knowledge base of the private Translator the published copy was made of
+        self._copied_knowledge_base = None
+        self._writer.subscribe(self._track_change)
+        self._publish()
+
+    @contextmanager
+    def batch(self):
+        """
+        Runs several changes under the writer lock and publishes them at once at the end of the outermost batch.
+        :return: Context manager yielding the private Translator.
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self._writer
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._writer.generation != self.snapshot.generation:
+                    self._publish()
+
+    def _track_change(self, event: tuple):
+        _, operation, args = event
+        if operation == "knowledge_base":
+            self._changed_products[args[0]] = None
+
+    def _publish_knowledge_base(self, previous: KnowledgeSnapshot):
+        """
+        :return: Knowledge base of the new snapshot, the one of the previous snapshot with the changed prices on top,
+            or a new copy when the knowledge base was replaced (e.g. by clear_knowledge_base or load_data) or the
+            changes got too many.
+        """
+        knowledge_base = self._writer.knowledge_base
+        changed, self._changed_products = self._changed_products, {}
+        if previous is not None and knowledge_base is self._copied_knowledge_base:
+            if not changed:
+                return previous.knowledge_base
+            published = previous.knowledge_base
+            base, layers = (published.base, published.layers) if isinstance(published, LayeredKnowledgeBase) \
+                else (published, ())
+            layers += ({product: knowledge_base[product] for product in changed},)
+            # a layer is merged into the previous one when it got at least half as large
+            while len(layers) > 1 and len(layers[-2]) <= 2 * len(layers[-1]):
+                merged = layers[-2].copy()
+                merged.update(layers[-1])
+                layers = layers[:-2] + (merged,)
+            if 8 * sum(len(layer) for layer in layers) <= len(base) + 64:
+                return LayeredKnowledgeBase(base, layers, len(knowledge_base))
+        self._copied_knowledge_base = knowledge_base
+        return knowledge_base.copy()
+
+    def _publish(self):
+        """Builds a snapshot of the private Translator and makes it visible to the readers. Called under the lock."""
+        writer = self._writer
+        previous = self.snapshot
+        foreign_numbers = dict(writer.foreign_numbers)
+        if previous is not None and previous.foreign_numbers == foreign_numbers:
+            # the vocabulary did not change, its tables (and their lazily built indexes) are reused
+            foreign_numbers, numeral_table = previous.foreign_numbers, previous.numeral_table
+        else:
+            numeral_table = NumeralTable(foreign_numbers, writer.roman_numbers)
+        currencies = writer.currencies
+        if previous is not None and previous.currencies.rates == currencies.rates:
+            currencies = previous.currencies
+        else:
+            currencies = currencies.compressed_copy()
+        self.snapshot = KnowledgeSnapshot(self._publish_knowledge_base(previous), foreign_numbers, numeral_table,
+                                          currencies, writer.generation)
+
+    def __getattr__(self, name: str):
+        # only called for attributes which are not defined here, i.e. the ones of the private Translator
+        if name.startswith("_"):
+            raise AttributeError(f"'ConcurrentTranslator' object has no attribute '{name}'")
+        attribute = getattr(self._writer, name)
+        if not callable(attribute):
+            return attribute
+
+        def locked(*args, **kwargs):
+            with self.batch() as translator:
+                return getattr(translator, name)(*args, **kwargs)
+
+        return locked
+
+    @property
+    def generation(self) -> int:
+        return self.snapshot.generation
+
+    def reader(self) -> PinnedTranslator:
+        """
+        :return: View of this translator whose reads all use the current snapshot, e.g. for answering one question.
+        """
+        return PinnedTranslator(self, self.snapshot)
+
+    def calc_foreign_numbers(self, values: list[str]) -> int:
+        return self.snapshot.calc_foreign_numbers(values)
+
+    def evaluate_foreign_numbers(self, values: list[str]) -> int:
+        return self.snapshot.evaluate_foreign_numbers(values)
+
+    def int_to_foreign(self, number: int) -> str:
+        return self.snapshot.int_to_foreign(number)
+
+    def get_product_price(self, product: str) -> Price:
+        return self.snapshot.get_product_price(product)
+
+    def get_product_price_in(self, product: str, unit: str) -> Price:
+        return self.snapshot.get_product_price_in(product, unit)
+
+    def convert(self, amount, unit: str, other_unit: str) -> Price:
+        return self.snapshot.convert(amount, unit, other_unit)
+
+    def value_basket(self, items) -> Price:
+        return self.snapshot.value_basket(items)
+
+    def get_knowledge_base(self) -> dict:
+        return self.snapshot.get_knowledge_base()
+
+    def get_foreign_numbers(self) -> dict:
+        return self.snapshot.get_foreign_numbers()
+
+    def get_name_index(self, operation: str):
+        return self.snapshot.get_name_index(operation)
@@ -0,0 +1,129 @@
+""" Exchange rates between currencies (and other units) in a weighted union-find structure. """
+
+from Solution1.Pricing import Price
+from Solution1.TranslatorExceptions import CurrencyException
+
+
+def normalize_unit(unit: str) -> str:
+    """
+    Normalizes the name of a unit, so that "Credits", "credits" and "credit" are the same unit.
+    :param unit: Name of the unit as written in the input.
+    :return: Lowercase name without a plural "s".
+    """
+    unit = unit.lower()
+    return unit[:-1] if len(unit) > 1 and unit.endswith("s") else unit
+
+
+class CurrencyGraph:
+    """
+    Exchange rates between units. Units connected by rates form a group with one root unit; every unit stores its
+    value in units of its parent, and the lookup compresses the path to the root. So a conversion needs no graph search
+    and takes nearly constant time, and adding a rate only links two groups. A rate contradicting the known rates is
+    refused.
+    """
+
+    def __init__(self):
+        self.parent = {}
+        # value of one unit in units of its parent
+        self.weight = {}
+        self.size = {}
+        # all added rates as (unit, other unit, value of one unit in other units), to store and restore them
+        self.rates = []
+
+    def __contains__(self, unit: str) -> bool:
+        return normalize_unit(unit) in self.parent
+
+    def _find(self, unit: str) -> tuple:
+        """
+        Finds the root of a normalized unit and compresses its path.
+        :return: Tuple of the root unit and the value of one unit in root units.
+        """
+        path = []
+        root = unit
+        while self.parent[root] != root:
+            path.append(root)
+            root = self.parent[root]
+
+        # from the unit next to the root back to the unit, every weight becomes relative to the root
+        value = Price(1)
+        for node in reversed(path):
+            value = self.weight[node] * value
+            self.weight[node] = value
+            self.parent[node] = root
+        return root, self.weight[unit] if path else Price(1)
+
+    def rate(self, unit: str, other_unit: str):
+        """
+        :return: Value of one unit in other units, or None if the units are not connected.
+        """
+        unit, other_unit = normalize_unit(unit), normalize_unit(other_unit)
+        if unit not in self.parent or other_unit not in self.parent:
+            return None
+        root, value = self._find(unit)
+        other_root, other_value = self._find(other_unit)
+        if root != other_root:
+            return None
+        return value / other_value
+
+    def add_rate(self, unit: str, other_unit: str, rate: Price) -> bool:
+        """
+        Adds an exchange rate.
+        :param unit: Name of a unit.
+        :param other_unit: Name of the other unit.
+        :param rate: Value of one unit in other units.
+        :return: True if the rate was new, False if it followed from the known rates already.
+        :raises CurrencyException: If the rate contradicts the known rates or both units are the same.
+        """
+        unit, other_unit = normalize_unit(unit), normalize_unit(other_unit)
+        if unit == other_unit:
+            raise CurrencyException(f"Cannot define an exchange rate of '{unit}' to itself")
+        known_rate = self.rate(unit, other_unit)
+        if known_rate is not None:
+            if known_rate != rate:
+                raise CurrencyException(f"Inconsistent exchange rate: 1 {unit} is already {known_rate} {other_unit}")
+            return False
+
+        for name in (unit, other_unit):
+            if name not in self.parent:
+                self.parent[name] = name
+                self.weight[name] = Price(1)
+                self.size[name] = 1
+        root, value = self._find(unit)
+        other_root, other_value = self._find(other_unit)
+        # value(root) = value(unit) / value = rate * other_value / value in other roots
+        root_rate = rate * other_value / value
+        if self.size[root] > self.size[other_root]:
+            root, other_root, root_rate = other_root, root, Price(1) / root_rate
+        self.parent[root] = other_root
+        self.weight[root] = root_rate
+        self.size[other_root] += self.size[root]
+        self.rates.append((unit, other_unit, rate))
+        return True
+
+    def convert(self, amount: Price, unit: str, other_unit: str) -> Price:
+        """
+        Converts an amount to another unit.
+        :param amount: Amount in units.
+        :param unit: Name of the unit of the amount.
+        :param other_unit: Name of the target unit.
+        :return: The amount in other units.
+        :raises CurrencyException: If there is no exchange rate between the units.
+        """
+        if normalize_unit(unit) == normalize_unit(other_unit):
+            return amount
+        rate = self.rate(unit, other_unit)
+        if rate is None:
+            raise CurrencyException(f"No exchange rate from {normalize_unit(unit)} to {normalize_unit(other_unit)}")
+        return amount * rate
+
+    def compressed_copy(self) -> "CurrencyGraph":
+        """
+        Returns a copy in which every unit points to its root directly. Lookups never change such a copy, so it can be
+        read by many threads at once.
+        """
+        graph = CurrencyGraph()
+        for unit in self.parent:
+            graph.parent[unit], graph.weight[unit] = self._find(unit)
+        graph.size = dict(self.size)
+        graph.rates = list(self.rates)
+        return graph
@@ -0,0 +1,222 @@
+""" Grammar for classifying input lines and extracting their parts in a single scan. """
+
+
+def is_number(token: str) -> bool:
+    """Checks if a token is a number of ASCII digits, since str.isdigit also accepts e.g. "²", which int rejects."""
+    return token.isdigit() and token.isascii()
+
+
+class TokenScan:
+    """
+    Features of one input line, computed once per line and shared by all rules of the grammar, so the rules do not
+    scan the tokens again. The features are found with a few scans of the tokens by the built-in list and str methods,
+    which is faster than one loop over the tokens in Python.
+    """
+
+    __slots__ = ("tokens", "length", "head", "is_index", "digit_index", "has_coins")
+
+    def __init__(self, tokens: list[str]):
+        self.tokens = tokens
+        self.length = len(tokens)
+        # the keywords of all questions are within the first four words
+        self.head = tuple(map(str.lower, tokens[:4]))
+        self.is_index = tokens.index("is") if "is" in tokens else None
+        self.has_coins = "coins" in tokens
+        self.digit_index = None
+        if any(map(str.isdigit, tokens)):
+            self.digit_index = next((index for index, token in enumerate(tokens) if is_number(token)), None)
+
+    def starts_with(self, *keywords: str) -> bool:
+        """Checks if the (lowercase) line starts with the given keywords. At most four keywords can be checked."""
+        return self.head[:len(keywords)] == keywords
+
+    def ends_with_question(self) -> bool:
+        return self.length > 0 and self.tokens[-1] == "?"
+
+
+class ParsedLine:
+    """Structured result of parsing one input line."""
+
+    # a plain class instead of a dataclass, since importing dataclasses costs more than the rest of the startup
+    __slots__ = ("kind", "tokens", "numerals", "product", "coin_value", "command", "error", "amount", "unit",
+                 "target_unit", "items")
+
+    def __init__(self, kind: str, tokens: list[str], numerals: list[str] = None, product: str = None,
+                 coin_value: int = None, command: object = None, error: str = None, amount: int = None,
+                 unit: str = None, target_unit: str = None, items: list = None):
+        self.kind = kind
+        self.tokens = tokens
+        self.numerals = [] if numerals is None else numerals
+        self.product = product
+        self.coin_value = coin_value
+        self.command = command
+        self.error = error
+        # exchange rates and currency questions: "<amount> <unit> is <coin_value> <target_unit>"
+        self.amount = amount
+        self.unit = unit
+        self.target_unit = target_unit
+        # basket questions: (foreign numbers, product) of every item
+        self.items = items
+
+    def _fields(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, ParsedLine):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self.__slots__, self._fields()))
+        return f"ParsedLine({fields})"
+
+
+class Grammar:
+    """
+    Ordered set of statement rules. Every rule has a matcher, which gets the TokenScan of a line and returns a
+    ParsedLine if the line is a statement of its kind (or None otherwise), and a handler for the parsed line.
+    """
+
+    def __init__(self):
+        self._rules = []
+        self.handlers = {}
+
+    def register(self, kind: str, matcher, handler, before: str = None):
+        """
+        Registers a new statement type.
+        :param kind: Unique name of the statement type.
+        :param matcher: Function mapping a TokenScan to a ParsedLine or None.
+        :param handler: Function handling a ParsedLine of this kind.
+        :param before: Name of an already registered statement type, which should be checked after the new one.
+        """
+        index = len(self._rules)
+        if before is not None:
+            index = [rule_kind for rule_kind, _ in self._rules].index(before)
+        self._rules.insert(index, (kind, matcher))
+        self.handlers[kind] = handler
+
+    def kinds(self) -> list[str]:
+        return [kind for kind, _ in self._rules]
+
+    def parse(self, inputs: list[str]):
+        """
+        Scans the input once and returns the result of the first matching rule.
+        :param inputs: Input list of strings.
+        :return: ParsedLine of the first matching statement type or None if no rule matches.
+        """
+        scan = TokenScan(inputs)
+        for _, matcher in self._rules:
+            parsed = matcher(scan)
+            if parsed is not None:
+                return parsed
+        return None
+
+
+def match_assignment(scan: TokenScan):
+    """Matches an assignment like "unu is I"."""
+    if scan.digit_index is None and scan.length == 3:
+        return ParsedLine("assignment", scan.tokens, numerals=[scan.tokens[0]])
+    return None
+
+
+def match_product_price_definition(scan: TokenScan):
+    """Matches a product price definition like "unu unu Silver is 34 coins"."""
+    if scan.digit_index is None or not scan.has_coins:
+        return None
+
+    tokens = scan.tokens
+    parsed = ParsedLine("product_price_definition", tokens, coin_value=int(tokens[scan.digit_index]))
+    if scan.is_index is None:
+        parsed.error = "'is' not found in input"
+        return parsed
+    if scan.is_index < 2:
+        parsed.error = "No product name found"
+        return parsed
+
+    product_index = scan.is_index - 1
+    parsed.product = tokens[product_index]
+    parsed.numerals = tokens[:product_index]
+    return parsed
+
+
+def match_foreign_question(scan: TokenScan):
+    """Matches a foreign question like "how much is dek kvindek unu unu ?"."""
+    # like before the grammar, foreign numbers with digits in them (e.g. "unu2") are no foreign question
+    if (scan.length >= 4 and scan.starts_with("how", "much", "is") and scan.ends_with_question()
+            and not any(map(str.isdigit, "".join(scan.tokens[3:-1])))):
+        return ParsedLine("foreign_question", scan.tokens, numerals=scan.tokens[3:-1])
+    return None
+
+
+def match_product_question(scan: TokenScan):
+    """Matches a product question like "how many coins is unu kvin Silver ?"."""
+    if scan.length >= 6 and scan.starts_with("how", "many", "coins", "is") and scan.ends_with_question():
+        return ParsedLine("product_question", scan.tokens, numerals=scan.tokens[4:-2], product=scan.tokens[-2])
+    return None
+
+
+def match_reverse_question(scan: TokenScan):
+    """Matches a reverse question like "how do you say 1944 ?"."""
+    if (scan.length == 6 and scan.starts_with("how", "do", "you", "say") and scan.digit_index == 4
+            and scan.ends_with_question()):
+        return ParsedLine("reverse_question", scan.tokens, coin_value=int(scan.tokens[4]))
+    return None
+
+
+def match_exchange_rate_definition(scan: TokenScan):
+    """Matches an exchange rate definition like "1 credit is 3 coins"."""
+    tokens = scan.tokens
+    if scan.length != 5 or scan.digit_index != 0 or scan.is_index != 2 or not is_number(tokens[3]):
+        return None
+    parsed = ParsedLine("exchange_rate_definition", tokens, amount=int(tokens[0]), unit=tokens[1],
+                        coin_value=int(tokens[3]), target_unit=tokens[4])
+    if parsed.amount == 0 or parsed.coin_value == 0:
+        parsed.error = "Exchange rates need positive amounts"
+    return parsed
+
+
+def match_currency_question(scan: TokenScan):
+    """Matches a currency question like "how many coins is 4 credits ?"."""
+    if (scan.length == 7 and scan.starts_with("how", "many") and scan.head[3] == "is" and scan.digit_index == 4
+            and scan.ends_with_question()):
+        tokens = scan.tokens
+        return ParsedLine("currency_question", tokens, amount=int(tokens[4]), unit=tokens[5], target_unit=tokens[2])
+    return None
+
+
+def match_product_currency_question(scan: TokenScan):
+    """Matches a product question in another unit than coins like "how many credits is unu kvin Silver ?"."""
+    if (scan.length >= 6 and scan.starts_with("how", "many") and scan.head[3] == "is" and scan.head[2] != "coins"
+            and scan.digit_index is None and scan.ends_with_question()):
+        tokens = scan.tokens
+        return ParsedLine("product_currency_question", tokens, numerals=tokens[4:-2], product=tokens[-2],
+                          target_unit=tokens[2])
+    return None
+
+
+def match_product_history_question(scan: TokenScan):
+    """Matches a question for an old product price like "how many coins was unu kvin Silver at 10000 ?"."""
+    tokens = scan.tokens
+    if (scan.length >= 8 and scan.starts_with("how", "many", "coins", "was") and scan.ends_with_question()
+            and tokens[-3].lower() == "at" and is_number(tokens[-2])):
+        return ParsedLine("product_history_question", tokens, numerals=tokens[4:-4], product=tokens[-4],
+                          amount=int(tokens[-2]))
+    return None
+
+
+def match_basket_question(scan: TokenScan):
+    """Matches a basket question like "how many coins is unu kvin Silver and dek Gold ?"."""
+    tokens = scan.tokens
+    if (scan.length < 9 or not scan.starts_with("how", "many") or scan.head[3] != "is" or "and" not in tokens
+            or scan.digit_index is not None or not scan.ends_with_question()):
+        return None
+
+    items = []
+    start = 4
+    for end in [index for index in range(4, scan.length - 1) if tokens[index] == "and"] + [scan.length - 1]:
+        if end - start < 2:
+            return None
+        items.append((tokens[start:end - 1], tokens[end - 1]))
+        start = end + 1
+    target_unit = None if scan.head[2] == "coins" else tokens[2]
+    return ParsedLine("basket_question", tokens, items=items, target_unit=target_unit)
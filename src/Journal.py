@@ -0,0 +1,99 @@
+""" Append-only journal of knowledge mutations. """
+
+import os
+import weakref
+
+
+def _close_file(file):
+    """Writes the buffered records of a journal file through to the disk and closes it."""
+    file.flush()
+    os.fsync(file.fileno())
+    file.close()
+
+
+class Journal:
+    """
+    Append-only file of mutation records, which are replayed on top of the last snapshot of the backup file.
+    Records are pickled one after another and handed to the operating system with every append, so they survive a
+    crash of the process; fsync (for a crash of the machine) is done once every sync_every records.
+    """
+
+    def __init__(self, path: str, sync_every: int = 64):
+        self.path = path
+        self.sync_every = sync_every
+        self.records = 0
+        self._file = None
+        self._unsynced = 0
+        # closes the open file when the journal is collected or at the latest at exit, without keeping it alive
+        self._finalizer = None
+
+    def append(self, record):
+        """
+        Appends one record to the journal.
+        :param record: Picklable record.
+        """
+        import pickle
+
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            self._finalizer = weakref.finalize(self, _close_file, self._file)
+        pickle.dump(record, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        self.records += 1
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """Writes all appended records through to the disk."""
+        if self._file is not None and self._unsynced > 0:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def replay(self):
+        """
+        Reads all records of the journal. A torn record at the end (e.g. after a crash while writing) is cut off.
+        :return: Generator over the records in the order in which they were appended.
+        """
+        import pickle
+
+        self.close()
+        self.records = 0
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            while True:
+                valid_size = f.tell()
+                try:
+                    record = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError, ValueError, AttributeError, IndexError):
+                    break
+                self.records += 1
+                yield record
+
+        if valid_size < size:
+            print(f"Ignoring incomplete record at the end of {self.path}")
+            os.truncate(self.path, valid_size)
+
+    def truncate(self):
+        """Removes all records, e.g. after they were merged into a new snapshot."""
+        self.close()
+        with open(self.path, "wb"):
+            pass
+        self.records = 0
+
+    def delete(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.records = 0
+
+    def close(self):
+        if self._file is not None:
+            self._finalizer.detach()
+            self.sync()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,61 @@
+""" Capturing the printed answer of one input line without swapping sys.stdout for every line. """
+
+import contextvars
+import io
+import sys
+
+# output of the line which is answered in the current context, see SessionOutput
+_line_output = contextvars.ContextVar("line_output", default=None)
+
+
+class SessionOutput(io.TextIOBase):
+    """
+    Replaces sys.stdout once (see install). Everything printed while a line is answered goes to the output of that
+    line (set in the context of the line), everything else to the original stdout. So the answers of different lines,
+    also of lines answered in other threads, never mix, and sys.stdout is not swapped for every line.
+    """
+
+    def __init__(self, default):
+        self.default = default
+
+    def writable(self):
+        return True
+
+    def write(self, text: str) -> int:
+        out = _line_output.get()
+        return (self.default if out is None else out).write(text)
+
+    def flush(self):
+        out = _line_output.get()
+        (self.default if out is None else out).flush()
+
+
+def install():
+    """Replaces sys.stdout by a SessionOutput, unless it already is one."""
+    if not isinstance(sys.stdout, SessionOutput):
+        sys.stdout = SessionOutput(sys.stdout)
+
+
+class LineCapture:
+    """
+    Context manager sending everything printed in the current context to a stream, e.g. the answer of one line.
+    Other threads and contexts print to their own output meanwhile, a capture within a capture gets only what was
+    printed within it.
+    """
+
+    __slots__ = ("out", "_token")
+
+    def __init__(self, out):
+        """
+        :param out: Text stream, e.g. an io.StringIO.
+        """
+        self.out = out
+        self._token = None
+
+    def __enter__(self):
+        install()
+        self._token = _line_output.set(self.out)
+        return self.out
+
+    def __exit__(self, *exc_info):
+        _line_output.reset(self._token)
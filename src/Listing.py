@@ -0,0 +1,89 @@
+""" Sorted name index and paginated listing of the knowledge. """
+
+import re
+from bisect import bisect_left
+from fnmatch import translate
+from itertools import islice
+
+_WILDCARDS = re.compile(r"[*?\[]")
+_MAX_CHAR = chr(0x10FFFF)
+
+
+class SortedNameIndex:
+    """
+    Names of the products or foreign numbers in sorted order. Names with a prefix are one contiguous range found by
+    binary search, so a filtered page only looks at the matching names instead of the whole knowledge.
+    """
+
+    def __init__(self, names):
+        """
+        :param names: Iterable of the names.
+        """
+        self.names = sorted(names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix_range(self, prefix: str) -> tuple:
+        """
+        :return: Tuple of the first and the end position of the names starting with the prefix.
+        """
+        start = bisect_left(self.names, prefix)
+        if not prefix:
+            return start, len(self.names)
+        # the smallest string after all strings with the prefix; a name after the prefix and starting with its part
+        # before trailing U+10FFFF (the largest character) starts with the whole prefix
+        prefix = prefix.rstrip(_MAX_CHAR)
+        if not prefix:
+            return start, len(self.names)
+        end = bisect_left(self.names, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo=start)
+        return start, end
+
+    def select(self, prefix: str = "", pattern: str = None, offset: int = 0, limit: int = None) -> tuple:
+        """
+        Selects the names with a prefix which match a glob pattern (*, ? and [...], case-sensitive). The range of the
+        pattern's literal prefix is found by binary search, only the names in it are matched against the pattern.
+        :param prefix: Prefix of the names.
+        :param pattern: Glob pattern the whole name has to match, None for all names.
+        :param offset: Number of selected names to skip, e.g. the ones of the previous pages.
+        :param limit: Maximum number of returned names, None for all.
+        :return: Tuple of the number of all selected names and an iterator over the requested ones in sorted order.
+        """
+        if pattern is not None:
+            wildcard = _WILDCARDS.search(pattern)
+            literal = pattern[:wildcard.start()] if wildcard else pattern
+            # the longer of both prefixes narrows the range; if neither starts with the other, nothing matches
+            if literal.startswith(prefix):
+                prefix = literal
+            elif not prefix.startswith(literal):
+                return 0, iter(())
+        start, end = self.prefix_range(prefix)
+        if pattern is None:
+            # without a pattern the requested names are found by position
+            stop = end if limit is None else min(end, start + offset + limit)
+            return end - start, map(self.names.__getitem__, range(start + offset, stop))
+        match = re.compile(translate(pattern)).match
+        in_range = range(start, end)
+        count = sum(1 for name in map(self.names.__getitem__, in_range) if match(name))
+        names = (name for name in map(self.names.__getitem__, in_range) if match(name))
+        return count, islice(names, offset, None if limit is None else offset + limit)
+
+
+def write_entries(out, dictionary, names, page_size: int = 1000) -> int:
+    """
+    Writes the entries of a dictionary as "name: value" lines in chunks of page_size lines, so not the whole listing
+    is built in memory at once.
+    :param out: Text stream to write to.
+    :param dictionary: Values by name.
+    :param names: Iterable of the names to write.
+    :param page_size: Number of lines per write.
+    :return: Number of written entries.
+    """
+    written = 0
+    names = iter(names)
+    while True:
+        lines = [f"{name}: {dictionary[name]}\n" for name in islice(names, page_size)]
+        if not lines:
+            return written
+        out.write("".join(lines))
+        written += len(lines)
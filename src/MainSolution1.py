@@ -1,215 +1,627 @@
 """ Main module for the translator application, handling user inputs and commands. """
 
-from Solution1.CommandHandlers import ExitCommand, PrintCommand, ClearCommand, ResetCommand, HelpCommand, SaveCommand, \
-    LoadCommand
-from Solution1.TranslatorExceptions import ProductException, ForeignNumberException
+import io
+import sys
+import time
+
+_IMPORT_START = time.perf_counter()
+
+from Solution1.Cache import ResponseCache
+from Solution1.InputParser import Grammar, ParsedLine, TokenScan, match_assignment, match_product_price_definition, \
+    match_foreign_question, match_product_question, match_reverse_question, match_exchange_rate_definition, \
+    match_currency_question, match_product_currency_question, match_product_history_question, match_basket_question
+from Solution1.Metrics import METRICS
+from Solution1.Pricing import Price, ROUNDING_MODES
+from Solution1.TranslatorExceptions import CurrencyException, ForeignNumberException, MemoryBudgetException, \
+    ProductException, RomanNumeralException
 from Solution1.Translator import Translator
-from Solution1.Utilities import print_error, is_roman, extract_digit, remove_keywords, contains_digits, \
-    extract_product_name
+from Solution1.Utilities import print_error, print_invalid_roman_numeral, did_you_mean
 
+_IMPORT_END = time.perf_counter()
 
-def is_command(inputs, command_map):
+
+def command_matcher(command_map):
     """
-    Checks if the first input is a valid command by comparing it with the keys in the command map.
-    :param inputs: Input list of strings, where the first element is expected to be a command.
+    Creates the matcher for commands. Empty inputs are matched as well and are answered with the help message.
     :param command_map: Map of valid commands to their respective handler classes.
-    :return: True if the first input is a valid command, False otherwise.
+    :return: Matcher function for the grammar.
     """
-    return inputs[0].lower() in command_map.keys()
+
+    def match_command(scan: TokenScan):
+        if scan.length == 0:
+            return ParsedLine("command", scan.tokens, command=command_map["help"])
+        handler = command_map.get(scan.head[0])
+        if handler is not None:
+            return ParsedLine("command", scan.tokens, command=handler)
+        return None
+
+    return match_command
 
 
-def handle_command(inputs, translator, command_map):
+def handle_command(parsed: ParsedLine, translator):
     """
-    Handles the command by looking it up in the command map and executing the corresponding handler.
-    :param inputs: Input list of strings, where the first element is expected to be a command.
+    Handles the command by executing the handler found by the parser.
+    :param parsed: Parsed command, containing the command handler.
     :param translator: Translator instance to handle the command logic.
-    :param command_map: Map of valid commands to their respective handler classes.
     """
-    command = inputs[0].lower()
-    if command in command_map:
-        handler = command_map[command]
-        handler.handle(inputs, translator)
+    # edge case
+    if len(parsed.tokens) == 0:
+        print("Empty input. Showing help message...")
+        name = "help"
     else:
-        print_error()
+        name = parsed.tokens[0].lower()
+
+    if METRICS.enabled:
+        METRICS.call(f"command {name}", parsed.command.handle, parsed.tokens, translator)
+    else:
+        parsed.command.handle(parsed.tokens, translator)
 
 
-def is_assignment(inputs):
+def handle_assignment(parsed: ParsedLine, translator):
+    try:
+        translator.add_foreign_number(parsed.tokens[0], parsed.tokens[-1])
+    except MemoryBudgetException as e:
+        METRICS.record_error("MemoryBudgetException")
+        print(e)
+
+
+def handle_product_price_definition(parsed: ParsedLine, translator):
     """
-    Checks if the input is an assignment by verifying that it contains no digits and has exactly three elements.
-    For example, "unu is I".
-    :param inputs: Input list of strings.
-    :return: True if the input is an assignment, False otherwise.
+    Handles the product price definition by calculating the price per unit from the parsed coin value and foreign
+    numbers.
+    :param parsed: Parsed definition, which should contain a product name, foreign numbers and a coin value.
+    :param translator: Translator instance to handle the product price logic.
+    :raises ForeignNumberException: If an unknown foreign number is encountered in the input.
+    :raises RomanNumeralException: If the foreign numbers do not form a valid Roman numeral.
     """
-    return not contains_digits(inputs) and len(inputs) == 3
-
+    if parsed.error is not None:
+        METRICS.record_error("ProductException")
+        print(parsed.error)
+        return
 
-def handle_assignment(inputs, translator):
-    translator.add_foreign_number(inputs[0], inputs[-1])
+    try:
+        price = translator.evaluate_foreign_numbers(parsed.numerals)
+        product_price_per_unit = Price(parsed.coin_value, price)
+        translator.add_knowledge_base(parsed.product, product_price_per_unit)
+    except ForeignNumberException as e:
+        METRICS.record_error("ForeignNumberException")
+        print(f"Unknown foreign number: {e}{did_you_mean(translator.suggest_foreign_number(str(e)))}")
+        return
+    except RomanNumeralException:
+        METRICS.record_error("RomanNumeralException")
+        print_invalid_roman_numeral()
+        return
+    except MemoryBudgetException as e:
+        METRICS.record_error("MemoryBudgetException")
+        print(e)
+        return
 
 
-def is_product_price_definition(inputs):
+def handle_foreign_question(parsed: ParsedLine, translator):
     """
-    Checks if the input is a product price definition by verifying that it contains one digit and the word "coins".
-    For example, "unu unu Silver is 34 coins".
-    :param inputs: Input list of strings.
-    :return: True if the input is a product price definition, False otherwise.
+    Handles the foreign question by validating the foreign numbers against the Roman numeral rules and calculating
+    their value.
+    :param parsed: Parsed question, which should contain foreign numbers.
+    :param translator: Translator instance to handle the foreign number logic.
+    :raises ForeignNumberException: If an unknown foreign number is encountered in the input.
+    :raises RomanNumeralException: If the foreign numbers do not form a valid Roman numeral.
     """
-    return contains_digits(inputs) and "coins" in inputs
+    try:
+        numeric_value = translator.evaluate_foreign_numbers(parsed.numerals)
+        print(f"{' '.join(parsed.numerals)} is {numeric_value}")
+
+    except ForeignNumberException as e:
+        METRICS.record_error("ForeignNumberException")
+        print(f"Unknown foreign number: {e}{did_you_mean(translator.suggest_foreign_number(str(e)))}")
+        return
+    except RomanNumeralException:
+        METRICS.record_error("RomanNumeralException")
+        print_invalid_roman_numeral()
+        return
 
 
-def handle_product_price_definition(inputs, translator):
+def handle_product_question(parsed: ParsedLine, translator):
     """
-    Handles the product price definition by extracting the coin value, product name, and foreign numbers from the input.
-    :param inputs: Input list of strings, which should contain a product name, foreign numbers and a coin value.
+    Handles the product question by translating the foreign numbers to Roman numerals, calculating their value, and multiplying it by the known product price.
+    Questions in another unit than coins convert the price with the exchange rates.
+    :param parsed: Parsed question, which should contain foreign numbers, a product name and optionally a target unit.
     :param translator: Translator instance to handle the product price logic.
-    :raises ValueError: If no number is found in the input.
-    :raises ProductException: If no product name is found in the input.
+    :raises KeyError: If the product is unknown.
     :raises ForeignNumberException: If an unknown foreign number is encountered in the input.
+    :raises RomanNumeralException: If the foreign numbers do not form a valid Roman numeral.
+    :raises CurrencyException: If there is no exchange rate from coins to the target unit.
     """
     try:
-        # Extract the coin value, product name and foreign numbers from the input
-        coin_value = extract_digit(inputs)
-        product_name = extract_product_name(inputs)
-        filtered_inputs = remove_keywords(inputs, {product_name, str(coin_value), 'coins', 'is'})
-        all_foreign_numbers = translator.extract_all_foreign_numbers(filtered_inputs)
-
-        price = translator.calc_foreign_numbers(all_foreign_numbers)
-        product_price_per_unit = coin_value / price
-        translator.add_knowledge_base(product_name, product_price_per_unit)
-    except ValueError as e:
+        translated = translator.evaluate_foreign_numbers(parsed.numerals)
+        if parsed.target_unit is None:
+            product_price = translator.get_product_price(parsed.product)
+        else:
+            product_price = translator.get_product_price_in(parsed.product, parsed.target_unit)
+        total = product_price.times(translated)
+        unit = "coins" if parsed.target_unit is None else parsed.target_unit
+        print(f"{' '.join(parsed.numerals)} {parsed.product} is {total.format(translator.price_rounding)} {unit}")
+
+    except KeyError:
+        METRICS.record_error("KeyError")
+        print_error()
+        suggestion = translator.suggest_product(parsed.product)
+        if suggestion is not None:
+            print(f"Unknown product '{parsed.product}'.{did_you_mean(suggestion)}")
+        return
+    except ForeignNumberException as e:
+        METRICS.record_error("ForeignNumberException")
+        print(f"Unknown foreign number: {e}{did_you_mean(translator.suggest_foreign_number(str(e)))}")
+        return
+    except RomanNumeralException:
+        METRICS.record_error("RomanNumeralException")
+        print_invalid_roman_numeral()
+        return
+    except CurrencyException as e:
+        METRICS.record_error("CurrencyException")
         print(e)
         return
+
+
+def handle_basket_question(parsed: ParsedLine, translator):
+    """
+    Handles the basket question by valuing all items in one pass and adding up their prices.
+    :param parsed: Parsed question, which contains the foreign numbers and the product of every item and optionally a
+        target unit.
+    :param translator: Translator instance to handle the product price logic.
+    :raises KeyError: If a product is unknown.
+    :raises ForeignNumberException: If an unknown foreign number is encountered in the input.
+    :raises RomanNumeralException: If the foreign numbers of an item do not form a valid Roman numeral.
+    :raises CurrencyException: If there is no exchange rate from coins to the target unit.
+    """
+    try:
+        total = translator.value_basket(parsed.items)
+        unit = "coins"
+        if parsed.target_unit is not None:
+            total = translator.convert(total, "coins", parsed.target_unit)
+            unit = parsed.target_unit
+        basket = " and ".join(f"{' '.join(numerals)} {product}" for numerals, product in parsed.items)
+        print(f"{basket} is {total.format(translator.price_rounding)} {unit}")
+
+    except KeyError as e:
+        METRICS.record_error("KeyError")
+        print_error()
+        product = e.args[0]
+        suggestion = translator.suggest_product(product)
+        if suggestion is not None:
+            print(f"Unknown product '{product}'.{did_you_mean(suggestion)}")
+    except ForeignNumberException as e:
+        METRICS.record_error("ForeignNumberException")
+        print(f"Unknown foreign number: {e}{did_you_mean(translator.suggest_foreign_number(str(e)))}")
+    except RomanNumeralException:
+        METRICS.record_error("RomanNumeralException")
+        print_invalid_roman_numeral()
+    except CurrencyException as e:
+        METRICS.record_error("CurrencyException")
+        print(e)
+
+
+def handle_product_history_question(parsed: ParsedLine, translator):
+    """
+    Handles the question for an old product price by looking up the price version at the given entry.
+    :param parsed: Parsed question, which contains foreign numbers, a product name and the entry as amount.
+    :param translator: Translator instance to handle the product price logic.
+    :raises KeyError: If the product had no price at the entry.
+    :raises ProductException: If the price history is not enabled.
+    :raises ForeignNumberException: If an unknown foreign number is encountered in the input.
+    :raises RomanNumeralException: If the foreign numbers do not form a valid Roman numeral.
+    """
+    try:
+        translated = translator.evaluate_foreign_numbers(parsed.numerals)
+        total = translator.get_product_price_at(parsed.product, parsed.amount).times(translated)
+        print(f"{' '.join(parsed.numerals)} {parsed.product} was {total.format(translator.price_rounding)} coins "
+              f"at entry {parsed.amount}")
+
+    except KeyError:
+        METRICS.record_error("KeyError")
+        suggestion = None
+        if parsed.product not in translator.get_knowledge_base():
+            suggestion = translator.suggest_product(parsed.product)
+        print(f"No price of '{parsed.product}' at entry {parsed.amount}.{did_you_mean(suggestion)}")
     except ProductException as e:
+        METRICS.record_error("ProductException")
         print(e)
-        return
     except ForeignNumberException as e:
-        print(f"Unknown foreign number: {e}")
+        METRICS.record_error("ForeignNumberException")
+        print(f"Unknown foreign number: {e}{did_you_mean(translator.suggest_foreign_number(str(e)))}")
+    except RomanNumeralException:
+        METRICS.record_error("RomanNumeralException")
+        print_invalid_roman_numeral()
+
+
+def handle_exchange_rate_definition(parsed: ParsedLine, translator):
+    """
+    Handles the exchange rate definition by adding the rate between both units.
+    :param parsed: Parsed definition, which contains both amounts and units.
+    :param translator: Translator instance to handle the exchange rates.
+    :raises CurrencyException: If the rate contradicts the known exchange rates.
+    """
+    if parsed.error is not None:
+        METRICS.record_error("CurrencyException")
+        print(parsed.error)
         return
 
+    try:
+        translator.add_exchange_rate(parsed.amount, parsed.unit, parsed.coin_value, parsed.target_unit)
+    except CurrencyException as e:
+        METRICS.record_error("CurrencyException")
+        print(e)
 
-def is_foreign_question(inputs: list[str]) -> bool:
+
+def handle_currency_question(parsed: ParsedLine, translator):
     """
-    Checks if the input is a foreign question by verifying that it starts with "how much is" and ends with a question mark.
-    For example, "how much is dek kvindek unu unu ?".
-    :param inputs: Input list of strings.
-    :return: True if the input is a foreign question, False otherwise.
+    Handles the currency question by converting the amount with the exchange rates.
+    :param parsed: Parsed question, which contains the amount, its unit and the target unit.
+    :param translator: Translator instance to handle the exchange rates.
+    :raises CurrencyException: If there is no exchange rate between the units.
     """
-    return (
-            len(inputs) >= 4 and  # at least 4 words are needed
-            inputs[0].lower() == "how" and
-            inputs[1].lower() == "much" and
-            inputs[2].lower() == "is" and
-            inputs[-1] == "?" and
-            not any(char.isdigit() for char in ' '.join(inputs))
-    )
+    try:
+        converted = translator.convert(parsed.amount, parsed.unit, parsed.target_unit)
+        print(f"{parsed.amount} {parsed.unit} is {converted.format(translator.price_rounding)} {parsed.target_unit}")
+    except CurrencyException as e:
+        METRICS.record_error("CurrencyException")
+        print(e)
 
 
-def handle_foreign_question(inputs: list[str], translator):
+def handle_reverse_question(parsed: ParsedLine, translator):
     """
-    Handles the foreign question by translating the foreign numbers to Roman numerals and calculating their value.
-    :param inputs: Input list of strings, which should contain foreign numbers and end with a question mark.
+    Handles the reverse question by writing the number with the foreign numbers.
+    :param parsed: Parsed question, which contains the number as coin value.
     :param translator: Translator instance to handle the foreign number logic.
-    :raises KeyError: If an unknown foreign number is encountered in the input.
-    :raises ForeignNumberException: If an unknown foreign number is encountered in the input.
+    :raises ForeignNumberException: If no foreign number is defined for a needed Roman numeral.
+    :raises RomanNumeralException: If the number cannot be written as Roman numeral.
     """
     try:
-        filtered_inputs = remove_keywords(inputs, {'how', 'much', 'is', '?'})
-        romans = [translator.foreign_to_roman(token) for token in filtered_inputs]
+        print(f"{parsed.coin_value} is {translator.int_to_foreign(parsed.coin_value)}")
+    except ForeignNumberException as e:
+        METRICS.record_error("ForeignNumberException")
+        print(e)
+    except RomanNumeralException as e:
+        METRICS.record_error("RomanNumeralException")
+        print(e)
 
-        if not is_roman(''.join(romans)):
-            print("Invalid Roman numeral. See https://en.wikipedia.org/wiki/Roman_numerals")
-            return
 
-        all_foreign_numbers = translator.extract_all_foreign_numbers(filtered_inputs)
-        numeric_value = translator.calc_foreign_numbers(all_foreign_numbers)
-        print(f"{' '.join(all_foreign_numbers)} is {numeric_value}")
+class LazyCommand:
+    """Command handler of the CommandHandlers module, which is imported and created on the first use of the command."""
 
-    except KeyError as e:
-        print(f"Unknown foreign number: {e}")
+    __slots__ = ("class_name", "_handler")
+
+    def __init__(self, class_name: str):
+        self.class_name = class_name
+        self._handler = None
+
+    def handle(self, inputs, translator):
+        if self._handler is None:
+            from Solution1 import CommandHandlers
+            self._handler = getattr(CommandHandlers, self.class_name)()
+        return self._handler.handle(inputs, translator)
+
+
+def create_command_map():
+    """
+    Creates the map of all available commands and their handlers. The handlers are only imported when a command is
+    used, which keeps the startup fast.
+    :return: Map of command names to their respective handler instances.
+    """
+    return {
+        "exit": LazyCommand("ExitCommand"),
+        "print": LazyCommand("PrintCommand"),
+        "clear": LazyCommand("ClearCommand"),
+        "reset": LazyCommand("ResetCommand"),
+        "help": LazyCommand("HelpCommand"),
+        "save": LazyCommand("SaveCommand"),
+        "load": LazyCommand("LoadCommand"),
+        "import": LazyCommand("ImportCommand"),
+        "stats": LazyCommand("StatsCommand"),
+    }
+
+
+def create_grammar(command_map):
+    """
+    Creates the grammar of all statement types, in the order in which they are checked.
+    :param command_map: Map of valid commands to their respective handler classes.
+    :return: Grammar with all statement types and their handlers.
+    """
+    grammar = Grammar()
+    grammar.register("command", command_matcher(command_map), handle_command)
+    grammar.register("assignment", match_assignment, handle_assignment)
+    grammar.register("product_price_definition", match_product_price_definition, handle_product_price_definition)
+    grammar.register("foreign_question", match_foreign_question, handle_foreign_question)
+    grammar.register("product_question", match_product_question, handle_product_question)
+    grammar.register("reverse_question", match_reverse_question, handle_reverse_question)
+    # "1 credit is 3 coins" and "how many coins is 3 credits ?" would be product price definitions otherwise
+    grammar.register("exchange_rate_definition", match_exchange_rate_definition, handle_exchange_rate_definition,
+                     before="product_price_definition")
+    grammar.register("currency_question", match_currency_question, handle_currency_question,
+                     before="product_price_definition")
+    grammar.register("product_currency_question", match_product_currency_question, handle_product_question)
+    grammar.register("basket_question", match_basket_question, handle_basket_question, before="product_question")
+    grammar.register("product_history_question", match_product_history_question, handle_product_history_question,
+                     before="product_price_definition")
+    return grammar
+
+
+# statement types whose answers only depend on the knowledge, so they can be cached until it changes
+CACHEABLE_KINDS = {"foreign_question", "product_question", "reverse_question", "currency_question",
+                   "product_currency_question", "product_history_question", "basket_question"}
+
+
+def dispatch(inputs, translator, grammar, response_cache=None):
+    """
+    Classifies one tokenized input line and passes the parse result to the matching handler.
+    :param inputs: Input list of strings.
+    :param translator: Translator instance to handle the input.
+    :param grammar: Grammar of all statement types.
+    :param response_cache: Optional ResponseCache. Repeated questions are answered from it without being parsed,
+        as long as the knowledge did not change.
+    """
+    if response_cache is not None:
+        line = " ".join(inputs)
+        answer = response_cache.get(line, translator.generation)
+        if answer is not None:
+            if METRICS.enabled:
+                METRICS.call("cached answer", sys.stdout.write, answer)
+            else:
+                sys.stdout.write(answer)
+            return
+
+    parsed = grammar.parse(inputs)
+    if parsed is None:
+        if METRICS.enabled:
+            METRICS.record_rejected()
+        print_error()
         return
-    except ForeignNumberException as e:
-        print(f"Unknown foreign number: {e}")
+
+    if parsed.kind in CACHEABLE_KINDS:
+        # all reads of a question see the same knowledge, even while another thread changes it
+        translator = translator.reader()
+    if response_cache is not None and parsed.kind in CACHEABLE_KINDS:
+        # imported on the first miss, see the startup of MainSolution1
+        from Solution1.LineOutput import LineCapture
+
+        generation = translator.generation
+        out = io.StringIO()
+        try:
+            # only the output of this line is captured, not the one of other threads or server sessions
+            with LineCapture(out):
+                _call_handler(parsed, translator, grammar)
+        finally:
+            answer = out.getvalue()
+            sys.stdout.write(answer)
+        response_cache.put(line, answer, generation)
         return
 
+    _call_handler(parsed, translator, grammar)
+
 
-def is_product_question(inputs: list[str]) -> bool:
+def _call_handler(parsed: ParsedLine, translator, grammar):
+    if METRICS.enabled:
+        METRICS.call(parsed.kind, grammar.handlers[parsed.kind], parsed, translator)
+    else:
+        grammar.handlers[parsed.kind](parsed, translator)
+
+
+def read_lines(stream):
     """
-    Checks if the input is a product question by verifying that it starts with "how many coins is" and ends with a question mark.
-    For example, "how many coins is unu kvin Silver ?".
-    :param inputs: Input list of strings.
-    :return: True if the input is a product question, False otherwise.
+    Lazily yields the lines of a text stream.
+    :param stream: Text stream, e.g. an opened file or stdin.
+    :return: Generator over the lines of the stream.
     """
-    return (
-            len(inputs) >= 6  # at least 6 words are needed
-            and inputs[0].lower() == "how"
-            and inputs[1].lower() == "many"
-            and inputs[2].lower() == "coins"
-            and inputs[3].lower() == "is"
-            and inputs[-1] == "?"
-    )
+    for line in stream:
+        yield line
 
 
-def handle_product_question(inputs, translator):
+def tokenize(lines):
     """
-    Handles the product question by translating the foreign numbers to Roman numerals, calculating their value, and multiplying it by the known product price.
-    :param inputs: Input list of strings, which should contain foreign numbers, a product name, and end with a question mark.
-    :param translator: Translator instance to handle the product price logic.
-    :raises ProductException: If no product name is found in the input.
-    :raises ForeignNumberException: If an unknown foreign number is encountered in the input.
+    Lazily splits lines into their words, exactly like the interactive prompt does.
+    :param lines: Iterable of input lines.
+    :return: Generator over the input lists of strings.
     """
-    try:
-        # Extract inputs
-        product_name = extract_product_name(inputs)
-        filtered_inputs = remove_keywords(inputs, {'how', 'many', 'coins', 'is', product_name, '?'})
-        all_foreign_numbers = translator.extract_all_foreign_numbers(filtered_inputs)
+    for line in lines:
+        yield line.split()
 
-        translated = translator.calc_foreign_numbers(all_foreign_numbers)
-        product_price = translator.get_product_price(product_name)
-        total = translated * product_price
-        print(f"{' '.join(all_foreign_numbers)} {product_name} is {total} coins")
 
-    except ProductException as e:
-        print(e)
-        return
-    except ForeignNumberException as e:
-        print(f"Unknown foreign number: {e}")
+def run_batch(stream, translator, grammar, out, response_cache=None) -> int:
+    """
+    Processes all lines of a stream without prompting. Every answer is written to the given writer instead of
+    being printed line by line, so the output is the same as in the interactive mode.
+    Processing stops at the end of the stream or at the first exit command.
+    :param stream: Text stream with one note or question per line.
+    :param translator: Translator instance to handle the inputs.
+    :param grammar: Grammar of all statement types.
+    :param out: Writer receiving all answers.
+    :param response_cache: Optional ResponseCache for repeated questions, see dispatch.
+    :return: Number of processed lines.
+    """
+    from contextlib import redirect_stdout
+
+    processed = 0
+    with redirect_stdout(out):
+        try:
+            for inputs in tokenize(read_lines(stream)):
+                processed += 1
+                dispatch(inputs, translator, grammar, response_cache)
+        except SystemExit:
+            pass
+        finally:
+            out.flush()
+    return processed
+
+
+def run_batch_file(path: str, translator, grammar, buffer_size: int = 1 << 20, workers: int = 1,
+                   response_cache=None):
+    """
+    Runs the batch mode for a file or stdin ("-") and reports the throughput on stderr.
+    :param path: Path of the input file or "-" for stdin.
+    :param translator: Translator instance to handle the inputs.
+    :param grammar: Grammar of all statement types.
+    :param buffer_size: Size of the output buffer in bytes.
+    :param workers: Number of worker processes answering the questions. 1 processes everything in this process.
+    :param response_cache: Optional ResponseCache for repeated questions (only used without workers).
+    """
+    if workers == 1:
+        def runner(stream, translator_, grammar_, out_):
+            return run_batch(stream, translator_, grammar_, out_, response_cache)
+    else:
+        from Solution1.ParallelBatch import run_parallel_batch
+
+        def runner(stream, translator_, grammar_, out_):
+            return run_parallel_batch(stream, translator_, grammar_, out_, workers=workers or None)
+
+    out = io.TextIOWrapper(io.BufferedWriter(io.FileIO(sys.stdout.fileno(), "w", closefd=False), buffer_size),
+                           encoding=sys.stdout.encoding, newline="\n", write_through=False)
+    start = time.perf_counter()
+    if path == "-":
+        processed = runner(sys.stdin, translator, grammar, out)
+    else:
+        with open(path, "r") as stream:
+            processed = runner(stream, translator, grammar, out)
+    elapsed = time.perf_counter() - start
+    out.close()
+
+    rate = processed / elapsed if elapsed > 0 else float("inf")
+    print(f"Processed {processed} lines in {elapsed:.3f} s ({rate:.0f} lines/sec)", file=sys.stderr)
+
+
+# options without a value and their attribute in the parsed arguments, see parse_simple_arguments
+_FLAGS = {"--journal": "journal", "--metrics": "metrics", "--compact": "compact",
+          "--startup-profile": "startup_profile", "--price-history": "price_history"}
+
+
+def parse_simple_arguments(argv: list[str]):
+    """
+    Parses the arguments of the common short-lived invocations (no arguments, or --ask and flags) without argparse,
+    whose import costs more than answering a question.
+    :param argv: Command line arguments.
+    :return: The same namespace as parse_arguments returns, or None if argv needs the full parser.
+    """
+    from types import SimpleNamespace
+
+    values = {"batch": None, "serve": None, "journal": False, "metrics": False, "rounding": None, "workers": 1,
+              "compact": False, "ask": None, "startup_profile": False, "response_cache": 4096,
+              "price_history": False, "primary": None, "replica_of": None}
+    index = 0
+    while index < len(argv):
+        argument = argv[index]
+        if argument in _FLAGS:
+            values[_FLAGS[argument]] = True
+        elif argument == "--ask" and index + 1 < len(argv) and not argv[index + 1].startswith("-"):
+            index += 1
+            values["ask"] = argv[index]
+        else:
+            return None
+        index += 1
+    return SimpleNamespace(**values)
+
+
+def parse_arguments(argv: list[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Traders' Translator")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="Processes all lines of FILE (or stdin if omitted or '-') without prompting")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                        help="Serves the translator to many clients at ADDRESS ('host:port' or a Unix socket path)")
+    parser.add_argument("--journal", action="store_true",
+                        help="Journals every change next to the backup file and restores the knowledge on startup")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Collects handler metrics from the start (see the stats command)")
+    parser.add_argument("--rounding", choices=ROUNDING_MODES,
+                        help="Rounds the answered prices to integers instead of printing exact values")
+    parser.add_argument("--workers", type=int, default=1, metavar="N",
+                        help="Answers the questions of the batch mode in N worker processes (0: one per CPU)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Stores the product prices compactly, for knowledge bases with millions of products")
+    parser.add_argument("--ask", metavar="LINE",
+                        help="Answers a single note or question with the knowledge of the backup file and exits")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Reports on stderr how long the phases of the startup took")
+    parser.add_argument("--response-cache", type=int, default=4096, metavar="N",
+                        help="Caches the answers of up to N repeated questions until the knowledge changes (0: off)")
+    parser.add_argument("--price-history", action="store_true",
+                        help="Keeps every price change, so questions like 'how many coins was ... at 100 ?' work")
+    parser.add_argument("--primary", metavar="ADDRESS",
+                        help="Streams every change to replicas connecting to ADDRESS ('host:port' or a Unix socket)")
+    parser.add_argument("--replica-of", metavar="ADDRESS",
+                        help="Follows the primary at ADDRESS and applies its changes")
+    return parser.parse_args(argv)
+
+
+def report_startup(phases: list, main_start: float, cpu_time_before_main: float):
+    """
+    Prints the durations of the startup phases on stderr.
+    :param phases: List of (phase name, end time) tuples in the order of the phases.
+    :param main_start: Time at which main was called.
+    :param cpu_time_before_main: CPU time of the process when main was called (interpreter startup and imports).
+    """
+    lines = [("interpreter startup and imports (CPU)", cpu_time_before_main),
+             ("imports of MainSolution1", _IMPORT_END - _IMPORT_START)]
+    start = main_start
+    for phase, end in phases:
+        lines.append((phase, end - start))
+        start = end
+    lines.append(("total since main", start - main_start))
+
+    print("Startup profile:", file=sys.stderr)
+    for phase, seconds in lines:
+        print(f"  {phase:40} {seconds * 1000:8.1f} ms", file=sys.stderr)
+
+
+def main(argv: list[str] = None):
+    main_start = time.perf_counter()
+    cpu_time_before_main = time.process_time()
+    argv = [] if argv is None else argv
+    args = parse_simple_arguments(argv) or parse_arguments(argv)
+    phases = [("parse arguments", time.perf_counter())]
+
+    translator = Translator(r"./backup.pkl", journal=args.journal, price_rounding=args.rounding,
+                            compact=args.compact, price_history=args.price_history)
+    if args.journal or args.ask is not None:
+        # the backup is loaded when the first input needs the knowledge
+        translator.load_lazily()
+    if args.primary is not None:
+        from Solution1.Replication import ReplicationPrimary
+        ReplicationPrimary(translator, args.primary).start()
+    if args.replica_of is not None:
+        from Solution1.ConcurrentTranslator import ConcurrentTranslator
+        from Solution1.Replication import ReplicationReplica
+        # the changes are applied by another thread, so the inputs are answered from consistent snapshots
+        translator = ConcurrentTranslator(translator)
+        ReplicationReplica(translator, args.replica_of).start()
+    grammar = create_grammar(create_command_map())
+    response_cache = ResponseCache(args.response_cache) if args.response_cache > 0 else None
+    METRICS.enabled = args.metrics
+    phases.append(("create translator and grammar", time.perf_counter()))
+
+    if args.ask is not None:
+        try:
+            dispatch(args.ask.split(), translator, grammar)
+        finally:
+            phases.append(("answer, including the backup load", time.perf_counter()))
+            if args.startup_profile:
+                report_startup(phases, main_start, cpu_time_before_main)
         return
 
+    if args.startup_profile:
+        report_startup(phases, main_start, cpu_time_before_main)
 
-def main():
-    translator = Translator(r"./backup.pkl")
-    command_map = {
-        "exit": ExitCommand(),
-        "print": PrintCommand(),
-        "clear": ClearCommand(),
-        "reset": ResetCommand(),
-        "help": HelpCommand(),
-        "save": SaveCommand(),
-        "load": LoadCommand(),
-    }
+    if args.serve is not None:
+        from Solution1.TranslatorServer import run_server
+        run_server(translator, args.serve, response_cache)
+        return
+
+    if args.batch is not None:
+        run_batch_file(args.batch, translator, grammar, workers=args.workers, response_cache=response_cache)
+        return
 
     while True:
         inputs = list(map(str, input(">> Input: ").split()))
-
-        # edge case
-        if len(inputs) == 0:
-            print("Empty input. Showing help message...")
-            command_map["help"].handle(inputs, translator)
-            continue
-
-        if is_command(inputs, command_map):
-            handle_command(inputs, translator, command_map)
-        elif is_assignment(inputs, ):
-            handle_assignment(inputs, translator)
-        elif is_product_price_definition(inputs):
-            handle_product_price_definition(inputs, translator)
-        elif is_foreign_question(inputs):
-            handle_foreign_question(inputs, translator)
-        elif is_product_question(inputs):
-            handle_product_question(inputs, translator)
-        else:
-            print_error()
+        dispatch(inputs, translator, grammar, response_cache)
 
 
 if __name__ == '__main__':
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,160 @@
+""" Counters, error counts and latency histograms of the input handlers. """
+
+import time
+
+# Upper bounds of the latency buckets in microseconds, the last bucket collects everything slower
+_BUCKET_BOUNDS_US = [2 ** exponent for exponent in range(0, 21)]
+
+
+class HandlerMetrics:
+    """Metrics of one handler."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.errors = {}
+        self.buckets = [0] * (len(_BUCKET_BOUNDS_US) + 1)
+
+    def observe(self, elapsed_ns: int):
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        # bucket i holds latencies up to 2^i microseconds (1 microsecond ~ 2^10 nanoseconds)
+        index = max(0, (elapsed_ns - 1).bit_length() - 10)
+        self.buckets[min(index, len(self.buckets) - 1)] += 1
+
+    def merge(self, other: "HandlerMetrics"):
+        """Adds the calls, errors and latencies of other metrics of the same handler, e.g. of a worker process."""
+        self.calls += other.calls
+        self.total_ns += other.total_ns
+        for error, count in other.errors.items():
+            self.errors[error] = self.errors.get(error, 0) + count
+        self.buckets = [count + other_count for count, other_count in zip(self.buckets, other.buckets)]
+
+    def percentile(self, fraction: float) -> int:
+        """Returns the upper bound in microseconds of the bucket containing the given fraction of all calls."""
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return _BUCKET_BOUNDS_US[min(index, len(_BUCKET_BOUNDS_US) - 1)]
+        return 0
+
+
+class Metrics:
+    """
+    Collects per handler metrics. When disabled, the only overhead is one attribute check per input line.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.handlers = {}
+        self.rejected = 0
+        self._current = None
+        self._profiler = None
+
+    def call(self, name: str, handler, *args):
+        """
+        Calls a handler and records its latency. Errors reported while it runs are attributed to it.
+        :param name: Name of the handler in the metrics.
+        :param handler: Function to be called.
+        :param args: Arguments of the handler.
+        """
+        metrics = self.handlers.get(name)
+        if metrics is None:
+            metrics = self.handlers[name] = HandlerMetrics()
+        outer = self._current
+        self._current = metrics
+        start = time.perf_counter_ns()
+        try:
+            return handler(*args)
+        finally:
+            metrics.observe(time.perf_counter_ns() - start)
+            self._current = outer
+
+    def record_error(self, error_type: str):
+        """
+        Counts an error of the currently running handler.
+        :param error_type: Name of the error, usually the name of the exception class.
+        """
+        if not self.enabled or self._current is None:
+            return
+        errors = self._current.errors
+        errors[error_type] = errors.get(error_type, 0) + 1
+
+    def record_rejected(self):
+        """Counts an input line that did not match any statement type."""
+        self.rejected += 1
+
+    def reset(self):
+        self.handlers = {}
+        self.rejected = 0
+
+    def merge(self, handlers: dict, rejected: int):
+        """
+        Adds metrics collected elsewhere, e.g. in a worker process.
+        :param handlers: HandlerMetrics by handler name.
+        :param rejected: Number of rejected lines.
+        """
+        for name, other in handlers.items():
+            metrics = self.handlers.get(name)
+            if metrics is None:
+                metrics = self.handlers[name] = HandlerMetrics()
+            metrics.merge(other)
+        self.rejected += rejected
+
+    def snapshot(self) -> str:
+        """
+        Returns all metrics as text.
+        :return: One line per handler with its calls, errors and latencies, followed by the latency histograms.
+        """
+        lines = [f"metrics enabled: {self.enabled}", f"rejected lines: {self.rejected}"]
+        for name, metrics in sorted(self.handlers.items()):
+            mean_us = metrics.total_ns / metrics.calls / 1000 if metrics.calls else 0
+            errors = ", ".join(f"{error}={count}" for error, count in sorted(metrics.errors.items())) or "none"
+            lines.append(f"{name}: calls={metrics.calls} errors=[{errors}] mean={mean_us:.1f}us "
+                         f"p50<={metrics.percentile(0.5)}us p99<={metrics.percentile(0.99)}us")
+        for name, metrics in sorted(self.handlers.items()):
+            histogram = []
+            for index, count in enumerate(metrics.buckets):
+                if count:
+                    label = f"<={_BUCKET_BOUNDS_US[index]}us" if index < len(_BUCKET_BOUNDS_US) \
+                        else f">{_BUCKET_BOUNDS_US[-1]}us"
+                    histogram.append(f"{label}:{count}")
+            lines.append(f"histogram {name}: {' '.join(histogram)}")
+        return "\n".join(lines)
+
+    def start_profile(self):
+        """Starts capturing a cProfile of everything until stop_profile is called."""
+        import cProfile
+
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profile(self, path: str = None, limit: int = 20) -> str:
+        """
+        Stops the cProfile capture.
+        :param path: If given, the raw profile is dumped to this file (readable with pstats).
+        :param limit: Number of functions in the returned summary.
+        :return: Summary of the most expensive functions, with a note if the profile could not be dumped.
+        """
+        import io
+        import pstats
+
+        if self._profiler is None:
+            return "No profile running"
+        self._profiler.disable()
+        profiler, self._profiler = self._profiler, None
+        out = io.StringIO()
+        if path is not None:
+            try:
+                profiler.dump_stats(path)
+            except OSError as e:
+                # the summary is still shown, the profile is lost otherwise
+                out.write(f"Profile not saved: {e}\n")
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+METRICS = Metrics()
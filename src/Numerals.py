@@ -0,0 +1,282 @@
+""" Validation and evaluation of foreign numbers based on the Roman numeral rules. """
+
+from Solution1.TranslatorExceptions import ForeignNumberException, RomanNumeralException
+
+# (one, five, ten) of every decade below the thousands, from the highest to the lowest
+_DECADES = ((100, 500, 1000), (10, 50, 100), (1, 5, 10))
+
+# Transitions inside one decade. "sub" is reached by a subtraction (e.g. IV or IX) and closes the decade.
+_DECADE_MOVES = {
+    "one1": {"one": "one2", "five": "sub", "ten": "sub"},
+    "one2": {"one": "one3"},
+    "one3": {},
+    "five": {"one": "five1"},
+    "five1": {"one": "five2"},
+    "five2": {"one": "five3"},
+    "five3": {},
+    "sub": {},
+}
+
+
+def _build_roman_automaton() -> list[dict[int, int]]:
+    """
+    Builds a deterministic automaton that accepts exactly the valid Roman numerals, i.e. the language
+    M{0,3}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3}), read symbol by symbol as integer values.
+    State 0 is the start state, every other state is accepting.
+    :return: Transition table, indexed by state, mapping a symbol value to the next state.
+    """
+    # decade 0 are the thousands, decades 1 to 3 are the entries of _DECADES
+    states = [(0, "start"), (0, "M1"), (0, "M2"), (0, "M3")]
+    states += [(decade, sub) for decade in range(1, 4) for sub in _DECADE_MOVES]
+    state_ids = {state: index for index, state in enumerate(states)}
+
+    def entering_moves(decade: int) -> dict:
+        # every lower decade can be started with its "one" or "five" symbol
+        moves = {}
+        for lower in range(decade + 1, 4):
+            one, five, _ = _DECADES[lower - 1]
+            moves[one] = (lower, "one1")
+            moves[five] = (lower, "five")
+        return moves
+
+    table = []
+    for decade, sub in states:
+        moves = entering_moves(decade)
+        if decade == 0:
+            next_thousands = {"start": "M1", "M1": "M2", "M2": "M3"}.get(sub)
+            if next_thousands is not None:
+                moves[1000] = (0, next_thousands)
+        else:
+            symbols = dict(zip(("one", "five", "ten"), _DECADES[decade - 1]))
+            for symbol, target in _DECADE_MOVES[sub].items():
+                moves[symbols[symbol]] = (decade, target)
+        table.append({value: state_ids[target] for value, target in moves.items()})
+    return table
+
+
+ROMAN_AUTOMATON = _build_roman_automaton()
+ROMAN_SYMBOL_VALUES = (1, 5, 10, 50, 100, 500, 1000)
+
+
+def _build_automaton_matrix(np):
+    """
+    Converts ROMAN_AUTOMATON into a dense transition matrix for vectorized evaluation.
+    Rows are states plus a final dead state. Columns are ROMAN_SYMBOL_VALUES, followed by a padding column, which
+    keeps the current state, and a column for all other values, which always leads to the dead state.
+    """
+    dead = len(ROMAN_AUTOMATON)
+    matrix = np.full((dead + 1, len(ROMAN_SYMBOL_VALUES) + 2), dead, dtype=np.int16)
+    for state, moves in enumerate(ROMAN_AUTOMATON):
+        for value, target in moves.items():
+            matrix[state, ROMAN_SYMBOL_VALUES.index(value)] = target
+    matrix[:, len(ROMAN_SYMBOL_VALUES)] = np.arange(dead + 1)
+    return matrix
+
+
+class NumeralTable:
+    """Lookup structures derived from one foreign number vocabulary. Rebuilt whenever the vocabulary changes."""
+
+    def __init__(self, foreign_numbers: dict, roman_numbers: dict):
+        self.foreign_numbers = foreign_numbers
+        self.token_values = {token: roman_numbers[roman] for token, roman in foreign_numbers.items()
+                             if roman in roman_numbers}
+        self.roman_symbols = {value: roman for roman, value in roman_numbers.items()}
+        self._batch_tables = None
+        self._encoding_index = None
+
+    def export_tables(self) -> dict:
+        """
+        Returns the lookup structures built so far (without the NumPy tables), to be stored next to the vocabulary.
+        :return: Dictionary for from_tables.
+        """
+        return {"token_values": self.token_values, "roman_symbols": self.roman_symbols,
+                "encoding_index": self._encoding_index}
+
+    @classmethod
+    def from_tables(cls, foreign_numbers: dict, tables: dict) -> "NumeralTable":
+        """
+        Creates the table of a vocabulary from lookup structures stored by export_tables, without building them again.
+        :param foreign_numbers: Vocabulary the tables were exported from.
+        :param tables: Result of export_tables.
+        :return: The table.
+        """
+        table = cls.__new__(cls)
+        table.foreign_numbers = foreign_numbers
+        table.token_values = tables["token_values"]
+        table.roman_symbols = tables["roman_symbols"]
+        table._batch_tables = None
+        table._encoding_index = tables["encoding_index"]
+        return table
+
+    def calculate(self, values) -> int:
+        """
+        Calculates the value of foreign numbers without checking the Roman numeral rules.
+        :param values: Sequence of foreign number strings.
+        :return: Integer value of the foreign numbers.
+        :raises KeyError: If a value is not a known foreign number.
+        """
+        digits = [self.token_values[value] for value in values]
+
+        resu = 0
+        i = 0
+        while i < len(digits):
+            if i + 1 < len(digits) and digits[i] < digits[i + 1]:
+                resu += digits[i + 1] - digits[i]
+                i += 2
+            else:
+                resu += digits[i]
+                i += 1
+        return resu
+
+    def evaluate(self, values) -> int:
+        """
+        Validates foreign numbers against the Roman numeral rules and calculates their value in one pass.
+        :param values: Sequence of foreign number strings.
+        :return: Integer value of the foreign numbers.
+        :raises ForeignNumberException: If a value is not a known foreign number.
+        :raises RomanNumeralException: If the values do not form a valid Roman numeral.
+        """
+        if len(values) == 0:
+            raise RomanNumeralException("No foreign numbers given")
+
+        token_values = self.token_values
+        state = 0
+        total = 0
+        previous = 0
+        for position, token in enumerate(values):
+            value = token_values.get(token)
+            if value is None:
+                if token not in self.foreign_numbers:
+                    raise ForeignNumberException(token)
+                raise RomanNumeralException(f"'{token}' is not translated to a Roman numeral")
+
+            state = ROMAN_AUTOMATON[state].get(value)
+            if state is None:
+                raise RomanNumeralException(f"'{token}' is not allowed at position {position + 1}")
+
+            # a smaller value before a larger one was added once already, so it has to be removed twice
+            total += value - 2 * previous if previous < value else value
+            previous = value
+        return total
+
+    def _build_encoding_index(self) -> list:
+        """
+        Writes every number from 1 to 3999 with the foreign numbers. If a Roman symbol has several foreign numbers,
+        the first defined one is used.
+        :return: List indexed by the number with the space separated foreign numbers, or with the value of the
+            missing Roman symbol if the vocabulary cannot express the number.
+        """
+        symbol_tokens = {}
+        for token, value in self.token_values.items():
+            symbol_tokens.setdefault(value, token)
+
+        def decade_parts(one: int, five: int, ten: int) -> list:
+            # canonical symbols of the digits 0 to 9 in one decade
+            patterns = [[], [one], [one] * 2, [one] * 3, [one, five], [five], [five, one], [five] + [one] * 2,
+                        [five] + [one] * 3, [one, ten]]
+            parts = []
+            for pattern in patterns:
+                missing = [value for value in pattern if value not in symbol_tokens]
+                parts.append(missing[0] if missing else [symbol_tokens[value] for value in pattern])
+            return parts
+
+        thousands = [[]] + ([[symbol_tokens[1000]] * count for count in range(1, 4)] if 1000 in symbol_tokens
+                            else [1000] * 3)
+        decades = [thousands] + [decade_parts(*decade) for decade in _DECADES]
+        index = [None]
+        for number in range(1, 4000):
+            tokens = []
+            for position, parts in enumerate(decades):
+                part = parts[number // 10 ** (3 - position) % 10]
+                if isinstance(part, int):
+                    tokens = part
+                    break
+                tokens += part
+            index.append(tokens if isinstance(tokens, int) else " ".join(tokens))
+        return index
+
+    def encode(self, number: int) -> str:
+        """
+        Writes a number with the foreign numbers in canonical Roman numeral form.
+        :param number: Number from 1 to 3999.
+        :return: Space separated foreign numbers.
+        :raises RomanNumeralException: If the number cannot be written as Roman numeral.
+        :raises ForeignNumberException: If the vocabulary lacks a foreign number for a needed Roman symbol.
+        """
+        if not 1 <= number <= 3999:
+            raise RomanNumeralException(f"{number} cannot be written with Roman numerals (only 1 to 3999)")
+        if self._encoding_index is None:
+            self._encoding_index = self._build_encoding_index()
+
+        encoded = self._encoding_index[number]
+        if isinstance(encoded, int):
+            symbol = self.roman_symbols.get(encoded, encoded)
+            raise ForeignNumberException(f"No foreign number is defined for the Roman numeral '{symbol}'")
+        return encoded
+
+    def _get_batch_tables(self, np):
+        """Integer codes of all tokens and the per-code arrays used by evaluate_batch. Code 0 is the padding."""
+        if self._batch_tables is None:
+            token_codes = {token: code for code, token in enumerate(self.token_values, start=1)}
+            code_values = np.zeros(len(token_codes) + 1, dtype=np.int64)
+            code_values[1:] = list(self.token_values.values())
+            padding_symbol = len(ROMAN_SYMBOL_VALUES)
+            code_symbols = np.array([padding_symbol] + [
+                ROMAN_SYMBOL_VALUES.index(value) if value in ROMAN_SYMBOL_VALUES else padding_symbol + 1
+                for value in self.token_values.values()
+            ], dtype=np.int64)
+            self._batch_tables = (token_codes, code_values, code_symbols, _build_automaton_matrix(np))
+        return self._batch_tables
+
+    def evaluate_batch(self, phrases, validate: bool = False):
+        """
+        Calculates the values of many foreign number phrases at once with NumPy. The results are the same as the
+        ones of Translator.calc_foreign_numbers.
+        :param phrases: Iterable of phrases, each one a list of foreign number strings or a space separated string.
+        :param validate: If True, phrases violating the Roman numeral rules are marked as invalid as well.
+        :return: Tuple of an int64 array with the values and a boolean array marking invalid phrases (value 0).
+        """
+        import numpy as np
+
+        token_codes, code_values, code_symbols, automaton = self._get_batch_tables(np)
+        phrases = [phrase.split() if isinstance(phrase, str) else phrase for phrase in phrases]
+        count = len(phrases)
+        lengths = np.fromiter((len(phrase) for phrase in phrases), dtype=np.int64, count=count)
+        total_tokens = int(lengths.sum())
+        # unknown tokens get the code -1
+        flat_codes = np.fromiter((token_codes.get(token, -1) for phrase in phrases for token in phrase),
+                                 dtype=np.int64, count=total_tokens)
+
+        invalid = np.zeros(count, dtype=bool)
+        unknown = flat_codes < 0
+        if unknown.any():
+            invalid[np.repeat(np.arange(count), lengths)[unknown]] = True
+            flat_codes[unknown] = 0
+
+        # pack the ragged phrases into a padded matrix of codes
+        width = int(lengths.max()) if count else 0
+        columns = np.arange(width)
+        codes = np.zeros((count, width), dtype=np.int64)
+        codes[columns < lengths[:, None]] = flat_codes
+        digits = code_values[codes]
+
+        # A digit is subtracted if it is smaller than its successor and not already the second digit of a pair.
+        # Inside a run of ascending neighbours the pairs start at every second position of the run.
+        ascending = np.zeros((count, width), dtype=bool)
+        ascending[:, :-1] = digits[:, :-1] < digits[:, 1:]
+        run_start = ascending.copy()
+        run_start[:, 1:] &= ~ascending[:, :-1]
+        run_start_index = np.maximum.accumulate(np.where(run_start, columns, 0), axis=1)
+        subtracted = ascending & ((columns - run_start_index) % 2 == 0)
+        values = np.where(subtracted, -digits, digits).sum(axis=1)
+
+        if validate:
+            states = np.zeros(count, dtype=np.int64)
+            symbols = code_symbols[codes]
+            for column in range(width):
+                states = automaton[states, symbols[:, column]]
+            dead = automaton.shape[0] - 1
+            invalid |= (states == 0) | (states == dead)
+
+        values[invalid] = 0
+        return values, invalid
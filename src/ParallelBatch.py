@@ -0,0 +1,128 @@
+""" Batch mode answering questions in a pool of worker processes. """
+
+import io
+import os
+import pickle
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from Solution1.MainSolution1 import create_command_map, create_grammar, dispatch, read_lines, tokenize
+from Solution1.Metrics import METRICS
+from Solution1.Translator import Translator
+
+# Statement types, which do not change the state of the translator and can be answered by any worker
+READ_ONLY_KINDS = {"foreign_question", "product_question", "reverse_question", "currency_question",
+                   "product_currency_question", "basket_question"}
+
+# State of a worker process, reused as long as the snapshot does not change
+_worker_state = {"snapshot_id": None, "translator": None, "grammar": None}
+
+
+def _answer_chunk(snapshot_id: int, snapshot_path: str, price_rounding: str, metrics_enabled: bool,
+                  lines: list[str]) -> tuple:
+    """
+    Answers a chunk of question lines in a worker process.
+    :param snapshot_id: Id of the snapshot. The worker only reads the snapshot and rebuilds its translator if the id
+        changes.
+    :param snapshot_path: Path of the pickled snapshot of the translator knowledge, see Translator.get_snapshot.
+    :param price_rounding: Rounding mode of the prices, see Translator.
+    :param metrics_enabled: Whether the metrics are collected, see Metrics.enabled.
+    :param lines: Question lines.
+    :return: Tuple of all answers as they would have been printed and the metrics of the chunk (the handler metrics
+        and the number of rejected lines, see Metrics.merge) or None.
+    """
+    if _worker_state["snapshot_id"] != snapshot_id:
+        translator = Translator(backup_path=None, price_rounding=price_rounding)
+        with open(snapshot_path, "rb") as f:
+            translator.restore_snapshot(pickle.load(f))
+        _worker_state.update(snapshot_id=snapshot_id, translator=translator,
+                             grammar=create_grammar(create_command_map()))
+
+    translator = _worker_state["translator"]
+    grammar = _worker_state["grammar"]
+    METRICS.enabled = metrics_enabled
+    METRICS.reset()
+    out = io.StringIO()
+    with redirect_stdout(out):
+        for inputs in tokenize(lines):
+            dispatch(inputs, translator, grammar)
+    return out.getvalue(), (METRICS.handlers, METRICS.rejected) if metrics_enabled else None
+
+
+def run_parallel_batch(stream, translator, grammar, out, workers: int = None, chunk_size: int = 10000) -> int:
+    """
+    Processes all lines of a stream like run_batch, but answers the questions in a pool of worker processes.
+    All other lines (definitions and commands) are handled in order by this process. They split the input into
+    segments: the questions of a segment are answered by workers started from a snapshot of the knowledge that was
+    taken at the beginning of the segment, so the output is exactly the same as the one of the sequential mode. The
+    metrics of the workers are added to the ones of this process, so stats shows the same counts as without workers.
+    The snapshot is written once per segment into a temporary file, which every worker reads once, instead of sending
+    the whole knowledge with every chunk.
+    :param stream: Text stream with one note or question per line.
+    :param translator: Translator instance to handle the inputs.
+    :param grammar: Grammar of all statement types.
+    :param out: Writer receiving all answers.
+    :param workers: Number of worker processes, defaults to the number of CPUs.
+    :param chunk_size: Number of question lines sent to a worker at once.
+    :return: Number of processed lines.
+    """
+    processed = 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor, tempfile.TemporaryDirectory() as directory, redirect_stdout(out):
+        max_in_flight = 2 * workers
+        in_flight = deque()
+        chunk = []
+        segment = {"id": 0, "snapshot_path": None}
+
+        def submit_chunk():
+            if segment["snapshot_path"] is None:
+                segment["snapshot_path"] = os.path.join(directory, f"segment-{segment['id']}.pkl")
+                with open(segment["snapshot_path"], "wb") as f:
+                    pickle.dump(translator.get_snapshot(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            in_flight.append(executor.submit(_answer_chunk, segment["id"], segment["snapshot_path"],
+                                             translator.price_rounding, METRICS.enabled, list(chunk)))
+            chunk.clear()
+            # the answers are written in input order, which also limits the number of pending chunks
+            while len(in_flight) > max_in_flight:
+                write_result()
+
+        def write_result():
+            answers, metrics = in_flight.popleft().result()
+            out.write(answers)
+            if metrics is not None:
+                METRICS.merge(*metrics)
+
+        def finish_segment():
+            if chunk:
+                submit_chunk()
+            while in_flight:
+                write_result()
+            # all workers which need the snapshot of the segment are done
+            if segment["snapshot_path"] is not None:
+                os.remove(segment["snapshot_path"])
+                segment["snapshot_path"] = None
+
+        try:
+            for line in read_lines(stream):
+                processed += 1
+                inputs = line.split()
+                parsed = grammar.parse(inputs)
+                # unknown lines are answered with the error message by the workers as well
+                if parsed is None or parsed.kind in READ_ONLY_KINDS:
+                    chunk.append(line)
+                    if len(chunk) >= chunk_size:
+                        submit_chunk()
+                    continue
+
+                # definitions and commands may change the knowledge and start a new segment
+                finish_segment()
+                segment["id"] += 1
+                dispatch(inputs, translator, grammar)
+            finish_segment()
+        except SystemExit:
+            pass
+        finally:
+            out.flush()
+    return processed
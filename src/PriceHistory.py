@@ -0,0 +1,260 @@
+""" Versioned history of product prices with as-of queries. """
+
+import os
+import struct
+from array import array
+from bisect import bisect_right
+
+from Solution1.Pricing import Price
+
+# block of one product in the history file: name length, number of versions, first and last version, price format
+_BLOCK_HEADER = struct.Struct("<IIqqB")
+# the columns are written with array.tobytes, i.e. in native byte order
+_INT64 = struct.Struct("=q")
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+# prices stored in two int64 columns, or pickled as list of Price if one of them does not fit into int64. A block
+# without versions and with an empty name only records the last version (see delete).
+_INT64_PRICES = 0
+_PICKLED_PRICES = 1
+
+
+class PriceHistory:
+    """
+    Every price change of the knowledge base as a new version. Versions are numbered by the order of all price changes
+    (entry 1 is the first price ever defined). The versions of every product are kept in append-only int64 columns
+    (versions, numerators and denominators), so an as-of query is a binary search over one column.
+    compact() moves all versions in memory into blocks appended to the history file. Only the positions of the blocks
+    stay in memory; a query of an old version reads the version column of one block. The numbering continues after the
+    last version in the history file, also across sessions and after delete.
+    """
+
+    def __init__(self, path: str = None, memory_limit: int = 100000):
+        """
+        :param path: Path of the history file, None to keep the history in memory only.
+        :param memory_limit: Number of versions in memory after which they are moved into the history file.
+        """
+        self.path = path
+        self.memory_limit = memory_limit
+        self.version = 0
+        # versions in memory by product: arrays of versions, numerators and denominators
+        self.columns = {}
+        # prices beyond int64 by product and index in the columns, their denominator in the column is 0
+        self._large = {}
+        self._in_memory = 0
+        # blocks in the history file by product: list of (first version, last version, offset of the block)
+        self.blocks = {}
+        self._file = None
+        if path is not None and os.path.exists(path):
+            self.restore(None)
+
+    def record(self, product: str, price: Price) -> int:
+        """
+        Adds a new version of the price of a product.
+        :return: The version (entry) number of the change.
+        """
+        self.version += 1
+        columns = self.columns.get(product)
+        if columns is None:
+            columns = self.columns[product] = (array("q"), array("q"), array("q"))
+        versions, numerators, denominators = columns
+        versions.append(self.version)
+        # both are checked before appending, so the columns always have the same length
+        if _INT64_MIN <= price.numerator <= _INT64_MAX and price.denominator <= _INT64_MAX:
+            numerators.append(price.numerator)
+            denominators.append(price.denominator)
+        else:
+            numerators.append(0)
+            denominators.append(0)
+            self._large[product, len(versions) - 1] = price
+        self._in_memory += 1
+        if self._in_memory >= self.memory_limit and self.path is not None:
+            self.compact()
+        return self.version
+
+    def price_at(self, product: str, entry: int) -> Price:
+        """
+        Returns the price of a product as it was after a given entry.
+        :param product: Product name.
+        :param entry: Version number, see record.
+        :return: The price of the last change of the product up to the entry.
+        :raises KeyError: If the product had no price at that entry.
+        """
+        columns = self.columns.get(product)
+        if columns is not None and columns[0][0] <= entry:
+            index = bisect_right(columns[0], entry) - 1
+            denominator = columns[2][index]
+            if denominator == 0:
+                return self._large[product, index]
+            return Price.from_reduced(columns[1][index], denominator)
+
+        blocks = self.blocks.get(product, ())
+        index = bisect_right(blocks, entry, key=lambda block: block[0]) - 1
+        if index < 0:
+            raise KeyError(product)
+        return self._read_price(blocks[index][2], entry)
+
+    def versions(self, product: str) -> list[tuple]:
+        """
+        Returns all versions of a product, including the ones in the history file.
+        :return: List of (version, price) tuples in the order of the versions.
+        """
+        result = []
+        for _, _, offset in self.blocks.get(product, ()):
+            versions, prices = self._read_block(offset)
+            result.extend(zip(versions, prices))
+        columns = self.columns.get(product)
+        if columns is not None:
+            for version in columns[0]:
+                result.append((version, self.price_at(product, version)))
+        return result
+
+    def compact(self) -> int:
+        """
+        Appends all versions in memory to the history file as one block per product and drops them from memory.
+        :return: Number of moved versions.
+        """
+        import pickle
+
+        if self.path is None or not self.columns:
+            return 0
+        moved = self._in_memory
+        file = self._open()
+        file.seek(0, os.SEEK_END)
+        for product, (versions, numerators, denominators) in self.columns.items():
+            name = product.encode("utf-8")
+            large = any(denominator == 0 for denominator in denominators)
+            offset = file.tell()
+            file.write(_BLOCK_HEADER.pack(len(name), len(versions), versions[0], versions[-1],
+                                          _PICKLED_PRICES if large else _INT64_PRICES))
+            file.write(name)
+            file.write(versions.tobytes())
+            if large:
+                pickle.dump([self._large[product, index] if denominator == 0
+                             else Price.from_reduced(numerators[index], denominator)
+                             for index, denominator in enumerate(denominators)], file)
+            else:
+                file.write(numerators.tobytes())
+                file.write(denominators.tobytes())
+            self.blocks.setdefault(product, []).append((versions[0], versions[-1], offset))
+        file.flush()
+        os.fsync(file.fileno())
+        self.columns = {}
+        self._large = {}
+        self._in_memory = 0
+        return moved
+
+    def restore(self, version: int = None):
+        """
+        Drops the versions in memory and reads the block positions of the history file. Blocks with versions after
+        the given one (moved after the last save of the knowledge) are cut off, since they are recorded again when
+        the journal is replayed.
+        :param version: Last version which was saved together with the knowledge, None to keep all blocks and to
+            continue after the last version in the history file.
+        """
+        self.close()
+        self.version = 0 if version is None else version
+        self.columns = {}
+        self._large = {}
+        self._in_memory = 0
+        self.blocks = {}
+        if self.path is None or not os.path.exists(self.path):
+            return
+
+        import pickle
+
+        file = self._open()
+        size = os.fstat(file.fileno()).st_size
+        offset = 0
+        while offset + _BLOCK_HEADER.size <= size:
+            file.seek(offset)
+            name_length, count, first_version, last_version, price_format = _BLOCK_HEADER.unpack(
+                file.read(_BLOCK_HEADER.size))
+            if version is not None and last_version > version:
+                break
+            product = file.read(name_length).decode("utf-8", errors="replace")
+            file.seek(8 * count, os.SEEK_CUR)
+            try:
+                if price_format == _PICKLED_PRICES:
+                    pickle.load(file)
+                else:
+                    file.seek(16 * count, os.SEEK_CUR)
+            except (EOFError, pickle.UnpicklingError):
+                break
+            # a block torn by a crash while compacting is cut off
+            if file.tell() > size:
+                break
+            if count:
+                self.blocks.setdefault(product, []).append((first_version, last_version, offset))
+            self.version = max(self.version, last_version)
+            offset = file.tell()
+        if offset < size:
+            file.truncate(offset)
+
+    def delete(self):
+        """
+        Deletes the whole history, including the history file. The numbering of the versions continues, the last
+        version is kept in an otherwise empty history file.
+        """
+        version = self.version
+        self.restore(0)
+        self.close()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        self.version = version
+        if self.path is not None and version:
+            file = self._open()
+            file.write(_BLOCK_HEADER.pack(0, 0, version, version, _INT64_PRICES))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "r+b" if os.path.exists(self.path) else "w+b")
+        return self._file
+
+    def _read_header(self, offset: int) -> tuple:
+        """
+        :return: Tuple of the number of versions, the price format and the offset of the version column of a block.
+        """
+        file = self._open()
+        file.seek(offset)
+        name_length, count, _, _, price_format = _BLOCK_HEADER.unpack(file.read(_BLOCK_HEADER.size))
+        return count, price_format, offset + _BLOCK_HEADER.size + name_length
+
+    def _read_price(self, offset: int, entry: int) -> Price:
+        """Returns the price of the last version up to the entry in the block at the offset."""
+        count, price_format, versions_offset = self._read_header(offset)
+        file = self._file
+        file.seek(versions_offset)
+        versions = array("q")
+        versions.frombytes(file.read(8 * count))
+        index = bisect_right(versions, entry) - 1
+        if price_format == _PICKLED_PRICES:
+            import pickle
+            return pickle.load(file)[index]
+        file.seek(versions_offset + 8 * (count + index))
+        numerator = _INT64.unpack(file.read(8))[0]
+        file.seek(versions_offset + 8 * (2 * count + index))
+        return Price.from_reduced(numerator, _INT64.unpack(file.read(8))[0])
+
+    def _read_block(self, offset: int) -> tuple:
+        """:return: Tuple of the versions and the prices of the block at the offset."""
+        import pickle
+
+        count, price_format, versions_offset = self._read_header(offset)
+        file = self._file
+        file.seek(versions_offset)
+        versions = array("q")
+        versions.frombytes(file.read(8 * count))
+        if price_format == _PICKLED_PRICES:
+            return versions, pickle.load(file)
+        numerators, denominators = array("q"), array("q")
+        numerators.frombytes(file.read(8 * count))
+        denominators.frombytes(file.read(8 * count))
+        return versions, [Price.from_reduced(numerator, denominator)
+                          for numerator, denominator in zip(numerators, denominators)]
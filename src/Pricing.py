@@ -0,0 +1,168 @@
+""" Exact product prices as reduced integer fractions. """
+
+from math import gcd, isfinite
+
+ROUNDING_MODES = ("floor", "ceil", "half_up", "half_even")
+
+
+class Price:
+    """
+    Exact price in coins, stored as a reduced fraction of two integers. All calculations stay in integer arithmetic.
+    """
+
+    __slots__ = ("numerator", "denominator")
+
+    def __init__(self, numerator: int, denominator: int = 1):
+        """
+        :param numerator: Numerator of the price.
+        :param denominator: Denominator of the price.
+        :raises ZeroDivisionError: If the denominator is 0.
+        """
+        if denominator == 0:
+            raise ZeroDivisionError("Price with denominator 0")
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+        divisor = gcd(numerator, denominator)
+        self.numerator = numerator // divisor
+        self.denominator = denominator // divisor
+
+    @classmethod
+    def from_value(cls, value) -> "Price":
+        """
+        Converts a number to a price.
+        :param value: Price, int, Fraction, a string like "17", "3/2" or "1.5", or a float. Floats (e.g. from old
+            backups) are converted to the closest fraction with a denominator of at most one million.
+        :return: The price.
+        :raises ValueError: If the value is not a number.
+        """
+        if isinstance(value, Price):
+            return value
+        if isinstance(value, int):
+            return cls(value)
+        # imported here, since fractions is slow to import and only needed for floats and strings
+        from fractions import Fraction
+
+        if isinstance(value, float):
+            value = Fraction(value).limit_denominator(1000000)
+        else:
+            value = Fraction(value)
+        return cls(value.numerator, value.denominator)
+
+    @classmethod
+    def from_reduced(cls, numerator: int, denominator: int) -> "Price":
+        """Creates a price from an already reduced fraction with a positive denominator, without checking it."""
+        price = cls.__new__(cls)
+        price.numerator = numerator
+        price.denominator = denominator
+        return price
+
+    def times(self, quantity: int) -> "Price":
+        """Returns the price of the given quantity."""
+        return Price(self.numerator * quantity, self.denominator)
+
+    def is_integer(self) -> bool:
+        return self.denominator == 1
+
+    def format(self, rounding: str = None) -> str:
+        """
+        Formats the price.
+        :param rounding: None for the exact value, otherwise one of ROUNDING_MODES to round to an integer.
+        :return: The integer, if the price is an integer or rounded; the exact decimal, if it has a finite one;
+            otherwise the fraction like "10/3".
+        :raises ValueError: If the rounding mode is unknown.
+        """
+        numerator, denominator = self.numerator, self.denominator
+        if denominator == 1:
+            return str(numerator)
+        if rounding is not None:
+            return str(self.round(rounding))
+
+        # a decimal is finite if the denominator has no other prime factors than 2 and 5
+        twos = fives = 0
+        rest = denominator
+        while rest % 2 == 0:
+            rest //= 2
+            twos += 1
+        while rest % 5 == 0:
+            rest //= 5
+            fives += 1
+        if rest != 1:
+            return f"{numerator}/{denominator}"
+
+        places = max(twos, fives)
+        scaled = abs(numerator) * 10 ** places // denominator
+        sign = "-" if numerator < 0 else ""
+        integer_part, fraction_part = divmod(scaled, 10 ** places)
+        return f"{sign}{integer_part}.{str(fraction_part).rjust(places, '0').rstrip('0')}"
+
+    def round(self, rounding: str) -> int:
+        """
+        Rounds the price to an integer.
+        :param rounding: One of ROUNDING_MODES.
+        :return: The rounded price.
+        :raises ValueError: If the rounding mode is unknown.
+        """
+        quotient, remainder = divmod(self.numerator, self.denominator)
+        if rounding == "floor" or remainder == 0:
+            return quotient
+        if rounding == "ceil":
+            return quotient + 1
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f"Unknown rounding mode '{rounding}'")
+        twice = 2 * remainder
+        if twice > self.denominator or (twice == self.denominator and (rounding == "half_up" or quotient % 2 == 1)):
+            return quotient + 1
+        return quotient
+
+    def __mul__(self, quantity):
+        if isinstance(quantity, int):
+            return self.times(quantity)
+        if isinstance(quantity, Price):
+            return Price(self.numerator * quantity.numerator, self.denominator * quantity.denominator)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor):
+        """
+        :raises ZeroDivisionError: If the divisor is 0.
+        """
+        if isinstance(divisor, int):
+            return Price(self.numerator, self.denominator * divisor)
+        if isinstance(divisor, Price):
+            return Price(self.numerator * divisor.denominator, self.denominator * divisor.numerator)
+        return NotImplemented
+
+    def __float__(self):
+        return self.numerator / self.denominator
+
+    def __eq__(self, other):
+        if isinstance(other, Price):
+            return self.numerator == other.numerator and self.denominator == other.denominator
+        if isinstance(other, float):
+            if not isfinite(other):
+                return False
+            other_numerator, other_denominator = other.as_integer_ratio()
+        elif hasattr(other, "numerator") and hasattr(other, "denominator"):
+            # int, Fraction and other rationals
+            other_numerator, other_denominator = other.numerator, other.denominator
+        else:
+            return NotImplemented
+        return self.numerator * other_denominator == other_numerator * self.denominator
+
+    def __hash__(self):
+        # equal to the hash of the same number as int or Fraction
+        if self.denominator == 1:
+            return hash(self.numerator)
+        from fractions import Fraction
+
+        return hash(Fraction(self.numerator, self.denominator))
+
+    def __reduce__(self):
+        # the stored fraction is reduced already, so loading it needs no gcd
+        return Price.from_reduced, (self.numerator, self.denominator)
+
+    def __str__(self):
+        return self.format()
+
+    __repr__ = __str__
@@ -0,0 +1,297 @@
+""" Primary / replica replication of the knowledge over a local socket with the mutation events of a Translator. """
+
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+
+from Solution1.Pricing import Price
+
+# position of the price in the arguments of the operations with a price
+_PRICE_ARGUMENT = {"knowledge_base": 1, "exchange_rate": 2}
+# maximum number of bytes a replica reads at once
+_RECEIVE_SIZE = 1 << 16
+
+
+def _encode_price(price: Price) -> str:
+    return f"{price.numerator}/{price.denominator}"
+
+
+def encode_snapshot(snapshot: list) -> list:
+    """Converts a snapshot (see Translator.get_snapshot) into JSON compatible values."""
+    knowledge_base, foreign_numbers, *rest = snapshot
+    exchange_rates = rest[0] if rest else []
+    return [{product: _encode_price(Price.from_value(price)) for product, price in knowledge_base.items()},
+            foreign_numbers,
+            [[unit, other_unit, _encode_price(rate)] for unit, other_unit, rate in exchange_rates]]
+
+
+def decode_snapshot(snapshot: list) -> list:
+    knowledge_base, foreign_numbers, exchange_rates = snapshot
+    return [{product: Price.from_value(price) for product, price in knowledge_base.items()},
+            foreign_numbers,
+            [(unit, other_unit, Price.from_value(rate)) for unit, other_unit, rate in exchange_rates]]
+
+
+def encode_event(event: tuple) -> bytes:
+    """Encodes a mutation event as one JSON line."""
+    seq, operation, args = event
+    args = list(args)
+    if operation in _PRICE_ARGUMENT:
+        args[_PRICE_ARGUMENT[operation]] = _encode_price(args[_PRICE_ARGUMENT[operation]])
+    elif operation == "restore_snapshot":
+        args = [encode_snapshot(args[0])]
+    return _encode_message({"type": "event", "seq": seq, "operation": operation, "args": args})
+
+
+def decode_event(message: dict) -> tuple:
+    operation, args = message["operation"], message["args"]
+    if operation in _PRICE_ARGUMENT:
+        args[_PRICE_ARGUMENT[operation]] = Price.from_value(args[_PRICE_ARGUMENT[operation]])
+    elif operation == "restore_snapshot":
+        args = [decode_snapshot(args[0])]
+    return message["seq"], operation, tuple(args)
+
+
+def _encode_message(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def _create_socket(address: str, listen: bool) -> socket.socket:
+    """
+    Creates a listening or connected socket.
+    :param address: "host:port" for TCP or the path of a Unix socket.
+    """
+    if "/" in address:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if listen and os.path.exists(address):
+            os.remove(address)
+        target = address
+    else:
+        host, _, port = address.rpartition(":")
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = (host or "127.0.0.1", int(port))
+    if listen:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(target)
+        sock.listen()
+    else:
+        sock.connect(target)
+    return sock
+
+
+class ReplicationPrimary:
+    """
+    Streams the mutation events of a translator to replicas. The last log_size events are kept; a replica connecting
+    with the epoch and sequence number of its last applied event gets only the events after it. A replica of another
+    epoch (the primary was restarted) or one that fell behind the log gets a snapshot of the knowledge and the events
+    after it. Every replica is served by its own thread, so a slow replica does not hold up the translator.
+
+    Protocol (JSON lines): the replica sends {"epoch": ..., "seq": ...} (null for a new replica), the primary answers
+    {"type": "hello", "epoch": ...}, optionally {"type": "snapshot", "seq": ..., "snapshot": ...}, and then
+    {"type": "event", "seq": ..., "operation": ..., "args": [...]} for every change.
+    """
+
+    def __init__(self, translator, address: str, log_size: int = 100000):
+        """
+        :param translator: Translator whose changes are replicated.
+        :param address: "host:port" for TCP or the path of a Unix socket.
+        :param log_size: Number of events kept for replicas catching up.
+        """
+        self.translator = translator
+        self.address = address
+        self.epoch = os.urandom(8).hex()
+        self.log = deque(maxlen=log_size)
+        # sequence number of the first event which was ever in the log
+        self._log_start = translator.generation + 1
+        self._lock = threading.Lock()
+        self._replicas = set()
+        self._socket = None
+        translator.subscribe(self._on_event)
+
+    def start(self):
+        """Starts listening for replicas in a background thread."""
+        self._socket = _create_socket(self.address, listen=True)
+        threading.Thread(target=self._accept, args=(self._socket,), daemon=True).start()
+
+    def close(self):
+        self.translator.unsubscribe(self._on_event)
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        with self._lock:
+            for replica in self._replicas:
+                replica.put(None)
+
+    def _on_event(self, event: tuple):
+        line = encode_event(event)
+        with self._lock:
+            self.log.append((event[0], line))
+            for replica in self._replicas:
+                replica.put((event[0], line))
+
+    def _accept(self, listener: socket.socket):
+        # the listening socket is passed in, since close may reset self._socket at any time
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection: socket.socket):
+        events = queue.Queue()
+        try:
+            with connection, connection.makefile("rb") as reader:
+                request = json.loads(reader.readline() or b"{}")
+                # the replica is registered first, so no event is missed between the catch-up and the live stream
+                with self._lock:
+                    self._replicas.add(events)
+                    tail = [line for seq, line in self.log if seq > (request.get("seq") or 0)]
+                    log_start = self.log[0][0] if len(self.log) == self.log.maxlen else self._log_start
+                connection.sendall(_encode_message({"type": "hello", "epoch": self.epoch}))
+
+                last_sent = request.get("seq")
+                if request.get("epoch") != self.epoch or last_sent is None or last_sent + 1 < log_start:
+                    last_sent, snapshot = self._consistent_snapshot()
+                    connection.sendall(_encode_message({"type": "snapshot", "seq": last_sent,
+                                                        "snapshot": encode_snapshot(snapshot)}))
+                    tail = []
+                for line in tail:
+                    connection.sendall(line)
+                while True:
+                    item = events.get()
+                    if item is None:
+                        return
+                    seq, line = item
+                    if seq > last_sent:
+                        connection.sendall(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._replicas.discard(events)
+
+    def _consistent_snapshot(self) -> tuple:
+        """
+        Takes a snapshot of the translator while it may be changed by another thread. The snapshot is retried until
+        no change happened while it was taken. A change that was in progress may be part of the snapshot and is sent
+        again as event, which does not matter, since applying an event twice does not change the knowledge.
+        :return: Tuple of the sequence number and the snapshot.
+        """
+        while True:
+            generation = self.translator.generation
+            try:
+                snapshot = self.translator.get_snapshot()
+            except RuntimeError:
+                # changed during the iteration
+                continue
+            if self.translator.generation == generation:
+                return generation, snapshot
+
+
+class ReplicationReplica:
+    """
+    Follows a primary and applies its changes to a translator. After a disconnect the replica reconnects and catches
+    up from the last applied event. If the translator answers questions in other threads at the same time, it should
+    be a ConcurrentTranslator, so the questions never see a half applied change. All events received with one read
+    are applied in one batch, so a replica catching up publishes a new snapshot per read instead of per event.
+    """
+
+    def __init__(self, translator, address: str, retry_delay: float = 1.0):
+        """
+        :param translator: Translator receiving the changes of the primary.
+        :param address: Address of the primary, see ReplicationPrimary.
+        :param retry_delay: Seconds to wait before reconnecting.
+        """
+        self.translator = translator
+        self.address = address
+        self.retry_delay = retry_delay
+        self.epoch = None
+        self.seq = None
+        self.applied = 0
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self._socket = None
+
+    def start(self):
+        """Follows the primary in a background thread."""
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def run(self):
+        """Follows the primary until stop is called, reconnecting after every disconnect."""
+        while not self._stop.is_set():
+            try:
+                self.follow()
+            except (OSError, ValueError):
+                pass
+            self.connected.clear()
+            self._stop.wait(self.retry_delay)
+
+    def follow(self):
+        """
+        Connects to the primary once, catches up and applies the changes until the connection is closed.
+        :raises OSError: If the primary cannot be reached.
+        """
+        self._socket = _create_socket(self.address, listen=False)
+        with self._socket:
+            self._socket.sendall(_encode_message({"epoch": self.epoch, "seq": self.seq}))
+            # received bytes after the last complete line, e.g. of a large snapshot
+            partial = []
+            while True:
+                data = self._socket.recv(_RECEIVE_SIZE)
+                if not data:
+                    return
+                end = data.rfind(b"\n")
+                if end < 0:
+                    partial.append(data)
+                    continue
+                partial.append(data[:end])
+                lines = b"".join(partial).split(b"\n")
+                partial = [data[end + 1:]]
+                self._apply_messages(lines)
+
+    def _apply_messages(self, lines: list[bytes]):
+        """Applies the received messages in one batch of the translator."""
+        seq = self.seq
+        try:
+            with self.translator.batch() as translator:
+                for line in lines:
+                    message = json.loads(line)
+                    if message["type"] == "hello":
+                        self.epoch = message["epoch"]
+                        self.connected.set()
+                    elif message["type"] == "snapshot":
+                        translator.restore_snapshot(decode_snapshot(message["snapshot"]))
+                        seq = message["seq"]
+                    elif seq is None or message["seq"] > seq:
+                        # events up to the last applied one are skipped, e.g. after a snapshot
+                        translator.apply_event(decode_event(message))
+                        seq = message["seq"]
+                        self.applied += 1
+        finally:
+            # only set after the batch was published, see wait_for
+            self.seq = seq
+
+    def wait_for(self, seq: int, timeout: float = 5.0) -> bool:
+        """
+        Waits until the event with the given sequence number of the primary was applied.
+        :return: True if it was applied within the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while self.seq is None or self.seq < seq:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
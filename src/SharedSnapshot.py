@@ -0,0 +1,198 @@
+""" Read-only knowledge snapshot in a flat file, shared by worker processes through mmap. """
+
+import mmap
+import os
+import struct
+from array import array
+from itertools import accumulate
+
+from Solution1.Numerals import NumeralTable
+from Solution1.Pricing import Price
+
+_MAGIC = b"TRSNAP01"
+# magic, generation, number of products, then the offsets of the sections: name offsets, names, numerators,
+# denominators, metadata (JSON) and prices beyond int64 (pickled list), and the end of the file
+_HEADER = struct.Struct("<8sQQ7Q")
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_snapshot(path: str, knowledge_base, foreign_numbers: dict, roman_numbers: dict, generation: int = 0):
+    """
+    Writes the knowledge into a snapshot file. The products are sorted by name; their names are stored in one block
+    with an int64 array of offsets, their prices in two int64 arrays (numerators and denominators), so readers can
+    binary search them in the mapped file. The file is replaced atomically, so attached readers keep the old one until
+    they refresh.
+    :param path: Path of the snapshot file.
+    :param knowledge_base: Product prices by product name.
+    :param foreign_numbers: Roman numerals by foreign number.
+    :param roman_numbers: Values of the Roman numerals.
+    :param generation: Generation of the knowledge, see Translator.generation.
+    """
+    import json
+    import pickle
+
+    products = sorted((product.encode("utf-8"), price) for product, price in knowledge_base.items())
+    names = b"".join(name for name, _ in products)
+    name_offsets = array("q", accumulate((len(name) for name, _ in products), initial=0))
+    numerators, denominators = array("q"), array("q")
+    large = []
+    for _, price in products:
+        # both are checked before appending, so the arrays always have one entry per product
+        if _INT64_MIN <= price.numerator <= _INT64_MAX and price.denominator <= _INT64_MAX:
+            numerators.append(price.numerator)
+            denominators.append(price.denominator)
+        else:
+            # the numerator is the index of the price in the pickled list, the denominator 0 marks it
+            numerators.append(len(large))
+            denominators.append(0)
+            large.append(price)
+    sections = [
+        name_offsets.tobytes(),
+        names,
+        numerators.tobytes(),
+        denominators.tobytes(),
+        json.dumps({"foreign_numbers": foreign_numbers, "roman_numbers": roman_numbers}).encode("utf-8"),
+        pickle.dumps(large),
+    ]
+
+    offsets = []
+    offset = _HEADER.size
+    for section in sections:
+        offset = _align(offset)
+        offsets.append(offset)
+        offset += len(section)
+    offsets.append(offset)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, generation, len(products), *offsets))
+        for section, section_offset in zip(sections, offsets):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class _MappedSnapshot:
+    """One mapped snapshot file. Only the header and the small metadata are read, the products stay in the file."""
+
+    def __init__(self, path: str):
+        import json
+
+        with open(path, "rb") as f:
+            self.file_id = os.fstat(f.fileno()).st_ino, os.fstat(f.fileno()).st_mtime_ns
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.generation, self.count, *offsets = _HEADER.unpack_from(self.buffer)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a knowledge snapshot")
+        name_offsets, self.names_offset, numerators, denominators, metadata, large, end = offsets
+        view = memoryview(self.buffer)
+        self.name_offsets = view[name_offsets:name_offsets + 8 * (self.count + 1)].cast("q")
+        self.numerators = view[numerators:numerators + 8 * self.count].cast("q")
+        self.denominators = view[denominators:denominators + 8 * self.count].cast("q")
+        self.large_offsets = (large, end)
+        self._large = None
+        # the sections are padded with zero bytes to multiples of 8
+        metadata = json.loads(self.buffer[metadata:large].rstrip(b"\0"))
+        self.numeral_table = NumeralTable(metadata["foreign_numbers"], metadata["roman_numbers"])
+
+    def find(self, product: str) -> int:
+        """
+        Binary search of a product in the sorted names.
+        :return: Id of the product (its position in the sorted names) or -1 if it is unknown.
+        """
+        key = product.encode("utf-8")
+        buffer, name_offsets, base = self.buffer, self.name_offsets, self.names_offset
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            name = buffer[base + name_offsets[middle]:base + name_offsets[middle + 1]]
+            if name < key:
+                low = middle + 1
+            elif name > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def price(self, product_id: int) -> Price:
+        denominator = self.denominators[product_id]
+        if denominator == 0:
+            if self._large is None:
+                import pickle
+                self._large = pickle.loads(self.buffer[self.large_offsets[0]:self.large_offsets[1]])
+            return self._large[self.numerators[product_id]]
+        return Price.from_reduced(self.numerators[product_id], denominator)
+
+
+class SharedSnapshot:
+    """
+    Read-only view of a snapshot file written by Translator.export_snapshot. The file is mapped into memory, so all
+    worker processes attached to the same file share its pages instead of loading their own copy of the knowledge.
+    Products are found by binary search in the mapped file. refresh() switches to a newly published file at once:
+    every lookup uses either the old or the new snapshot completely.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Path of the snapshot file.
+        :raises FileNotFoundError: If there is no snapshot file.
+        :raises ValueError: If the file is not a snapshot.
+        """
+        self.path = path
+        self._snapshot = _MappedSnapshot(path)
+
+    def refresh(self) -> bool:
+        """
+        Attaches to the snapshot file again if a new one was published since.
+        :return: True if the snapshot changed.
+        """
+        stat = os.stat(self.path)
+        if (stat.st_ino, stat.st_mtime_ns) == self._snapshot.file_id:
+            return False
+        # the old mapping is closed when the last reader using it is done
+        self._snapshot = _MappedSnapshot(self.path)
+        return True
+
+    @property
+    def generation(self) -> int:
+        return self._snapshot.generation
+
+    def __len__(self):
+        return self._snapshot.count
+
+    def __contains__(self, product: str) -> bool:
+        return self._snapshot.find(product) >= 0
+
+    def product_id(self, product: str) -> int:
+        """
+        :return: Id of the product in this snapshot, or -1 if it is unknown.
+        """
+        return self._snapshot.find(product)
+
+    def get_product_price(self, product: str) -> Price:
+        """
+        :raises KeyError: If the product is unknown.
+        """
+        snapshot = self._snapshot
+        product_id = snapshot.find(product)
+        if product_id < 0:
+            raise KeyError(product)
+        return snapshot.price(product_id)
+
+    def get_foreign_numbers(self) -> dict:
+        return self._snapshot.numeral_table.foreign_numbers
+
+    def calc_foreign_numbers(self, values: list[str]) -> int:
+        return self._snapshot.numeral_table.calculate(values)
+
+    def evaluate_foreign_numbers(self, values: list[str]) -> int:
+        return self._snapshot.numeral_table.evaluate(values)
+
+    def int_to_foreign(self, number: int) -> str:
+        return self._snapshot.numeral_table.encode(number)
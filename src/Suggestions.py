@@ -0,0 +1,87 @@
+""" Spelling suggestions for unknown foreign numbers and product names. """
+
+
+def edit_distance(first: str, second: str, limit: int) -> int:
+    """
+    Calculates the edit distance with insertions, deletions, substitutions and transpositions of neighbours.
+    :param limit: Distances above the limit are not calculated exactly, limit + 1 is returned instead.
+    :return: The distance, at most limit + 1.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous_row = None
+    row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        before_row, previous_row = previous_row, row
+        row = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = 0 if first[i - 1] == second[j - 1] else 1
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                row[j] = min(row[j], before_row[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+    return min(row[-1], limit + 1)
+
+
+class SuggestionIndex:
+    """
+    Index of known words for "did you mean" suggestions, case-insensitive. Words with one edit (insertion, deletion,
+    substitution or transposition) are found by generating all edits of the unknown word over the characters of the
+    known words and looking them up in a hash map, so the time does not depend on the number of known words. Small
+    indexes (up to scan_limit words, e.g. the foreign numbers) are scanned for two edits as well.
+    """
+
+    def __init__(self, words=(), scan_limit: int = 1000):
+        """
+        :param words: Known words.
+        :param scan_limit: Maximum number of words for which words with two edits are searched as well.
+        """
+        self.words = {}
+        self.alphabet = set()
+        self.scan_limit = scan_limit
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        """Adds a known word. If several words only differ in case, the first one is suggested."""
+        folded = word.casefold()
+        if folded not in self.words:
+            self.words[folded] = word
+            self.alphabet.update(folded)
+
+    def __len__(self):
+        return len(self.words)
+
+    def suggest(self, word: str):
+        """
+        Finds the known word closest to a word.
+        :param word: Unknown word.
+        :return: The known word with the fewest edits (the smallest one on a tie), or None if there is none close
+            enough.
+        """
+        folded = word.casefold()
+        if folded in self.words:
+            return self.words[folded]
+
+        # the intersection iterates over the smaller set of edits
+        matches = self.words.keys() & self._edits(folded)
+        if matches:
+            return self.words[min(matches)]
+
+        if len(self.words) <= self.scan_limit and len(folded) > 2:
+            distances = [(edit_distance(folded, known, 2), known) for known in self.words]
+            distance, known = min(distances, default=(3, None))
+            if distance <= 2:
+                return self.words[known]
+        return None
+
+    def _edits(self, word: str) -> set:
+        """Returns all words one edit away from the word."""
+        alphabet = self.alphabet
+        splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+        edits = {head + tail[1:] for head, tail in splits if tail}
+        edits.update(head + tail[1] + tail[0] + tail[2:] for head, tail in splits if len(tail) > 1)
+        edits.update(head + char + tail[1:] for head, tail in splits if tail for char in alphabet)
+        edits.update(head + char + tail for head, tail in splits for char in alphabet)
+        return edits
@@ -1,28 +1,114 @@
 """ Translator class for managing a knowledge base of products and their prices."""
 
 import os
-import pickle
+import sys
 
-from Solution1.TranslatorExceptions import ForeignNumberException
+from Solution1.Cache import LRUCache
+from Solution1.Pricing import Price
+from Solution1.TranslatorExceptions import CurrencyException, ForeignNumberException, MemoryBudgetException, \
+    ProductException
 
 
-def add_entry(dictionary: dict, key, value, entry_type: str = "dictionary"):
+def add_entry(dictionary: dict, key, value, entry_type: str = "dictionary") -> bool:
+    """
+    Adds or overwrites an entry and reports the change.
+    :return: True if the dictionary was changed, False if the entry already existed.
+    """
     if key in dictionary and dictionary[key] != value:
         old_value = dictionary[key]
         print(f"Overwriting '{key}' with '{value}' (was '{old_value}') in {entry_type}")
     elif key in dictionary and dictionary[key] == value:
         print(f"'{key}' with '{value}' already exists in {entry_type}")
-        return
+        return False
     else:
         print(f"Adding new {entry_type} '{key}' with '{value}'")
     dictionary[key] = value
+    return True
+
+
+def check_price(price: Price) -> Price:
+    """
+    Checks the price of a product, the same way for definitions and bulk loads. Free products (0 coins) are allowed.
+    :return: The price.
+    :raises ValueError: If the price is negative.
+    """
+    if price.numerator < 0:
+        raise ValueError("price must not be negative")
+    return price
+
+
+def estimate_entry_bytes(key: str, value) -> int:
+    """
+    Estimates the memory of one dictionary entry: the key, the value and a slot of the hash table.
+    :return: Estimated size in bytes.
+    """
+    size = sys.getsizeof(key) + sys.getsizeof(value) + 24
+    if isinstance(value, Price):
+        size += sys.getsizeof(value.numerator) + sys.getsizeof(value.denominator)
+    return size
 
 
 class Translator:
-    def __init__(self, backup_path: str = r"./backup.pkl", roman_numbers: dict = None):
-        self.knowledge_base = {}
+    __slots__ = ("knowledge_base", "foreign_numbers", "backup_path", "journal", "journal_seq", "compact_every",
+                 "price_rounding", "compact", "numeral_cache", "validated_numeral_cache", "_numeral_table",
+                 "_numerals_shared", "memory_budget", "estimated_bytes", "roman_numbers", "_suggestion_indexes",
+                 "_pending_load", "generation", "currencies", "history", "_price_vector", "subscribers",
+                 "_name_indexes")
+
+    def __init__(self, backup_path: str = r"./backup.pkl", roman_numbers: dict = None, cache_size: int = 4096,
+                 journal: bool = False, compact_every: int = 10000, price_rounding: str = None,
+                 memory_budget: int = None, compact: bool = False, price_history: bool = False):
+        """
+        :param backup_path: Path of the backup file.
+        :param roman_numbers: Values of the Roman numerals.
+        :param cache_size: Maximum number of cached foreign number evaluations.
+        :param journal: If True, every change is appended to a journal next to the backup file, so no change is lost
+            between two saves. The journal is merged into the backup file after compact_every changes.
+        :param compact_every: Number of journal records after which the journal is merged into the backup file.
+        :param price_rounding: None to answer with exact prices, otherwise a rounding mode of Pricing.ROUNDING_MODES.
+        :param memory_budget: If given, the estimated bytes of the product prices and of the own (not shared) foreign
+            numbers may not exceed it. New entries beyond it are refused.
+        :param compact: If True, the product prices are stored in a CompactKnowledgeBase instead of a dict, which needs
+            a fraction of the memory for millions of products.
+        :param price_history: If True, every price change is kept as a new version (see PriceHistory), old versions
+            are moved into a history file next to the backup file on every save.
+        """
+        self.compact = compact
+        # True while the backup is not loaded yet, see load_lazily
+        self._pending_load = False
+        # incremented by every change of the knowledge, so derived answers can be dropped (see Cache.ResponseCache)
+        self.generation = 0
+        # functions called with every mutation event, see subscribe
+        self.subscribers = []
+        self.knowledge_base = self._new_knowledge_base()
         self.foreign_numbers = {}
+        # the exchange rates (currencies) are created on first use, see __getattr__
+        self.history = None
+        if price_history:
+            from Solution1.PriceHistory import PriceHistory
+            self.history = PriceHistory(None if backup_path is None else backup_path + ".history")
         self.backup_path = backup_path
+        self.journal = None
+        if journal:
+            from Solution1.Journal import Journal
+            self.journal = Journal(backup_path + ".journal")
+        self.journal_seq = 0
+        self.compact_every = compact_every
+        self.price_rounding = price_rounding
+        self.numeral_cache = LRUCache(cache_size)
+        self.validated_numeral_cache = LRUCache(cache_size)
+        self._numeral_table = None
+        # True while foreign_numbers and the numeral table are shared with other translators, see share_numerals
+        self._numerals_shared = False
+        self.memory_budget = memory_budget
+        self.estimated_bytes = 0
+        # spelling suggestion indexes by mutation name ("foreign_number", "knowledge_base"), built on first use
+        self._suggestion_indexes = {}
+        # PriceVector of the product prices and the generation it was built for, see value_portfolios
+        self._price_vector = (None, None)
+        # sorted name indexes by mutation name with the dictionary and generation they were built for, see
+        # get_name_index
+        self._name_indexes = {}
         self.roman_numbers = {
             "I": 1,
             "V": 5,
@@ -33,6 +119,55 @@ class Translator:
             "M": 1000,
         } if roman_numbers is None else roman_numbers
 
+    def __getattr__(self, name: str):
+        # only called for attributes which are not set, i.e. the knowledge of a translator waiting for its lazy load
+        # and the exchange rates, which are only created (and their module imported) when they are used
+        if name in ("knowledge_base", "foreign_numbers", "currencies") and self._pending_load:
+            self._load_pending()
+            return getattr(self, name)
+        if name == "currencies":
+            self._set_exchange_rates(())
+            return self.currencies
+        raise AttributeError(f"'Translator' object has no attribute '{name}'")
+
+    def load_lazily(self):
+        """
+        Defers load_data until the knowledge base, the foreign numbers or the exchange rates are used first.
+        Short-lived invocations, which do not need the knowledge (e.g. help), do not read the backup at all.
+        """
+        del self.knowledge_base
+        del self.foreign_numbers
+        self._set_exchange_rates(None)
+        self._pending_load = True
+
+    def _load_pending(self):
+        """Loads the backup now, if its loading was deferred by load_lazily."""
+        if self._pending_load:
+            self.load_data()
+
+    def _new_knowledge_base(self, entries=()):
+        if self.compact:
+            from Solution1.CompactStorage import CompactKnowledgeBase
+            return CompactKnowledgeBase(entries)
+        return dict(entries)
+
+    def _set_exchange_rates(self, rates):
+        """
+        Replaces the exchange rates.
+        :param rates: Iterable of (unit, other unit, rate) tuples, None to drop the exchange rates until their next use.
+        """
+        if rates is None:
+            try:
+                del self.currencies
+            except AttributeError:
+                pass
+            return
+        from Solution1.Currencies import CurrencyGraph
+
+        self.currencies = CurrencyGraph()
+        for unit, other_unit, rate in rates:
+            self.currencies.add_rate(unit, other_unit, rate)
+
     def roman_to_int(self, number: str):
         return self.roman_numbers[number]
 
@@ -42,54 +177,476 @@ class Translator:
     def calc_foreign_numbers(self, values: list[str]) -> int:
         """
         Calculate the total value of foreign numbers by converting them to Roman numerals and then to integers.
+        Results are memoized until the foreign numbers change.
         :param values: List of foreign number strings.
         :return: Integer value of the foreign numbers.
         """
-        digits = []
-        # translate foreign numbers to arabic digits
-        for value in values:
-            number = self.roman_to_int(self.foreign_to_roman(value))
-            digits.append(number)
-
-        resu = 0
-        i = 0
-        while i < len(digits):
-            if i + 1 < len(digits) and digits[i] < digits[i + 1]:
-                resu += digits[i + 1] - digits[i]
-                i += 2
-            else:
-                resu += digits[i]
-                i += 1
+        key = tuple(values)
+        cached = self.numeral_cache.get(key)
+        if cached is not None:
+            return cached
+
+        resu = self._calc_digits(key)
+        self.numeral_cache.put(key, resu)
         return resu
 
+    def get_numeral_table(self):
+        """
+        Returns the lookup structures of the current foreign numbers and builds them if necessary.
+        :return: NumeralTable of the current foreign numbers.
+        """
+        if self._numeral_table is None:
+            from Solution1.Numerals import NumeralTable
+            self._numeral_table = NumeralTable(self.foreign_numbers, self.roman_numbers)
+        return self._numeral_table
+
+    def evaluate_foreign_numbers(self, values: list[str]) -> int:
+        """
+        Validate foreign numbers against the Roman numeral rules and calculate their value in a single pass.
+        Stops at the first unknown or misplaced foreign number. Results are memoized until the foreign numbers change.
+        :param values: List of foreign number strings.
+        :return: Integer value of the foreign numbers.
+        :raises ForeignNumberException: If a value is not a known foreign number.
+        :raises RomanNumeralException: If the values do not form a valid Roman numeral.
+        """
+        key = tuple(values)
+        cached = self.validated_numeral_cache.get(key)
+        if cached is not None:
+            return cached
+
+        value = self.get_numeral_table().evaluate(key)
+        self.validated_numeral_cache.put(key, value)
+        return value
+
+    def int_to_foreign(self, number: int) -> str:
+        """
+        Write a number with the foreign numbers. The lookup index of all numbers is built once per vocabulary.
+        :param number: Number from 1 to 3999.
+        :return: Space separated foreign numbers in canonical Roman numeral order.
+        :raises RomanNumeralException: If the number cannot be written as Roman numeral.
+        :raises ForeignNumberException: If no foreign number is defined for a needed Roman numeral.
+        """
+        return self.get_numeral_table().encode(number)
+
+    def calc_batch(self, phrases, validate: bool = False):
+        """
+        Calculate the values of many foreign number phrases at once. Requires NumPy.
+        :param phrases: Iterable of phrases, each one a list of foreign number strings or a space separated string.
+        :param validate: If True, phrases violating the Roman numeral rules are marked as invalid as well.
+        :return: Tuple of an int64 array with the values and a boolean array marking invalid phrases (value 0).
+        """
+        return self.get_numeral_table().evaluate_batch(phrases, validate)
+
+    def _calc_digits(self, values: tuple[str, ...]) -> int:
+        return self.get_numeral_table().calculate(values)
+
     def add_foreign_number(self, new_number: str, roman_number: str):
         """
         Add a new foreign number and its corresponding Roman numeral to the knowledge base.
         :param new_number: Number in foreign language.
         :param roman_number: Roman numeral representation of the foreign number.
         """
-        add_entry(self.foreign_numbers, new_number, roman_number, entry_type="foreign numbers")
+        if self.foreign_numbers.get(new_number) != roman_number:
+            self._own_foreign_numbers()
+            self._reserve_memory(self.foreign_numbers, new_number, roman_number)
+        if add_entry(self.foreign_numbers, new_number, roman_number, entry_type="foreign numbers"):
+            self._invalidate_numerals()
+            self._index_word("foreign_number", new_number)
+            self._record_mutation("foreign_number", new_number, roman_number)
+
+    def share_numerals(self, numeral_table):
+        """
+        Uses the foreign numbers and lookup structures of a table, which may be shared by several translators. They are
+        copied on the first change of this translator's foreign numbers.
+        :param numeral_table: NumeralTable of the same vocabulary as the current foreign numbers.
+        """
+        self.foreign_numbers = numeral_table.foreign_numbers
+        self._numeral_table = numeral_table
+        self._numerals_shared = True
+        self.estimated_bytes = self._count_bytes()
 
-    def add_knowledge_base(self, product: str, coins: float):
+    def _own_foreign_numbers(self):
+        """Copies shared foreign numbers before they are changed (copy-on-write)."""
+        if self._numerals_shared:
+            self.foreign_numbers = dict(self.foreign_numbers)
+            self._numerals_shared = False
+            self.estimated_bytes = self._count_bytes()
+
+    def _count_bytes(self) -> int:
+        """Returns the estimated bytes of the product prices and of the own foreign numbers."""
+        if self.memory_budget is None:
+            return 0
+        dictionaries = [self.knowledge_base] if self._numerals_shared else [self.knowledge_base, self.foreign_numbers]
+        return sum(estimate_entry_bytes(key, value) for dictionary in dictionaries for key, value in dictionary.items())
+
+    def _reserve_memory(self, dictionary: dict, key: str, value):
+        """
+        Accounts a new or changed entry against the memory budget.
+        :raises MemoryBudgetException: If the entry would exceed the memory budget.
+        """
+        if self.memory_budget is None:
+            return
+        size = estimate_entry_bytes(key, value)
+        if key in dictionary:
+            size -= estimate_entry_bytes(key, dictionary[key])
+        if self.estimated_bytes + size > self.memory_budget:
+            raise MemoryBudgetException(f"Memory budget of {self.memory_budget} bytes exceeded, '{key}' was not added")
+        self.estimated_bytes += size
+
+    def _invalidate_numerals(self):
+        """Drops everything that was derived from the foreign numbers."""
+        self.numeral_cache.clear()
+        self.validated_numeral_cache.clear()
+        self._numeral_table = None
+
+    def add_knowledge_base(self, product: str, coins):
         """
         Add a new product and its price in coins to the knowledge base.
         :param product: Product name.
-        :param coins: Price of the product in coins.
+        :param coins: Price of the product in coins, stored as exact Price.
+        :raises ValueError: If the price is negative.
+        """
+        coins = check_price(Price.from_value(coins))
+        if self.knowledge_base.get(product) != coins:
+            self._reserve_memory(self.knowledge_base, product, coins)
+        if add_entry(self.knowledge_base, product, coins, entry_type="knowledge base"):
+            self._index_word("knowledge_base", product)
+            self._record_mutation("knowledge_base", product, coins)
+
+    def add_exchange_rate(self, amount, unit: str, other_amount, other_unit: str):
+        """
+        Add an exchange rate between two units, e.g. "1 credit is 3 coins". Prices in coins can then be converted to
+        every unit connected to coins by exchange rates.
+        :param amount: Amount of the first unit.
+        :param unit: Name of the first unit.
+        :param other_amount: Amount of the other unit with the same value.
+        :param other_unit: Name of the other unit.
+        :raises CurrencyException: If an amount is not positive, the units are the same or the rate contradicts the
+            known exchange rates.
+        """
+        amount, other_amount = Price.from_value(amount), Price.from_value(other_amount)
+        if amount.numerator <= 0 or other_amount.numerator <= 0:
+            raise CurrencyException("Exchange rates need positive amounts")
+        rate = other_amount / amount
+        from Solution1.Currencies import normalize_unit
+
+        if self.currencies.add_rate(unit, other_unit, rate):
+            print(f"Adding new exchange rate '{amount} {unit}' with '{other_amount} {other_unit}'")
+            self._record_mutation("exchange_rate", normalize_unit(unit), normalize_unit(other_unit), rate)
+        else:
+            print(f"Exchange rate '{amount} {unit}' with '{other_amount} {other_unit}' already exists")
+
+    def convert(self, amount, unit: str, other_unit: str) -> Price:
+        """
+        Convert an amount to another unit with the known exchange rates.
+        :param amount: Amount in units.
+        :param unit: Name of the unit of the amount.
+        :param other_unit: Name of the target unit.
+        :return: Exact amount in other units.
+        :raises CurrencyException: If there is no exchange rate between the units.
+        """
+        return self.currencies.convert(Price.from_value(amount), unit, other_unit)
+
+    def suggest_foreign_number(self, token: str):
+        """
+        Finds a known foreign number with a similar spelling.
+        :param token: Unknown foreign number.
+        :return: The closest foreign number or None.
+        """
+        return self._get_suggestion_index("foreign_number", self.foreign_numbers).suggest(token)
+
+    def suggest_product(self, product: str):
+        """
+        Finds a known product with a similar spelling.
+        :param product: Unknown product name.
+        :return: The closest product name or None.
+        """
+        return self._get_suggestion_index("knowledge_base", self.knowledge_base).suggest(product)
+
+    def _get_suggestion_index(self, operation: str, dictionary):
+        index = self._suggestion_indexes.get(operation)
+        if index is None:
+            from Solution1.Suggestions import SuggestionIndex
+            index = self._suggestion_indexes[operation] = SuggestionIndex(dictionary)
+        return index
+
+    def _index_word(self, operation: str, word: str):
+        """Adds a new foreign number or product to its suggestion index, if the index was built already."""
+        index = self._suggestion_indexes.get(operation)
+        if index is not None:
+            index.add(word)
+
+    def bulk_load(self, entries, batch_size: int = 10000):
+        """
+        Validate and insert many foreign numbers and product prices in batches without reporting every entry.
+        :param entries: Iterable of (type, name, value) tuples. The type is "foreign_number" (value: Roman numeral)
+            or "product" (value: price in coins, e.g. 17, "3/2" or "1.5").
+        :param batch_size: Number of entries inserted at once.
+        :return: BulkLoadSummary with the counts of added, overwritten, duplicate and rejected entries.
         """
-        add_entry(self.knowledge_base, product, coins, entry_type="knowledge base")
+        from Solution1.BulkImport import BulkLoadSummary
+
+        summary = BulkLoadSummary()
+        batch = []
+        for entry_type, name, value in entries:
+            try:
+                batch.append(self._validate_entry(entry_type, name, value))
+            except ValueError as e:
+                summary.count("rejected", f"{name!r}: {e}")
+                continue
+            if len(batch) >= batch_size:
+                self._insert_batch(batch, summary)
+                batch = []
+        self._insert_batch(batch, summary)
+        return summary
+
+    def _validate_entry(self, entry_type, name, value) -> tuple:
+        """
+        Checks one bulk load entry.
+        :return: Tuple of the mutation name, the key and the converted value.
+        :raises ValueError: If the entry is invalid.
+        """
+        from Solution1.BulkImport import ENTRY_TYPES
+
+        if entry_type not in ENTRY_TYPES:
+            raise ValueError(f"unknown type {entry_type!r}")
+        if not isinstance(name, str) or not name or len(name.split()) != 1:
+            raise ValueError("name must be a single word")
+
+        if entry_type == "foreign_number":
+            if value not in self.roman_numbers:
+                raise ValueError(f"{value!r} is not a Roman numeral")
+            return "foreign_number", name, value
+
+        try:
+            price = Price.from_value(value)
+        except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+            raise ValueError(f"{value!r} is not a number")
+        return "knowledge_base", name, check_price(price)
+
+    def _insert_batch(self, batch: list, summary):
+        for operation, name, value in batch:
+            if operation == "foreign_number":
+                self._own_foreign_numbers()
+            dictionary = self.foreign_numbers if operation == "foreign_number" else self.knowledge_base
+            old_value = dictionary.get(name)
+            if old_value == value:
+                summary.count("duplicate", f"{name}={value}")
+                continue
+            try:
+                self._reserve_memory(dictionary, name, value)
+            except MemoryBudgetException as e:
+                summary.count("rejected", f"{name!r}: {e}")
+                continue
+            if old_value is None:
+                summary.count("added", f"{name}={value}")
+            else:
+                summary.count("overwritten", f"{name}: {old_value} -> {value}")
+            dictionary[name] = value
+            self._index_word(operation, name)
+            if operation == "foreign_number":
+                # before recording, since compacting the journal saves the numeral tables
+                self._invalidate_numerals()
+            self._record_mutation(operation, name, value)
 
     def clear_knowledge_base(self):
-        self.knowledge_base = {}
+        self._load_pending()
+        self.knowledge_base = self._new_knowledge_base()
+        self._suggestion_indexes.pop("knowledge_base", None)
+        self.estimated_bytes = self._count_bytes()
+        self._record_mutation("clear_knowledge_base")
+
+    def clear_exchange_rates(self):
+        self._load_pending()
+        self._set_exchange_rates(None)
+        self._record_mutation("clear_exchange_rates")
 
     def clear_foreign_numbers(self):
+        self._load_pending()
         self.foreign_numbers = {}
+        self._suggestion_indexes.pop("foreign_number", None)
+        self._numerals_shared = False
+        self._invalidate_numerals()
+        self.estimated_bytes = self._count_bytes()
+        self._record_mutation("clear_foreign_numbers")
+
+    def _record_mutation(self, operation: str, *args):
+        """
+        Appends a change to the journal, if journaling is enabled, and compacts the journal when it got too long.
+        :param operation: Name of the change, see _apply_mutation.
+        :param args: Arguments of the change.
+        """
+        self.generation += 1
+        if operation == "knowledge_base" and self.history is not None:
+            self.history.record(*args)
+        if self.subscribers:
+            self._emit(operation, args)
+        if self.journal is None:
+            return
+        self.journal_seq += 1
+        self.journal.append((self.journal_seq, operation, args))
+        if self.journal.records >= self.compact_every:
+            self.save_data()
+
+    def _apply_mutation(self, operation: str, args: tuple):
+        """Applies a recorded change without reporting it."""
+        if operation == "knowledge_base" and self.knowledge_base.get(args[0]) == args[1]:
+            # applied before (e.g. an event sent again after a snapshot), the price history gets no second version
+            return
+        self.generation += 1
+        if operation == "foreign_number":
+            self._own_foreign_numbers()
+            self.foreign_numbers[args[0]] = args[1]
+            self._invalidate_numerals()
+            self._index_word(operation, args[0])
+        elif operation == "knowledge_base":
+            self.knowledge_base[args[0]] = args[1]
+            self._index_word(operation, args[0])
+            if self.history is not None:
+                self.history.record(*args)
+        elif operation == "clear_knowledge_base":
+            self.knowledge_base = self._new_knowledge_base()
+            self._suggestion_indexes.pop("knowledge_base", None)
+        elif operation == "clear_foreign_numbers":
+            self.foreign_numbers = {}
+            self._suggestion_indexes.pop("foreign_number", None)
+            self._numerals_shared = False
+            self._invalidate_numerals()
+        elif operation == "exchange_rate":
+            self.currencies.add_rate(*args)
+        elif operation == "clear_exchange_rates":
+            self._set_exchange_rates(None)
+        else:
+            raise ValueError(f"Unknown operation '{operation}'")
+        if self.subscribers:
+            self._emit(operation, args)
+
+    def subscribe(self, subscriber):
+        """
+        Registers a function, which is called with every mutation event of this translator in the order of the changes.
+        An event is a tuple (sequence number, operation, arguments), its sequence number is the generation after the
+        change. The operations are the ones of the journal (e.g. "foreign_number", "knowledge_base",
+        "clear_knowledge_base"), "restore_snapshot" (whole knowledge replaced, e.g. by load_data; the argument is a
+        snapshot, see get_snapshot) and "reset" (backup deleted). The arguments must not be changed.
+        :param subscriber: Function getting the event. It is called by the thread changing the translator.
+        """
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+
+    def _emit(self, operation: str, args: tuple):
+        event = (self.generation, operation, args)
+        for subscriber in list(self.subscribers):
+            subscriber(event)
+
+    def apply_event(self, event: tuple):
+        """
+        Applies a mutation event of another translator without reporting it, e.g. on a replica, see subscribe.
+        Applying an event a second time does not change the knowledge (including the price history). A "reset" only
+        deleted the backup files of the other translator, so the own backup, journal and history files are kept.
+        :param event: Tuple of the sequence number, the operation and its arguments.
+        :raises ValueError: If the operation is unknown.
+        """
+        _, operation, args = event
+        if operation == "restore_snapshot":
+            self.restore_snapshot(args[0])
+        elif operation != "reset":
+            self._apply_mutation(operation, args)
 
     def delete_backup(self):
+        # the runtime knowledge is kept, so a backup which was not loaded yet is loaded before it is deleted
+        self._load_pending()
+        self.generation += 1
+        if self.journal is not None:
+            self.journal.delete()
+        if self.history is not None:
+            self.history.delete()
         os.remove(self.backup_path)
+        if self.subscribers:
+            self._emit("reset", ())
 
-    def get_product_price(self, product: str) -> float:
+    def get_product_price(self, product: str) -> Price:
         return self.knowledge_base[product]
 
+    def value_basket(self, items) -> Price:
+        """
+        Calculate the total price of a basket of products in one pass.
+        :param items: Iterable of (foreign numbers, product) pairs, the foreign numbers as list or space separated
+            string.
+        :return: Exact total price in coins.
+        :raises KeyError: If a product is unknown.
+        :raises ForeignNumberException: If an unknown foreign number is encountered.
+        :raises RomanNumeralException: If the foreign numbers of an item do not form a valid Roman numeral.
+        """
+        from Solution1.Baskets import value_basket
+
+        return value_basket(self.knowledge_base, (
+            (self.evaluate_foreign_numbers(numerals.split() if isinstance(numerals, str) else numerals), product)
+            for numerals, product in items))
+
+    def value_portfolios(self, portfolios):
+        """
+        Calculate the total prices of many baskets at once with NumPy. The quantities of all items are evaluated like
+        calc_batch does, and the items are summed per denominator of their prices with the vectors of all prices,
+        which are built once per generation of the knowledge.
+        :param portfolios: Sequence of baskets, each one a sequence of (foreign numbers, product) pairs like in
+            value_basket.
+        :return: Tuple of arrays with the reduced numerators and denominators of the exact totals and a boolean array
+            marking invalid baskets (unknown products or invalid foreign numbers, total 0). The total of basket i is
+            Price(totals[i], denominators[i]).
+        """
+        import numpy as np
+
+        from Solution1.Baskets import PriceVector
+
+        generation, vector = self._price_vector
+        if vector is None or generation != self.generation:
+            vector = PriceVector(self.knowledge_base)
+            self._price_vector = (self.generation, vector)
+
+        lengths = np.fromiter(map(len, portfolios), dtype=np.int64, count=len(portfolios))
+        item_count = int(lengths.sum())
+        # every distinct phrase is evaluated once, the items only refer to their phrase
+        phrases = {}
+        phrase_codes = np.fromiter(
+            (phrases.setdefault(numerals if isinstance(numerals, str) else tuple(numerals), len(phrases))
+             for basket in portfolios for numerals, _ in basket), dtype=np.int64, count=item_count)
+        values, invalid_values = self.calc_batch(list(phrases), validate=True)
+        quantities, invalid_items = values[phrase_codes], invalid_values[phrase_codes]
+        product_ids = np.fromiter((vector.ids.get(product, -1) for basket in portfolios for _, product in basket),
+                                  dtype=np.int64, count=item_count)
+        invalid_items |= product_ids < 0
+        product_ids[invalid_items] = 0
+        quantities[invalid_items] = 0
+
+        totals, denominators = vector.value(lengths, product_ids, quantities)
+        invalid_counts = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(invalid_items, dtype=np.int64)])
+        ends = np.cumsum(lengths)
+        invalid = invalid_counts[ends] > invalid_counts[ends - lengths]
+        totals[invalid] = 0
+        denominators[invalid] = 1
+        return totals, denominators, invalid
+
+    def get_product_price_at(self, product: str, entry: int) -> Price:
+        """
+        Returns the price of a product as it was after a given entry (the n-th price change).
+        :raises KeyError: If the product had no price at that entry.
+        :raises ProductException: If the price history is not enabled.
+        """
+        self._load_pending()
+        if self.history is None:
+            raise ProductException("The price history is not enabled")
+        return self.history.price_at(product, entry)
+
+    def get_product_price_in(self, product: str, unit: str) -> Price:
+        """
+        Returns the price of a product in any unit connected to coins by exchange rates.
+        :raises KeyError: If the product is unknown.
+        :raises CurrencyException: If there is no exchange rate from coins to the unit.
+        """
+        return self.currencies.convert(self.knowledge_base[product], "coins", unit)
+
     def extract_all_foreign_numbers(self, values: list[str]):
         """
         Extract all foreign numbers from the given list of values.
@@ -107,18 +664,37 @@ class Translator:
         return all_foreign_numbers
 
     def save_data(self):
-        """Save the current knowledge base and foreign numbers to a pickle file."""
+        """
+        Save the current knowledge base and foreign numbers to a pickle file. The file is replaced atomically, so a
+        crash while saving keeps the previous backup. All journal records are merged into the new backup.
+        """
+
+        import pickle
 
         def save_pickle(obj, filepath: str):
             """Save an object to a pickle file."""
-            with open(filepath, 'wb') as f:
+            temp_path = filepath + ".tmp"
+            with open(temp_path, 'wb') as f:
                 pickle.dump(obj, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, filepath)
 
-        backup = [self.knowledge_base, self.foreign_numbers]
-        save_pickle(backup, self.backup_path)
+        knowledge_base, foreign_numbers, exchange_rates = self.get_snapshot()
+        # the lookup tables of the foreign numbers are stored as well, so loading does not have to build them again
+        extras = {"journal_seq": self.journal_seq, "numeral_tables": self.get_numeral_table().export_tables(),
+                  "exchange_rates": exchange_rates}
+        if self.history is not None:
+            # the old versions are moved into the history file, the backup only records up to which version
+            self.history.compact()
+            extras["history_version"] = self.history.version
+        save_pickle([knowledge_base, foreign_numbers, extras], self.backup_path)
+        if self.journal is not None:
+            self.journal.truncate()
 
     def load_data(self):
-        """Load the knowledge base and foreign numbers from a pickle file."""
+        """Load the knowledge base and foreign numbers from a pickle file and replay the journal on top of it."""
+        import pickle
 
         def load_pickle(filepath: str):
             """Load and return an object from a pickle file."""
@@ -128,7 +704,96 @@ class Translator:
             with open(filepath, 'rb') as f:
                 return pickle.load(f)
 
-        self.knowledge_base, self.foreign_numbers = load_pickle(self.backup_path)
+        backup = load_pickle(self.backup_path)
+        extras = backup[2] if len(backup) > 2 else {}
+        self.restore_snapshot(backup[:2] + [extras.get("exchange_rates", [])])
+        self.journal_seq = extras.get("journal_seq", 0)
+        tables = extras.get("numeral_tables")
+        roman_symbols = {value: roman for roman, value in self.roman_numbers.items()}
+        if tables is not None and tables["roman_symbols"] == roman_symbols:
+            from Solution1.Numerals import NumeralTable
+            self._numeral_table = NumeralTable.from_tables(self.foreign_numbers, tables)
+        if self.history is not None:
+            # without a saved version (e.g. after a reset) the numbering continues after the history file
+            self.history.restore(extras.get("history_version"))
+        if self.journal is None:
+            return
+
+        # records which were merged into the backup before a crash prevented truncating the journal are skipped
+        for seq, operation, args in self.journal.replay():
+            if seq > self.journal_seq:
+                self._apply_mutation(operation, args)
+                self.journal_seq = seq
+        self.estimated_bytes = self._count_bytes()
+
+    def export_snapshot(self, path: str):
+        """
+        Export the product prices and foreign numbers into a read-only snapshot file, which worker processes attach
+        to without loading their own copy, see SharedSnapshot. Replaces a previous snapshot file atomically.
+        :param path: Path of the snapshot file.
+        """
+        from Solution1.SharedSnapshot import write_snapshot
+
+        write_snapshot(path, self.knowledge_base, self.foreign_numbers, self.roman_numbers, self.generation)
+
+    def get_snapshot(self) -> list:
+        """
+        Returns a copy of the current knowledge in the format of the backup file.
+        :return: List of the knowledge base, the foreign numbers and the exchange rates.
+        """
+        return [dict(self.knowledge_base), dict(self.foreign_numbers), list(self.currencies.rates)]
+
+    def restore_snapshot(self, snapshot: list):
+        """
+        Replaces the current knowledge with a snapshot.
+        :param snapshot: List of the knowledge base, the foreign numbers and optionally the exchange rates, see
+            get_snapshot.
+        """
+        self._pending_load = False
+        self.generation += 1
+        knowledge_base, self.foreign_numbers, *exchange_rates = snapshot
+        self._set_exchange_rates(exchange_rates[0] if exchange_rates and exchange_rates[0] else None)
+        # backups written before prices were exact contain floats
+        self.knowledge_base = self._new_knowledge_base((product, Price.from_value(price))
+                                                       for product, price in knowledge_base.items())
+        self._numerals_shared = False
+        self._invalidate_numerals()
+        self._suggestion_indexes = {}
+        self.estimated_bytes = self._count_bytes()
+        if self.subscribers:
+            self._emit("restore_snapshot", (self.get_snapshot(),))
+
+    def get_name_index(self, operation: str):
+        """
+        Returns the sorted names of the products or foreign numbers, built once per generation of the knowledge.
+        :param operation: "knowledge_base" for the products, "foreign_number" for the foreign numbers.
+        :return: Listing.SortedNameIndex of the names.
+        """
+        # imported on first use, since it needs re (see the startup of MainSolution1)
+        from Solution1.Listing import SortedNameIndex
+
+        dictionary = self.knowledge_base if operation == "knowledge_base" else self.foreign_numbers
+        cached_dictionary, generation, index = self._name_indexes.get(operation, (None, None, None))
+        if cached_dictionary is not dictionary or generation != self.generation:
+            index = SortedNameIndex(dictionary)
+            self._name_indexes[operation] = (dictionary, self.generation, index)
+        return index
+
+    def batch(self):
+        """
+        :return: Context manager yielding this translator for several changes, which a ConcurrentTranslator publishes
+            at once.
+        """
+        from contextlib import nullcontext
+
+        return nullcontext(self)
+
+    def reader(self):
+        """
+        :return: Object answering the questions of one input line. All reads of a Translator see the same knowledge
+            anyway, a ConcurrentTranslator returns a view of one snapshot.
+        """
+        return self
 
     def get_knowledge_base(self):
         return self.knowledge_base
@@ -13,3 +13,24 @@ class ForeignNumberException(Exception):
 
     def __init__(self, message):
         super().__init__(message)
+
+
+class RomanNumeralException(Exception):
+    """Exception raised if foreign numbers do not form a valid Roman numeral."""
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class MemoryBudgetException(Exception):
+    """Exception raised if a new entry would exceed the memory budget of a translator."""
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class CurrencyException(Exception):
+    """Exception raised if an exchange rate is missing or contradicts the known exchange rates."""
+
+    def __init__(self, message):
+        super().__init__(message)
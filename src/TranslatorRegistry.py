@@ -0,0 +1,127 @@
+""" Registry of named translators (tenants) with shared foreign number vocabularies. """
+
+import os
+import re
+import time
+import weakref
+
+from Solution1.Numerals import NumeralTable
+from Solution1.Translator import Translator
+
+_TENANT_NAME = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class TranslatorRegistry:
+    """
+    Named translators, each one with its own product prices and backup file in a common directory. Tenants with the
+    same foreign numbers share one vocabulary and its lookup structures; a tenant changing its foreign numbers gets its
+    own copy. Tenants not used for idle_timeout seconds are saved and dropped from memory, and loaded again from their
+    backup on the next use.
+    """
+
+    def __init__(self, directory: str, memory_budget: int = None, idle_timeout: float = 600.0, cache_size: int = 256,
+                 journal: bool = False, price_rounding: str = None, clock=time.monotonic):
+        """
+        :param directory: Directory of the backup files, one "<name>.pkl" per tenant.
+        :param memory_budget: Memory budget in bytes of every tenant, see Translator. None for no limit.
+        :param idle_timeout: Seconds after the last use after which a tenant is dropped from memory.
+        :param cache_size: Size of the foreign number caches of every tenant.
+        :param journal: If True, the tenants journal their changes, see Translator.
+        :param price_rounding: Rounding mode of the answers of all tenants, see Translator.
+        :param clock: Function returning the current time in seconds.
+        """
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.idle_timeout = idle_timeout
+        self.cache_size = cache_size
+        self.journal = journal
+        self.price_rounding = price_rounding
+        self.clock = clock
+        self.tenants = {}
+        self.last_used = {}
+        # vocabularies still used by at least one tenant, by their (foreign number, Roman numeral) pairs
+        self.vocabularies = weakref.WeakValueDictionary()
+        self._last_sweep = clock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, name: str) -> Translator:
+        """
+        Returns a tenant and loads it from its backup if it is not in memory. Idle tenants are dropped on the way.
+        :param name: Name of the tenant (letters, digits, "_" and "-").
+        :return: Translator of the tenant.
+        :raises ValueError: If the name is invalid.
+        """
+        now = self.clock()
+        if now - self._last_sweep >= self.idle_timeout / 2:
+            self.evict_idle(now)
+
+        translator = self.tenants.get(name)
+        if translator is None:
+            translator = self._load(name)
+        self.last_used[name] = now
+        return translator
+
+    def _load(self, name: str) -> Translator:
+        if not _TENANT_NAME.fullmatch(name):
+            raise ValueError(f"Invalid tenant name '{name}'")
+        translator = Translator(os.path.join(self.directory, name + ".pkl"), cache_size=self.cache_size,
+                                journal=self.journal, price_rounding=self.price_rounding,
+                                memory_budget=self.memory_budget)
+        translator.load_data()
+        self.share_numerals(translator)
+        self.tenants[name] = translator
+        return translator
+
+    def share_numerals(self, translator: Translator):
+        """
+        Lets a translator use the stored vocabulary with the same foreign numbers, or stores its vocabulary for other
+        tenants. Called on loading; call it again after a tenant changed its foreign numbers to share them again.
+        :param translator: Translator of a tenant.
+        """
+        key = frozenset(translator.foreign_numbers.items())
+        numeral_table = self.vocabularies.get(key)
+        if numeral_table is None:
+            numeral_table = NumeralTable(dict(translator.foreign_numbers), translator.roman_numbers)
+            self.vocabularies[key] = numeral_table
+        translator.share_numerals(numeral_table)
+
+    def save(self, name: str):
+        """Saves a tenant in memory to its backup file."""
+        self.tenants[name].save_data()
+
+    def evict(self, name: str):
+        """Saves a tenant and drops it from memory."""
+        translator = self.tenants.pop(name)
+        self.last_used.pop(name, None)
+        translator.save_data()
+        if translator.journal is not None:
+            translator.journal.close()
+
+    def evict_idle(self, now: float = None) -> list[str]:
+        """
+        Saves and drops all tenants which were not used for idle_timeout seconds.
+        :param now: Current time, by default the time of the clock.
+        :return: Names of the dropped tenants.
+        """
+        now = self.clock() if now is None else now
+        self._last_sweep = now
+        idle = [name for name, last_used in self.last_used.items() if now - last_used >= self.idle_timeout]
+        for name in idle:
+            self.evict(name)
+        return idle
+
+    def close(self):
+        """Saves and drops all tenants."""
+        for name in list(self.tenants):
+            self.evict(name)
+
+    def stats(self) -> dict:
+        """
+        :return: Number of tenants in memory, number of distinct vocabularies in use and the estimated bytes of every
+            tenant (only counted if a memory budget is set).
+        """
+        return {
+            "tenants": len(self.tenants),
+            "vocabularies": len(self.vocabularies),
+            "estimated_bytes": {name: translator.estimated_bytes for name, translator in self.tenants.items()},
+        }
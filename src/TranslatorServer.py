@@ -0,0 +1,159 @@
+""" Line based TCP / Unix socket server sharing one Translator between many concurrent clients. """
+
+import asyncio
+import io
+import itertools
+import sys
+import time
+
+from Solution1.LineOutput import LineCapture, install
+from Solution1.MainSolution1 import create_command_map, create_grammar, dispatch
+
+# commands available to remote clients; the others read or write files of the server or delete its backup
+SERVER_COMMANDS = {"help", "save", "exit"}
+# commands which block for a while and are run in a worker thread instead of the event loop
+BLOCKING_COMMANDS = {"save"}
+
+class RefusedCommand:
+    """Command handler answering commands which are not available to remote clients."""
+
+    def handle(self, inputs, translator):
+        print(f"The command '{inputs[0]}' is not available on the server")
+
+
+def create_server_command_map() -> dict:
+    """
+    :return: Command map of the interactive mode, in which all commands except SERVER_COMMANDS are refused.
+    """
+    return {name: command if name in SERVER_COMMANDS else RefusedCommand()
+            for name, command in create_command_map().items()}
+
+
+class ClientSession:
+    """State of one client connection."""
+
+    def __init__(self, session_id: int, peer):
+        self.session_id = session_id
+        self.peer = peer
+        self.connected_at = time.time()
+        self.lines = 0
+
+
+class TranslatorServer:
+    """
+    Serves the translator over a line protocol: every line sent by a client is handled exactly like an input line of
+    the interactive mode and the printed answer is sent back. Clients may pipeline any number of lines, the answers
+    are sent in order. A client is only served as fast as it reads its answers, so a slow client cannot stall others.
+    Only the commands in SERVER_COMMANDS are available to clients. The lines are answered one at a time; blocking
+    commands (save) run in a worker thread, so the event loop keeps serving the connections meanwhile.
+    """
+
+    def __init__(self, translator, grammar=None, write_limit: int = 64 * 1024, yield_every: int = 64,
+                 response_cache=None):
+        """
+        :param translator: Translator instance shared by all clients.
+        :param grammar: Grammar of all statement types. Defaults to the one of the interactive mode with the commands
+            of create_server_command_map.
+        :param write_limit: Number of unsent bytes per client after which reading from that client pauses.
+        :param yield_every: Number of pipelined lines after which a client gives way to the other clients.
+        :param response_cache: Optional ResponseCache answering repeated questions of all clients.
+        """
+        self.translator = translator
+        self.grammar = grammar if grammar is not None else create_grammar(create_server_command_map())
+        self.write_limit = write_limit
+        self.yield_every = yield_every
+        self.response_cache = response_cache
+        self.sessions = {}
+        self._session_ids = itertools.count(1)
+        # serializes the lines of all clients, so no line sees the translator during a save in a worker thread
+        self._lock = asyncio.Lock()
+
+    async def answer(self, line: bytes) -> tuple[bytes, bool]:
+        """
+        Handles one input line and returns everything that was printed. The exit command only ends the session.
+        :param line: Raw input line.
+        :return: Tuple of the encoded answer and whether the session should be closed.
+        """
+        install()
+        inputs = line.decode(errors="replace").split()
+        async with self._lock:
+            if inputs and inputs[0].lower() in BLOCKING_COMMANDS:
+                # to_thread runs the command in a copy of this context, i.e. with the output of this line
+                return await asyncio.to_thread(self._answer, inputs)
+            return self._answer(inputs)
+
+    def _answer(self, inputs: list[str]) -> tuple[bytes, bool]:
+        closing = False
+        with LineCapture(io.StringIO()) as out:
+            try:
+                dispatch(inputs, self.translator, self.grammar, self.response_cache)
+            except SystemExit:
+                closing = True
+        return out.getvalue().encode(), closing
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = ClientSession(next(self._session_ids), writer.get_extra_info("peername"))
+        self.sessions[session.session_id] = session
+        writer.transport.set_write_buffer_limits(high=self.write_limit)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(b"Input line too long\n")
+                    break
+                if not line:
+                    break
+
+                session.lines += 1
+                answer, closing = await self.answer(line)
+                writer.write(answer)
+                if closing:
+                    break
+
+                # waits only if the client does not read its answers (backpressure)
+                await writer.drain()
+                if session.lines % self.yield_every == 0:
+                    await asyncio.sleep(0)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self.sessions[session.session_id]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, address: str) -> asyncio.AbstractServer:
+        """
+        Starts listening.
+        :param address: "host:port" for TCP or the path of a Unix socket.
+        :return: The started asyncio server.
+        """
+        if "/" in address:
+            return await asyncio.start_unix_server(self.handle_connection, path=address, backlog=1024)
+        host, _, port = address.rpartition(":")
+        return await asyncio.start_server(self.handle_connection, host or "127.0.0.1", int(port), backlog=1024)
+
+    async def serve_forever(self, address: str):
+        server = await self.start(address)
+        async with server:
+            await server.serve_forever()
+
+
+def run_server(translator, address: str, response_cache=None):
+    """
+    Runs the server until it is interrupted.
+    :param translator: Translator instance shared by all clients.
+    :param address: "host:port" for TCP or the path of a Unix socket.
+    :param response_cache: Optional ResponseCache answering repeated questions of all clients.
+    """
+    stdout = sys.stdout
+    try:
+        asyncio.run(TranslatorServer(translator, response_cache=response_cache).serve_forever(address))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout = stdout
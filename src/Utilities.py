@@ -1,9 +1,10 @@
 """ Utilities module for the translator application."""
 
-import re
-
 from Solution1.TranslatorExceptions import ProductException
 
+# compiled on the first use, so that re is not imported at startup
+_ROMAN_PATTERN = None
+
 
 def extract_product_name(values: list[str]):
     """
@@ -41,6 +42,20 @@ def print_error():
     print("I have no idea what you are talking about")
 
 
+def did_you_mean(suggestion) -> str:
+    """
+    Formats a spelling suggestion as addition to an error message.
+    :param suggestion: Suggested word or None.
+    :return: Text like " Did you mean 'Silver'?" or an empty string if there is no suggestion.
+    """
+    return f" Did you mean '{suggestion}'?" if suggestion is not None else ""
+
+
+def print_invalid_roman_numeral():
+    """Prints an error message when foreign numbers do not form a valid Roman numeral."""
+    print("Invalid Roman numeral. See https://en.wikipedia.org/wiki/Roman_numerals")
+
+
 def is_roman(s: str) -> bool:
     """
     Checks if the given string is a valid Roman numeral.
@@ -49,12 +64,16 @@ def is_roman(s: str) -> bool:
     """
     if not s:
         return False
-    _ROMAN_PATTERN = re.compile(
-        r'^M{0,3}(CM|CD|D?C{0,3})'
-        r'(XC|XL|L?X{0,3})'
-        r'(IX|IV|V?I{0,3})$'
-    )
 
+    global _ROMAN_PATTERN
+    if _ROMAN_PATTERN is None:
+        import re
+
+        _ROMAN_PATTERN = re.compile(
+            r'^M{0,3}(CM|CD|D?C{0,3})'
+            r'(XC|XL|L?X{0,3})'
+            r'(IX|IV|V?I{0,3})$'
+        )
     return bool(_ROMAN_PATTERN.fullmatch(s))
 
 
@@ -0,0 +1,288 @@
+""" Microbenchmarks for the hot paths of the translator application.
+
+Usage:
+    python benchmarks/run_benchmarks.py --lines 20000 --output results.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --threshold 0.2
+
+The results are compared with benchmarks/baseline.json (or --baseline FILE). The exit code is 1 if the minimum time of
+a benchmark is slower than the median time of the baseline by more than the threshold. The baseline is scaled by the
+calibration benchmark, a fixed pure Python workload, so a baseline taken on another machine can be used as well.
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Solution1.Cache import ResponseCache
+from Solution1.CompactStorage import CompactKnowledgeBase
+from Solution1.MainSolution1 import create_command_map, create_grammar, dispatch, handle_foreign_question, \
+    handle_product_question, handle_product_price_definition, run_batch
+from Solution1.Pricing import Price
+from Solution1.Translator import Translator
+
+# lines per run_batch call of the run_batch benchmark
+_BATCH_LINES = 10
+_DIGIT_LETTERS = str.maketrans("0123456789", "abcdefghij")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+_ROMAN_VALUES = [(1000, "M"), (900, "CM"), (500, "D"), (400, "CD"), (100, "C"), (90, "XC"), (50, "L"), (40, "XL"),
+                 (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")]
+
+
+def to_roman(number: int) -> str:
+    result = ""
+    for value, symbols in _ROMAN_VALUES:
+        while number >= value:
+            result += symbols
+            number -= value
+    return result
+
+
+class Corpus:
+    """Synthetic notes and questions of a configurable size."""
+
+    def __init__(self, vocabulary: int = 14, products: int = 100, numeral_length: int = 6,
+                 invalid_share: float = 0.1, lines: int = 10000, seed: int = 42):
+        rng = random.Random(seed)
+        self.config = {"vocabulary": vocabulary, "products": products, "numeral_length": numeral_length,
+                       "invalid_share": invalid_share, "lines": lines, "seed": seed}
+
+        # every Roman symbol gets at least one foreign word
+        symbols = "IVXLCDM"
+        # foreign numbers have no digits, so the index is spelled with letters
+        self.words = {"w" + str(index).translate(_DIGIT_LETTERS): symbols[index % len(symbols)]
+                      for index in range(max(vocabulary, len(symbols)))}
+        words_of = {symbol: [word for word, roman in self.words.items() if roman == symbol] for symbol in symbols}
+        romans = [roman for roman in map(to_roman, range(1, 4000)) if len(roman) <= numeral_length]
+        self.numerals = [[rng.choice(words_of[symbol]) for symbol in rng.choice(romans)] for _ in range(1000)]
+        self.product_names = [f"Product{index}" for index in range(products)]
+
+        self.definitions = [f"{word} is {roman}" for word, roman in self.words.items()]
+        self.definitions += [f"{' '.join(rng.choice(self.numerals))} {product} is {rng.randint(1, 10000)} coins"
+                             for product in self.product_names]
+
+        self.questions = []
+        for _ in range(lines):
+            numeral = rng.choice(self.numerals)
+            if rng.random() < invalid_share:
+                # unknown word or a sequence breaking the Roman numeral rules
+                numeral = numeral + ["unknown"] if rng.random() < 0.5 else numeral + numeral[-1:] * 4
+            if rng.random() < 0.5:
+                self.questions.append(f"how much is {' '.join(numeral)} ?")
+            else:
+                self.questions.append(f"how many coins is {' '.join(numeral)} {rng.choice(self.product_names)} ?")
+
+    def translator(self) -> Translator:
+        translator = Translator(backup_path=None)
+        with redirect_stdout(io.StringIO()):
+            run_batch(io.StringIO("\n".join(self.definitions)), translator, create_grammar(create_command_map()),
+                      io.StringIO())
+        return translator
+
+
+def calibrate(_):
+    """Fixed pure Python workload, which measures the speed of the machine and interpreter, not of this project."""
+    total = 0
+    for number in range(200):
+        total += len(str(number * number)) % 7
+    return total
+
+
+def measure(benchmarks: dict, repeat: int, block_size: int = 500) -> dict:
+    """
+    Calls the function of every benchmark for all of its items, once to warm up the caches and then in repeat timed
+    rounds. The items are timed in short blocks, and the rounds of all benchmarks take turns, so a slowdown of the
+    machine for a while (e.g. by other processes) only spoils a few blocks, of which the fastest repetition counts.
+    The garbage collector is disabled while timing (like timeit does), since its runs depend on everything allocated
+    before.
+    :param benchmarks: Map of benchmark names to a function and the items it is called with.
+    :param repeat: Number of timed rounds.
+    :param block_size: Number of calls timed at once.
+    :return: Map of the benchmark names to a tuple of the minimum and the median time per call in nanoseconds. The
+        minimum adds up the fastest repetition of every block, the median is the one of the whole rounds.
+    """
+    blocks = {name: [items[start:start + block_size] for start in range(0, len(items), block_size)]
+              for name, (_, items) in benchmarks.items()}
+    # times of every block by benchmark, one list of repetitions per block
+    times = {name: [[] for _ in blocks[name]] for name in benchmarks}
+    gc_enabled = gc.isenabled()
+    with redirect_stdout(io.StringIO()):
+        for function, items in benchmarks.values():
+            for item in items:
+                function(item)
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                for name, (function, _) in benchmarks.items():
+                    for block, block_times in zip(blocks[name], times[name]):
+                        start = time.perf_counter_ns()
+                        for item in block:
+                            function(item)
+                        block_times.append(time.perf_counter_ns() - start)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    results = {}
+    for name, (_, items) in benchmarks.items():
+        count = max(len(items), 1)
+        rounds = [sum(round_times) / count for round_times in zip(*times[name])]
+        results[name] = (sum(map(min, times[name])) / count, statistics.median(rounds))
+    return results
+
+
+def run_benchmarks(corpus: Corpus, repeat: int = 7) -> dict:
+    """
+    Runs all benchmarks on the corpus: the numeral evaluation, the grammar, the handlers and the full dispatch of a
+    line, with and without the response cache.
+    :return: Map of the benchmark names to a map of the minimum ("min") and the median ("median") time per operation
+        in nanoseconds.
+    """
+    translator = corpus.translator()
+    uncached = corpus.translator()
+    uncached.numeral_cache.max_size = 0
+    uncached.validated_numeral_cache.max_size = 0
+    grammar = create_grammar(create_command_map())
+    response_cache = ResponseCache()
+
+    valid_numerals = corpus.numerals
+    question_tokens = [line.split() for line in corpus.questions]
+    definition_tokens = [line.split() for line in corpus.definitions]
+    foreign_questions = [grammar.parse(tokens) for tokens in question_tokens if tokens[1] == "much"]
+    product_questions = [grammar.parse(tokens) for tokens in question_tokens if tokens[1] == "many"]
+    definitions = [grammar.parse(line.split()) for line in corpus.definitions if "coins" in line]
+    # the batch mode reads chunks of lines, so the costs of a run_batch call are shared by the lines of a chunk
+    batches = ["\n".join(corpus.questions[start:start + _BATCH_LINES])
+               for start in range(0, len(corpus.questions), _BATCH_LINES)]
+
+    benchmarks = {
+        "calibration": (calibrate, range(100)),
+        "calc_foreign_numbers": (translator.calc_foreign_numbers, valid_numerals),
+        "calc_foreign_numbers_uncached": (uncached.calc_foreign_numbers, valid_numerals),
+        "evaluate_foreign_numbers": (translator.evaluate_foreign_numbers, valid_numerals),
+        "evaluate_foreign_numbers_uncached": (uncached.evaluate_foreign_numbers, valid_numerals),
+        "grammar_parse_questions": (grammar.parse, question_tokens),
+        "grammar_parse_definitions": (grammar.parse, definition_tokens),
+        "handle_foreign_question": (lambda parsed: handle_foreign_question(parsed, translator), foreign_questions),
+        "handle_product_question": (lambda parsed: handle_product_question(parsed, translator), product_questions),
+        "handle_product_price_definition": (lambda parsed: handle_product_price_definition(parsed, uncached),
+                                            definitions),
+        "dispatch": (lambda tokens: dispatch(tokens, translator, grammar), question_tokens),
+        "dispatch_response_cache": (lambda tokens: dispatch(tokens, translator, grammar, response_cache),
+                                    question_tokens),
+        # per line of the batch mode, including reading and tokenizing the lines and writing the answers
+        "run_batch": (lambda batch: run_batch(io.StringIO(batch), translator, grammar, io.StringIO()), batches),
+    }
+    results = {}
+    for name, (best, median) in measure(benchmarks, repeat).items():
+        if name == "run_batch":
+            # per line
+            best, median = best / _BATCH_LINES, median / _BATCH_LINES
+        results[name] = {"min": best, "median": median}
+    return results
+
+
+def measure_memory(products: int = 100000, seed: int = 42) -> dict:
+    """
+    Measures the memory of the product prices stored in a dict and in a CompactKnowledgeBase. The product names exist
+    before the measurement, so only the storage itself is counted.
+    :return: Map of the storage names to bytes per product.
+    """
+    rng = random.Random(seed)
+    names = [f"Product{index}" for index in range(products)]
+    prices = [(rng.randint(1, 10 ** 6), rng.randint(1, 1000)) for _ in range(products)]
+
+    results = {}
+    for name, factory in (("dict", dict), ("compact", CompactKnowledgeBase)):
+        tracemalloc.start()
+        storage = factory()
+        for product, (numerator, denominator) in zip(names, prices):
+            storage[product] = Price(numerator, denominator)
+        results[name] = tracemalloc.get_traced_memory()[0] / max(products, 1)
+        tracemalloc.stop()
+        del storage
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compares the minimum times with the median times of a baseline. The minimum is what the code can do at best and
+    the median what it usually did, so the noise of a busy machine does not show up as regression. If both contain
+    the calibration benchmark, the baseline is scaled by the ratio of their median calibration times first, so the
+    speed of the machine does not count.
+    :param results: Map of benchmark names to their times, see run_benchmarks.
+    :param baseline: Map of benchmark names to their times of the baseline.
+    :param threshold: Allowed slowdown, e.g. 0.2 for 20 %.
+    :return: Descriptions of all benchmarks slower than the baseline by more than the threshold.
+    """
+    scale = 1.0
+    if "calibration" in results and "calibration" in baseline:
+        scale = results["calibration"]["median"] / baseline["calibration"]["median"]
+    regressions = []
+    for name, times in results.items():
+        if name == "calibration" or name not in baseline:
+            continue
+        reference = baseline[name]["median"] * scale
+        if times["min"] > reference * (1 + threshold):
+            regressions.append(f"{name}: {times['min']:.0f} ns/op (baseline {reference:.0f} ns/op, "
+                               f"+{(times['min'] / reference - 1) * 100:.0f} %)")
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the translator hot paths")
+    parser.add_argument("--vocabulary", type=int, default=14, help="Number of foreign number words")
+    parser.add_argument("--products", type=int, default=100, help="Number of products")
+    parser.add_argument("--numeral-length", type=int, default=6, help="Maximum number of words per numeral")
+    parser.add_argument("--invalid-share", type=float, default=0.1, help="Share of invalid questions")
+    parser.add_argument("--lines", type=int, default=10000, help="Number of questions")
+    parser.add_argument("--repeat", type=int, default=7,
+                        help="Timed repetitions per benchmark, the minimum is compared with the baseline")
+    parser.add_argument("--output", help="Writes the results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Fails if a benchmark is slower than in this result file (default: %(default)s)")
+    parser.add_argument("--no-baseline", action="store_true", help="Skips the comparison with the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Stores the results as new baseline")
+    parser.add_argument("--memory-products", type=int, default=100000,
+                        help="Number of products of the memory measurement, 0 to skip it")
+    args = parser.parse_args(argv)
+
+    corpus = Corpus(args.vocabulary, args.products, args.numeral_length, args.invalid_share, args.lines)
+    results = run_benchmarks(corpus, args.repeat)
+    report = {"config": corpus.config, "python": sys.version.split()[0], "ns_per_op": results}
+
+    print(f"{'benchmark':36} {'min':>12} {'median':>12}")
+    for name, times in results.items():
+        print(f"{name:36} {times['min']:12.0f} {times['median']:12.0f} ns/op")
+    if args.memory_products:
+        report["bytes_per_product"] = measure_memory(args.memory_products)
+        for name, size in report["bytes_per_product"].items():
+            print(f"{'knowledge base ' + name:36} {size:12.0f} bytes/product")
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if not args.no_baseline and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f)["ns_per_op"], args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
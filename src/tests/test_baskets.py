@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import pytest
+
+from Solution1.Baskets import value_basket
+from Solution1.Pricing import Price
+from Solution1.Translator import Translator
+from Solution1.TranslatorExceptions import RomanNumeralException
+
+
+@pytest.fixture
+def translator():
+    t = Translator(backup_path=None)
+    t.restore_snapshot([{"Silver": Price(17, 2), "Gold": 14450, "Iron": Price(391, 20)},
+                        {"glob": "I", "prok": "V", "pish": "X", "tegj": "L"}])
+    return t
+
+
+def test_value_basket(translator):
+    assert value_basket({"Silver": Price(17, 2), "Iron": Price(1, 3)}, [(2, "Silver"), (1, "Iron")]) == Price(52, 3)
+    assert translator.value_basket([("glob prok", "Silver"), (["pish"], "Gold")]) == 144534
+    assert translator.value_basket([]) == 0
+    with pytest.raises(KeyError):
+        translator.value_basket([("glob", "Silver"), ("glob", "Copper")])
+    with pytest.raises(RomanNumeralException):
+        translator.value_basket([("glob glob glob glob", "Silver")])
+
+
+def test_value_portfolios_matches_value_basket(translator):
+    pytest.importorskip("numpy")
+    portfolios = [
+        [("glob prok", "Silver"), ("pish", "Gold")],
+        [],
+        [("glob glob glob glob", "Iron")],
+        [("pish", "Copper")],
+        [("pish tegj", "Iron"), ("glob", "Silver")],
+    ]
+    totals, denominators, invalid = translator.value_portfolios(portfolios)
+    assert list(invalid) == [False, False, True, True, False]
+    assert list(totals[invalid]) == [0, 0]
+    for basket, total, denominator, is_invalid in zip(portfolios, totals, denominators, invalid):
+        if not is_invalid:
+            assert Price(int(total), int(denominator)) == translator.value_basket(basket)
+
+
+def test_value_portfolios_beyond_int64():
+    pytest.importorskip("numpy")
+    t = Translator(backup_path=None)
+    t.restore_snapshot([{"A": Price(2 ** 62), "B": Price(1, 3)}, {"glob": "I", "prok": "V"}])
+    totals, denominators, invalid = t.value_portfolios([[("glob", "A"), ("prok", "A"), ("glob", "B")]])
+    assert not invalid[0]
+    assert Price(int(totals[0]), int(denominators[0])) == Price(18 * 2 ** 62 + 1, 3)
+
+
+def test_value_portfolios_with_many_denominators_stays_int64():
+    np = pytest.importorskip("numpy")
+    t = Translator(backup_path=None)
+    # the common denominator of all prices has 25 digits
+    t.restore_snapshot([{f"product{i}": Price(i + 1, i % 60 + 1) for i in range(1000)}, {"glob": "I", "prok": "V"}])
+    portfolios = [[("prok", f"product{(7 * i + j * 13) % 1000}") for j in range(i % 12)] for i in range(300)]
+    totals, denominators, invalid = t.value_portfolios(portfolios)
+    assert totals.dtype == np.int64 and denominators.dtype == np.int64
+    assert not invalid.any()
+    for basket, total, denominator in zip(portfolios, totals, denominators):
+        assert Price(int(total), int(denominator)) == t.value_basket(basket)
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import json
+
+import pytest
+
+from Solution1.Pricing import Price
+from Solution1.benchmarks.run_benchmarks import DEFAULT_BASELINE, Corpus, run_benchmarks, find_regressions, \
+    measure_memory
+
+
+def test_benchmarks_run_on_small_corpus():
+    results = run_benchmarks(Corpus(products=5, lines=50), repeat=2)
+    assert 0 < results["dispatch"]["min"] <= results["dispatch"]["median"]
+    assert {"calibration", "grammar_parse_questions", "dispatch_response_cache", "run_batch"} <= results.keys()
+
+
+def test_committed_baseline_covers_all_benchmarks():
+    with open(DEFAULT_BASELINE) as f:
+        baseline = json.load(f)["ns_per_op"]
+    assert baseline.keys() == run_benchmarks(Corpus(products=5, lines=50), repeat=1).keys()
+
+
+def test_find_regressions():
+    baseline = {"dispatch": {"min": 80.0, "median": 100.0}, "calc": {"min": 8.0, "median": 10.0}}
+    assert find_regressions({"dispatch": {"min": 119.0}, "calc": {"min": 5.0}}, baseline, 0.2) == []
+    regressions = find_regressions({"dispatch": {"min": 150.0}, "calc": {"min": 10.0}, "new": {"min": 1.0}},
+                                   baseline, 0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("dispatch")
+
+
+def test_find_regressions_scales_by_calibration():
+    baseline = {"calibration": {"min": 90.0, "median": 100.0}, "dispatch": {"min": 90.0, "median": 100.0}}
+    # a machine half as fast is no regression, the same time on a machine twice as fast is
+    assert find_regressions({"calibration": {"median": 200.0}, "dispatch": {"min": 190.0}}, baseline, 0.2) == []
+    assert len(find_regressions({"calibration": {"median": 50.0}, "dispatch": {"min": 100.0}}, baseline, 0.2)) == 1
+
+
+@pytest.mark.parametrize("products", [2000, 5000, 20000])
+def test_compact_knowledge_base_needs_less_memory(products):
+    memory = measure_memory(products)
+    # compact: a name reference and two int64 per product, at most 8 hash slots of int64 per product (load factor of
+    # at least 1/8 after a resize) and the over-allocation of the list and arrays
+    assert memory["compact"] < (8 + 16) * 1.25 + 8 * 8
+    # dict: at least one Price object and one dict entry (an index and three pointers) per product
+    assert memory["dict"] > sys.getsizeof(Price(1, 1)) + 32
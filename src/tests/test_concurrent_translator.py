@@ -0,0 +1,157 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import threading
+
+from Solution1.ConcurrentTranslator import ConcurrentTranslator
+from Solution1.MainSolution1 import create_command_map, create_grammar, dispatch
+from Solution1.Pricing import Price
+from Solution1.Translator import Translator
+
+
+def test_readers_see_changes_after_the_batch():
+    translator = ConcurrentTranslator()
+    snapshot = translator.snapshot
+    with translator.batch() as writer:
+        writer.add_foreign_number("unu", "I")
+        writer.add_knowledge_base("Silver", 17)
+        assert "Silver" not in translator.get_knowledge_base()
+    assert translator.get_product_price("Silver") == 17
+    assert translator.calc_foreign_numbers(["unu", "unu"]) == 2
+    assert snapshot.get_knowledge_base() == {}
+
+    # unchanged parts of the knowledge are shared with the previous snapshot
+    translator.add_knowledge_base("Gold", 100)
+    assert translator.snapshot.numeral_table is not snapshot.numeral_table
+    numeral_table = translator.snapshot.numeral_table
+    translator.add_exchange_rate(1, "credit", 3, "coins")
+    assert translator.snapshot.numeral_table is numeral_table
+    assert translator.get_product_price_in("Gold", "credits") == Price(100, 3)
+
+
+def test_readers_are_not_blocked_by_a_writer():
+    translator = ConcurrentTranslator()
+    translator.add_knowledge_base("Silver", 17)
+    in_batch = threading.Event()
+    release = threading.Event()
+
+    def write():
+        with translator.batch() as writer:
+            writer.add_knowledge_base("Silver", 20)
+            in_batch.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    assert in_batch.wait(5)
+    assert translator.get_product_price("Silver") == 17
+    release.set()
+    thread.join()
+    assert translator.get_product_price("Silver") == 20
+
+
+def test_readers_never_see_a_half_applied_load(tmp_path, capsys):
+    # backup k: the foreign number "unu" is I or V and every product costs as many coins as "unu" is worth
+    paths = []
+    for roman, value in (("I", 1), ("V", 5)):
+        path = str(tmp_path / f"backup_{roman}.pkl")
+        backup = Translator(path)
+        backup.restore_snapshot([{f"product{i}": value for i in range(200)}, {"unu": roman}])
+        backup.save_data()
+        paths.append(path)
+
+    translator = ConcurrentTranslator(Translator(paths[0]))
+    translator.load_data()
+    stop = threading.Event()
+    errors = []
+    reads = []
+
+    def read():
+        count = 0
+        while not stop.is_set():
+            snapshot = translator.snapshot
+            value = snapshot.evaluate_foreign_numbers(["unu"])
+            prices = set(snapshot.get_knowledge_base().values())
+            if prices != {value} or len(snapshot.get_knowledge_base()) != 200:
+                errors.append((value, prices))
+            count += 1
+        reads.append(count)
+
+    # switch threads as often as possible, so readers run in the middle of every load
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    try:
+        for reader in readers:
+            reader.start()
+        for i in range(100):
+            with translator.batch() as writer:
+                writer.backup_path = paths[i % 2]
+                writer.load_data()
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+        sys.setswitchinterval(switch_interval)
+    assert errors == []
+    assert all(reads)
+
+
+def test_dispatch_with_concurrent_translator(capsys):
+    translator = ConcurrentTranslator()
+    grammar = create_grammar(create_command_map())
+    for line in ["unu is I", "kvin is V", "unu Silver is 17 coins", "how many coins is unu kvin Silver ?"]:
+        dispatch(line.split(), translator, grammar)
+    assert "unu kvin Silver is 68 coins" in capsys.readouterr().out
+
+
+def test_publishing_shares_the_copied_knowledge_base():
+    writer = Translator(backup_path=None, compact=True)
+    writer.restore_snapshot([{f"product{i}": i + 1 for i in range(10000)}, {}])
+    translator = ConcurrentTranslator(writer)
+    first = translator.snapshot.get_knowledge_base()
+    assert type(first) is type(writer.knowledge_base) and first is not writer.knowledge_base
+
+    for i in range(500):
+        translator.add_knowledge_base(f"product{i % 250}", Price(i + 7, 3))
+        translator.add_knowledge_base(f"new{i}", 5)
+    knowledge_base = translator.snapshot.get_knowledge_base()
+    # the copy is shared, the changes are kept in a few layers
+    assert knowledge_base.base is first and len(knowledge_base.layers) <= 12
+    assert dict(knowledge_base) == dict(writer.knowledge_base)
+    assert len(knowledge_base) == 10500 and list(knowledge_base)[-1] == "new499"
+    assert "new5" in knowledge_base and "new500" not in knowledge_base
+    assert translator.get_product_price("product249") == Price(506, 3)
+    assert first["product0"] == 1
+
+    translator.clear_knowledge_base()
+    translator.add_knowledge_base("Silver", 17)
+    assert dict(translator.get_knowledge_base()) == {"Silver": 17}
+    assert knowledge_base["product0"] == Price(257, 3)
+
+
+def test_reader_sees_one_snapshot():
+    translator = ConcurrentTranslator()
+    translator.add_foreign_number("unu", "I")
+    translator.add_knowledge_base("Silver", 17)
+    reader = translator.reader()
+    translator.add_foreign_number("unu", "V")
+    translator.add_knowledge_base("Silver", 20)
+    assert reader.evaluate_foreign_numbers(["unu"]) * reader.get_product_price("Silver") == 17
+    assert reader.generation < translator.generation
+    assert translator.reader().get_product_price("Silver") == 20
+
+
+def test_print_reads_names_and_prices_of_one_snapshot(capsys):
+    translator = ConcurrentTranslator()
+    grammar = create_grammar(create_command_map())
+    translator.add_knowledge_base("Silver", 17)
+    with translator.batch() as writer:
+        # not published yet, so the listing must not contain it
+        writer.add_knowledge_base("Gold", 100)
+        capsys.readouterr()
+        dispatch(["print", "knowledge_base"], translator, grammar)
+        assert capsys.readouterr().out == "Silver: 17\n"
+    dispatch(["print", "knowledge_base"], translator, grammar)
+    assert capsys.readouterr().out == "Gold: 100\nSilver: 17\n"
@@ -0,0 +1,81 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import pytest
+
+from Solution1.Currencies import CurrencyGraph, normalize_unit
+from Solution1.Pricing import Price
+from Solution1.Translator import Translator
+from Solution1.TranslatorExceptions import CurrencyException
+
+
+def test_normalize_unit():
+    assert normalize_unit("Credits") == normalize_unit("credit") == "credit"
+    assert normalize_unit("s") == "s"
+
+
+def test_currency_graph_converts_over_several_rates():
+    graph = CurrencyGraph()
+    assert graph.add_rate("credit", "coins", Price(3))
+    assert graph.add_rate("Gold", "credits", Price(12))
+    assert graph.add_rate("gem", "gold", Price(1, 2))
+    assert graph.convert(Price(1), "gold", "coins") == 36
+    assert graph.convert(Price(2), "gems", "credit") == 12
+    assert graph.convert(Price(5), "coins", "gold") == Price(5, 36)
+    assert graph.convert(Price(7), "coins", "Coins") == 7
+    assert graph.rate("gold", "silver") is None
+
+
+def test_currency_graph_detects_inconsistent_rates():
+    graph = CurrencyGraph()
+    graph.add_rate("credit", "coin", Price(3))
+    graph.add_rate("gold", "credit", Price(12))
+    assert not graph.add_rate("gold", "coin", Price(36))
+    with pytest.raises(CurrencyException):
+        graph.add_rate("coins", "gold", Price(1, 30))
+    with pytest.raises(CurrencyException):
+        graph.add_rate("gold", "Gold", Price(1))
+    assert len(graph.rates) == 2
+
+
+def test_currency_graph_without_path():
+    graph = CurrencyGraph()
+    graph.add_rate("credit", "coin", Price(3))
+    graph.add_rate("gold", "silver", Price(2))
+    with pytest.raises(CurrencyException):
+        graph.convert(Price(1), "gold", "coins")
+    graph.add_rate("silver", "credits", Price(5))
+    assert graph.convert(Price(1), "gold", "coins") == 30
+
+
+def test_currency_graph_long_chain_stays_consistent():
+    graph = CurrencyGraph()
+    for i in range(1, 1000):
+        graph.add_rate(f"unit{i}", f"unit{i - 1}", Price(2 if i % 2 else 1, 1 if i % 2 else 2))
+    assert graph.convert(Price(1), "unit999", "unit0") == 2
+    assert graph.convert(Price(1), "unit0", "unit998") == 1
+
+
+def test_translator_exchange_rates_are_saved_and_journaled(tmp_path, capsys):
+    path = str(tmp_path / "backup.pkl")
+    translator = Translator(path, journal=True)
+    translator.add_knowledge_base("Silver", 17)
+    translator.add_exchange_rate(1, "credit", 3, "coins")
+    translator.save_data()
+    translator.add_exchange_rate(1, "Gold", 12, "credits")
+    assert "Adding new exchange rate '1 Gold' with '12 credits'" in capsys.readouterr().out
+    assert translator.get_product_price_in("Silver", "Gold") == Price(17, 36)
+    translator.journal.close()
+
+    loaded = Translator(path, journal=True)
+    loaded.load_data()
+    assert loaded.convert(2, "gold", "coins") == 72
+    assert loaded.get_product_price_in("Silver", "credits") == Price(17, 3)
+
+    restored = Translator(backup_path=None)
+    restored.restore_snapshot(loaded.get_snapshot())
+    assert restored.convert(1, "gold", "coins") == 36
+    restored.clear_exchange_rates()
+    with pytest.raises(CurrencyException):
+        restored.convert(1, "gold", "coins")
@@ -0,0 +1,68 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import pytest
+
+from Solution1.Listing import SortedNameIndex, write_entries
+from Solution1.Translator import Translator
+
+NAMES = ["Silver", "Gold", "Iron", "Ironwood", "Irn", "Sil", "Zinc"]
+
+
+def test_prefix_range_is_contiguous():
+    index = SortedNameIndex(NAMES)
+    start, end = index.prefix_range("Ir")
+    assert index.names[start:end] == ["Irn", "Iron", "Ironwood"]
+    assert index.prefix_range("") == (0, len(NAMES))
+    start, end = index.prefix_range("Copper")
+    assert start == end
+    # no character comes after U+10FFFF
+    index = SortedNameIndex(["a", "a\U0010ffff", "a\U0010ffffb", "b", "\U0010ffff"])
+    start, end = index.prefix_range("a\U0010ffff")
+    assert index.names[start:end] == ["a\U0010ffff", "a\U0010ffffb"]
+    assert index.prefix_range("\U0010ffff") == (4, 5)
+
+
+@pytest.mark.parametrize("prefix, pattern, expected", [
+    ("", None, sorted(NAMES)),
+    ("Si", None, ["Sil", "Silver"]),
+    ("", "Ir*", ["Irn", "Iron", "Ironwood"]),
+    ("", "*n", ["Irn", "Iron"]),
+    ("Iro", "Ir?n*", ["Iron", "Ironwood"]),
+    ("S", "I*", []),
+    ("", "[GZ]*", ["Gold", "Zinc"]),
+    ("", "Gold", ["Gold"]),
+])
+def test_select_filters_by_prefix_and_pattern(prefix, pattern, expected):
+    count, names = SortedNameIndex(NAMES).select(prefix, pattern)
+    assert count == len(expected)
+    assert list(names) == expected
+
+
+@pytest.mark.parametrize("pattern", [None, "*"])
+def test_select_pages(pattern):
+    index = SortedNameIndex(f"P{i:03d}" for i in range(250))
+    count, names = index.select("P1", pattern, offset=40, limit=20)
+    assert count == 100
+    assert list(names) == [f"P{i:03d}" for i in range(140, 160)]
+    count, names = index.select("P2", pattern, offset=40, limit=20)
+    assert list(names) == [f"P{i:03d}" for i in range(240, 250)]
+
+
+def test_write_entries_in_chunks():
+    out = io.StringIO()
+    assert write_entries(out, {"b": 2, "a": 1, "c": 3}, ["a", "b", "c"], page_size=2) == 3
+    assert out.getvalue() == "a: 1\nb: 2\nc: 3\n"
+
+
+def test_name_index_is_rebuilt_after_changes():
+    translator = Translator(backup_path=None)
+    translator.add_knowledge_base("Silver", 17)
+    index = translator.get_name_index("knowledge_base")
+    assert translator.get_name_index("knowledge_base") is index
+    translator.add_knowledge_base("Gold", 100)
+    assert translator.get_name_index("knowledge_base").names == ["Gold", "Silver"]
+    translator.add_foreign_number("unu", "I")
+    assert translator.get_name_index("foreign_number").names == ["unu"]
@@ -3,46 +3,43 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 import builtins
+import io
 import pytest
 
-from Solution1.MainSolution1 import main, is_assignment, is_product_price_definition, is_foreign_question, \
-    is_product_question
+from Solution1.MainSolution1 import main, run_batch, create_command_map, create_grammar, parse_arguments, \
+    parse_simple_arguments, dispatch
+from Solution1.Cache import ResponseCache
+from Solution1.InputParser import ParsedLine
+from Solution1.Translator import Translator
 
 
-def test_is_assignment_true_and_false():
-    assert is_assignment(['unu', 'is', 'I'])
-    assert not is_assignment(['unu', 'unu', 'Silver', 'is', '34', 'coins'])
+@pytest.mark.parametrize("line, kind", [
+    ("unu is I", "assignment"),
+    ("unu unu Silver is 34 coins", "product_price_definition"),
+    ("how much is unu ?", "foreign_question"),
+    ("how many coins is unu Silver ?", "product_question"),
+    ("print knowledge_base", "command"),
+    ("", "command"),
+    ("unu unu Silver is 34", None),
+    ("how much unu ?", None),
+    ("how many is unu Silver ?", None),
+    # digits which are not ASCII digits are no numbers, digits in foreign numbers no foreign numbers
+    ("unu Silver is ² coins", None),
+    ("how do you say ① ?", None),
+    ("how much is unu2 ?", None),
+])
+def test_grammar_classifies_lines(line, kind):
+    parsed = create_grammar(create_command_map()).parse(line.split())
+    assert (parsed.kind if parsed is not None else None) == kind
 
 
-def test_is_product_price_definition_true_and_false():
-    assert is_product_price_definition(['unu', 'unu', 'Silver', 'is', '34', 'coins'])
-    assert not is_product_price_definition(['unu', 'is', 'I'])
-
-
-def test_is_foreign_question_true_and_false():
-    assert is_foreign_question(['how', 'much', 'is', 'unu', '?'])
-    assert not is_foreign_question(['how', 'many', 'coins', 'is', 'unu', 'Silver', '?'])
-
-
-def test_is_product_question_true_and_false():
-    assert is_product_question(['how', 'many', 'coins', 'is', 'unu', 'Silver', '?'])
-    assert not is_product_question(['how', 'much', 'is', 'unu', '?'])
-
-
-def test_is_assignment_empty_input():
-    assert not is_assignment([])
-
-
-def test_is_product_price_definition_no_coins():
-    assert not is_product_price_definition(['unu', 'unu', 'Silver', 'is', '34'])
-
-
-def test_is_foreign_question_invalid_syntax():
-    assert not is_foreign_question(['how', 'much', 'unu', '?'])
-
-
-def test_is_product_question_missing_coins():
-    assert not is_product_question(['how', 'many', 'is', 'unu', 'Silver', '?'])
+@pytest.mark.parametrize("line", ["unu Silver is ² coins", "how many coins was unu Silver at ¹ ?",
+                                  "how many coins is ① credits ?"])
+def test_dispatch_does_not_crash_on_other_digits(line, capsys):
+    translator = Translator(backup_path=None)
+    translator.add_foreign_number("unu", "I")
+    dispatch(line.split(), translator, create_grammar(create_command_map()))
+    assert capsys.readouterr().out
 
 
 # Main loop integration test
@@ -71,12 +68,12 @@ def test_main_full_flow1(monkeypatch, capsys):
     assert "Adding new foreign numbers 'kvin' with 'V'" in captured.out
     assert "Adding new foreign numbers 'dek' with 'X'" in captured.out
     assert "Adding new foreign numbers 'kvindek' with 'L'" in captured.out
-    assert "Adding new knowledge base 'Silver' with '17.0'" in captured.out
-    assert "Adding new knowledge base 'Gold' with '14450.0'" in captured.out
+    assert "Adding new knowledge base 'Silver' with '17'" in captured.out
+    assert "Adding new knowledge base 'Gold' with '14450'" in captured.out
     assert "Adding new knowledge base 'Iron' with '195.5'" in captured.out
-    assert "unu kvin Silver is 68.0 coins" in captured.out
-    assert "unu kvin Gold is 57800.0 coins" in captured.out
-    assert "unu kvin Iron is 782.0 coins" in captured.out
+    assert "unu kvin Silver is 68 coins" in captured.out
+    assert "unu kvin Gold is 57800 coins" in captured.out
+    assert "unu kvin Iron is 782 coins" in captured.out
     assert "I have no idea what you are talking about" in captured.out
 
 def test_main_full_flow2(monkeypatch, capsys):
@@ -109,3 +106,351 @@ def test_main_empty_input(monkeypatch, capsys):
         main()
     captured = capsys.readouterr()
     assert "Empty input. Showing help message..." in captured.out
+
+
+def test_run_batch_matches_interactive_output(monkeypatch, capsys):
+    lines = [
+        "unu is I",
+        "kvin is V",
+        "unu unu Silver is 34 coins",
+        "how much is unu kvin ?",
+        "how many coins is unu kvin Silver ?",
+        "",
+        "how much wood could a woodchuck chuck if a woodchuck could chuck wood ?",
+    ]
+    inputs = iter(lines + ["exit"])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    interactive = capsys.readouterr().out
+
+    out = io.StringIO()
+    processed = run_batch(io.StringIO("\n".join(lines + ["exit", "unu is V"]) + "\n"), Translator(),
+                          create_grammar(create_command_map()), out)
+    assert processed == len(lines) + 1
+    assert out.getvalue() == interactive
+
+
+def test_main_rejects_invalid_roman_numerals(monkeypatch, capsys):
+    inputs = iter([
+        "unu is I",
+        "dek is X",
+        "unu unu unu unu Silver is 8 coins",
+        "dek Silver is 20 coins",
+        "how many coins is unu unu unu unu Silver ?",
+        "how much is unu dek dek ?",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert captured.out.count("Invalid Roman numeral") == 3
+    assert "Adding new knowledge base 'Silver' with '2'" in captured.out
+
+
+def test_grammar_extracts_parts_in_one_parse():
+    grammar = create_grammar(create_command_map())
+    parsed = grammar.parse(['unu', 'unu', 'Silver', 'is', '34', 'coins'])
+    assert parsed.kind == "product_price_definition"
+    assert (parsed.numerals, parsed.product, parsed.coin_value) == (['unu', 'unu'], 'Silver', 34)
+
+    parsed = grammar.parse(['how', 'many', 'coins', 'is', 'unu', 'kvin', 'Silver', '?'])
+    assert parsed.kind == "product_question"
+    assert (parsed.numerals, parsed.product) == (['unu', 'kvin'], 'Silver')
+
+    assert grammar.parse(['how', 'much', 'is', 'unu', '?']).numerals == ['unu']
+    assert grammar.parse(['PRINT', 'knowledge_base']).kind == "command"
+    assert grammar.parse(['how', 'much', 'wood', '?']) is None
+
+
+def test_grammar_register_new_statement_type():
+    grammar = create_grammar(create_command_map())
+    grammar.register("greeting",
+                     lambda scan: ParsedLine("greeting", scan.tokens) if scan.starts_with("hello") else None,
+                     lambda parsed, translator: print("hi"), before="assignment")
+    assert grammar.kinds()[:2] == ["command", "greeting"]
+    assert grammar.parse(['hello', 'is', 'I']).kind == "greeting"
+
+
+def test_main_unknown_product(monkeypatch, capsys):
+    inputs = iter(["unu is I", "how many coins is unu Copper ?", "exit"])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    assert "I have no idea what you are talking about" in capsys.readouterr().out
+
+
+def test_stats_command_counts_handlers_and_errors(monkeypatch, capsys, tmp_path):
+    inputs = iter([
+        "stats on",
+        "unu is I",
+        "kvin is V",
+        "unu kvin Silver is 8 coins",
+        "how much is unu kvin ?",
+        "how much is unu foo ?",
+        "how many coins is unu Copper ?",
+        "how much wood could a woodchuck chuck if a woodchuck could chuck wood ?",
+        "stats",
+        f"stats export {tmp_path / 'stats.txt'}",
+        "stats off",
+        "stats reset",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert "assignment: calls=2 errors=[none]" in captured.out
+    assert "foreign_question: calls=2 errors=[ForeignNumberException=1]" in captured.out
+    assert "product_question: calls=1 errors=[KeyError=1]" in captured.out
+    assert "rejected lines: 1" in captured.out
+    assert "histogram product_price_definition:" in (tmp_path / 'stats.txt').read_text()
+
+
+def test_stats_export_to_missing_directory_does_not_exit(monkeypatch, capsys, tmp_path):
+    missing = tmp_path / "missing" / "stats.txt"
+    inputs = iter([
+        f"stats export {missing}",
+        "stats profile start",
+        f"stats profile stop {missing}",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert "Export failed: [Errno 2] No such file or directory" in captured.out
+    assert "Profile not saved: [Errno 2] No such file or directory" in captured.out
+    assert captured.out.endswith("Exiting...\n")
+
+
+def test_main_prices_are_exact(monkeypatch, capsys):
+    inputs = iter([
+        "unu is I",
+        "tri is III",
+        "unu unu unu Silver is 10 coins",
+        "how many coins is unu unu unu Silver ?",
+        "how many coins is unu Silver ?",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert "Adding new knowledge base 'Silver' with '10/3'" in captured.out
+    assert "unu unu unu Silver is 10 coins" in captured.out
+    assert "unu Silver is 10/3 coins" in captured.out
+
+
+def test_main_reverse_question(monkeypatch, capsys):
+    inputs = iter([
+        "glob is I",
+        "prok is V",
+        "how do you say 4 ?",
+        "how do you say 10 ?",
+        "how do you say 5000 ?",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert "4 is glob prok" in captured.out
+    assert "No foreign number is defined for the Roman numeral 'X'" in captured.out
+    assert "5000 cannot be written with Roman numerals (only 1 to 3999)" in captured.out
+
+
+def test_main_did_you_mean(monkeypatch, capsys):
+    inputs = iter([
+        "unu is I",
+        "unu Silver is 17 coins",
+        "how much is unu unj ?",
+        "how many coins is unu Silvr ?",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert "Unknown foreign number: unj Did you mean 'unu'?" in captured.out
+    assert "Unknown product 'Silvr'. Did you mean 'Silver'?" in captured.out
+
+
+def test_main_ask_loads_backup_lazily(monkeypatch, capsys, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    t = Translator(str(tmp_path / 'backup.pkl'))
+    t.restore_snapshot([{'Silver': 17}, {'unu': 'I', 'kvin': 'V'}])
+    t.save_data()
+
+    main(["--ask", "how many coins is unu kvin Silver ?", "--startup-profile"])
+    captured = capsys.readouterr()
+    assert captured.out == "unu kvin Silver is 68 coins\n"
+    assert "Startup profile:" in captured.err
+    assert "answer, including the backup load" in captured.err
+
+
+def test_parse_simple_arguments_matches_argparse():
+    for argv in ([], ["--ask", "how much is unu ?"], ["--journal", "--compact", "--ask", "help", "--startup-profile"]):
+        assert vars(parse_simple_arguments(argv)) == vars(parse_arguments(argv))
+    assert parse_simple_arguments(["--batch"]) is None
+    assert parse_simple_arguments(["--ask"]) is None
+
+
+def test_response_cache_answers_repeats_until_knowledge_changes(capsys):
+    translator = Translator(backup_path=None)
+    grammar = create_grammar(create_command_map())
+    cache = ResponseCache()
+    lines = [
+        "unu is I",
+        "unu Gold is 10 coins",
+        "how many coins is unu  Gold ?",
+        "how many coins is unu Gold ?",
+        "unu Gold is 20 coins",
+        "how many coins is unu Gold ?",
+        "help",
+        "help",
+    ]
+    for line in lines:
+        dispatch(line.split(), translator, grammar, cache)
+    out = capsys.readouterr().out
+    assert out.count("unu Gold is 10 coins") == 2
+    assert out.count("unu Gold is 20 coins") == 1
+    assert cache.entries.hits == 1
+    assert list(cache.entries._entries) == ["how many coins is unu Gold ?"]
+
+
+def test_main_exchange_rates(monkeypatch, capsys):
+    inputs = iter([
+        "unu is I",
+        "kvin is V",
+        "unu Silver is 17 coins",
+        "1 credit is 3 coins",
+        "1 Gold is 12 credits",
+        "how many coins is 4 credits ?",
+        "how many Gold is 9 coins ?",
+        "how many credits is unu kvin Silver ?",
+        "how many coins is unu kvin Silver ?",
+        "1 Gold is 30 coins",
+        "how many gems is unu Silver ?",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert "4 credits is 12 coins" in captured.out
+    assert "9 coins is 0.25 Gold" in captured.out
+    assert "unu kvin Silver is 68/3 credits" in captured.out
+    assert "unu kvin Silver is 68 coins" in captured.out
+    assert "Inconsistent exchange rate: 1 gold is already 36 coin" in captured.out
+    assert "No exchange rate from coin to gem" in captured.out
+
+
+def test_main_price_history(monkeypatch, capsys, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    inputs = iter([
+        "unu is I",
+        "kvin is V",
+        "unu Silver is 17 coins",
+        "unu Silver is 20 coins",
+        "how many coins was unu kvin Silver at 1 ?",
+        "how many coins was unu Silver at 5 ?",
+        "how many coins was unu Gold at 1 ?",
+        "how many coins is unu Silver ?",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main(["--price-history"])
+    captured = capsys.readouterr()
+    assert "unu kvin Silver was 68 coins at entry 1" in captured.out
+    assert "unu Silver was 20 coins at entry 5" in captured.out
+    assert "No price of 'Gold' at entry 1." in captured.out
+    assert "unu Silver is 20 coins" in captured.out
+
+
+def test_main_basket_question(monkeypatch, capsys):
+    inputs = iter([
+        "unu is I",
+        "kvin is V",
+        "dek is X",
+        "unu Silver is 17 coins",
+        "unu Gold is 100 coins",
+        "1 credit is 4 coins",
+        "how many coins is unu kvin Silver and dek Gold ?",
+        "how many credits is unu Silver and unu Gold ?",
+        "how many coins is unu Silver and unu Copper ?",
+        "how many coins is unu Silver and ?",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert "unu kvin Silver and dek Gold is 1068 coins" in captured.out
+    assert "unu Silver and unu Gold is 29.25 credits" in captured.out
+    assert "I have no idea what you are talking about" in captured.out
+
+
+def test_main_print_and_load_report_pages_and_counts(monkeypatch, capsys, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    inputs = iter([
+        "unu is I",
+        "unu Silver is 17 coins",
+        "unu Gold is 100 coins",
+        "unu Iron is 8 coins",
+        "save",
+        "load",
+        "print knowledge_base size 2",
+        "print knowledge_base prefix I",
+        "print knowledge_base page 0",
+        f"print foreign_numbers > {tmp_path / 'numbers.txt'}",
+        "exit"
+    ])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        main()
+    captured = capsys.readouterr()
+    assert "Loaded 3 product prices, 1 foreign numbers and 0 exchange rates" in captured.out
+    assert "Gold: 100\nIron: 8\nPage 1 of 2 (2 of 3 entries)" in captured.out
+    assert "Page 1 of 2 (2 of 3 entries)\nIron: 8\nUsage: print <knowledge_base>" in captured.out
+    assert f"Wrote 1 of 1 entries to {tmp_path / 'numbers.txt'}" in captured.out
+    assert (tmp_path / 'numbers.txt').read_text() == "unu: I\n"
+
+
+def test_cached_answer_does_not_capture_other_threads(capsys):
+    import threading
+
+    translator = Translator(backup_path=None)
+    translator.add_foreign_number("unu", "I")
+    grammar = create_grammar(create_command_map())
+    handle_question = grammar.handlers["foreign_question"]
+
+    def handle(parsed, translator):
+        # another thread (e.g. another server session) prints while the answer is captured
+        thread = threading.Thread(target=print, args=("other thread",))
+        thread.start()
+        thread.join()
+        handle_question(parsed, translator)
+
+    grammar.handlers["foreign_question"] = handle
+    cache = ResponseCache()
+    capsys.readouterr()
+    dispatch("how much is unu ?".split(), translator, grammar, cache)
+    assert cache.get("how much is unu ?", translator.generation) == "unu is 1\n"
+    assert capsys.readouterr().out == "other thread\nunu is 1\n"
+
+
+def test_import_of_malformed_csv_does_not_exit(monkeypatch, capsys, tmp_path):
+    path = tmp_path / "prices.csv"
+    # a field beyond the size limit of the csv module
+    path.write_text("product,Silver,17\nproduct,Gold," + "1" * 200000 + "\n")
+    inputs = iter([f"import {path}", "unu is I", "unu Sand is 0 coins", "how many coins is unu Sand ?", "exit"])
+    monkeypatch.setattr(builtins, "input", lambda _: next(inputs))
+    monkeypatch.setattr(Translator, "load_data", lambda self: None)
+    with pytest.raises(SystemExit):
+        main()
+    out = capsys.readouterr().out
+    assert "Import failed: field larger than field limit" in out
+    assert "unu Sand is 0 coins" in out
@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Solution1.MainSolution1 import run_batch, create_command_map, create_grammar
+from Solution1.Metrics import METRICS
+from Solution1.ParallelBatch import run_parallel_batch
+from Solution1.Translator import Translator
+
+LINES = [
+    "unu is I",
+    "kvin is V",
+    "dek is X",
+    "unu unu Silver is 34 coins",
+    "how much is dek unu unu ?",
+    "how many coins is unu kvin Silver ?",
+    "how many coins is dek Gold ?",
+    "how much is unu unu unu unu ?",
+    "dek Gold is 100 coins",
+    "how many coins is dek Gold ?",
+    "unu is X",
+    "how much is unu kvin ?",
+    "how much wood could a woodchuck chuck if a woodchuck could chuck wood ?",
+    "how many coins is unu kvin Silver ?",
+    "exit",
+    "how much is dek ?",
+]
+
+
+def run(runner, **kwargs):
+    out = io.StringIO()
+    processed = runner(io.StringIO("\n".join(LINES)), Translator(), create_grammar(create_command_map()), out,
+                       **kwargs)
+    return processed, out.getvalue()
+
+
+def test_parallel_batch_matches_sequential_batch():
+    assert run(run_parallel_batch, workers=2, chunk_size=1) == run(run_batch)
+
+
+def test_parallel_batch_with_large_chunks():
+    assert run(run_parallel_batch, workers=2, chunk_size=1000) == run(run_batch)
+
+
+def test_parallel_batch_takes_one_snapshot_per_segment(monkeypatch):
+    snapshots = []
+    get_snapshot = Translator.get_snapshot
+    monkeypatch.setattr(Translator, "get_snapshot", lambda self: snapshots.append(1) or get_snapshot(self))
+    lines = LINES[:4] + ["how many coins is unu kvin Silver ?"] * 20
+    out = io.StringIO()
+    run_parallel_batch(io.StringIO("\n".join(lines)), Translator(), create_grammar(create_command_map()), out,
+                       workers=2, chunk_size=1)
+    assert len(snapshots) == 1
+    assert out.getvalue().count("unu kvin Silver is 68 coins") == 20
+
+
+def test_parallel_batch_collects_the_same_metrics():
+    counts = []
+    METRICS.enabled = True
+    try:
+        for runner, kwargs in ((run_parallel_batch, {"workers": 2, "chunk_size": 1}), (run_batch, {})):
+            METRICS.reset()
+            run(runner, **kwargs)
+            counts.append(({name: (metrics.calls, metrics.errors) for name, metrics in METRICS.handlers.items()},
+                           METRICS.rejected))
+    finally:
+        METRICS.enabled = False
+        METRICS.reset()
+    assert counts[0] == counts[1]
+    assert counts[0][0]["foreign_question"][0] == 3 and counts[0][1] == 1
@@ -0,0 +1,96 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import pytest
+
+from Solution1.PriceHistory import PriceHistory
+from Solution1.Pricing import Price
+from Solution1.Translator import Translator
+from Solution1.TranslatorExceptions import ProductException
+
+
+def test_price_history_as_of_queries_in_memory():
+    history = PriceHistory()
+    assert history.record("Silver", Price(17)) == 1
+    history.record("Gold", Price(100))
+    history.record("Silver", Price(20))
+    assert history.price_at("Silver", 1) == 17
+    assert history.price_at("Silver", 2) == 17
+    assert history.price_at("Silver", 3) == 20
+    assert history.price_at("Gold", 1000) == 100
+    with pytest.raises(KeyError):
+        history.price_at("Gold", 1)
+    assert history.versions("Silver") == [(1, Price(17)), (3, Price(20))]
+
+
+def test_price_history_compaction_keeps_old_versions_on_disk(tmp_path):
+    path = str(tmp_path / "history")
+    history = PriceHistory(path, memory_limit=4)
+    huge = Price(2 ** 70, 3)
+    tiny = Price(3, 2 ** 70)
+    for i in range(1, 11):
+        history.record("Silver", Price(i, 2))
+        history.record("Iron", huge if i == 5 else tiny if i == 3 else Price(i))
+    assert history._in_memory == 0 and not history.columns
+    history.record("Silver", Price(99))
+    assert history.price_at("Silver", 1) == Price(1, 2)
+    assert history.price_at("Silver", 8) == Price(4, 2)
+    assert history.price_at("Iron", 10) == huge
+    assert history.price_at("Iron", 6) == tiny
+    assert history.price_at("Iron", 8) == 4
+    assert history.price_at("Iron", 12) == 6
+    assert history.price_at("Silver", 21) == 99
+    assert [price for _, price in history.versions("Silver")][-2:] == [Price(5), Price(99)]
+
+    reopened = PriceHistory(path)
+    reopened.restore(12)
+    assert reopened.price_at("Silver", 11) == 3
+    assert reopened.price_at("Iron", 12) == 6
+    # blocks moved after version 12 are cut off
+    assert reopened.price_at("Silver", 30) == 3
+    assert reopened.version == 12
+
+
+def test_translator_price_history_survives_save_and_journal(tmp_path):
+    path = str(tmp_path / "backup.pkl")
+    translator = Translator(path, journal=True, price_history=True)
+    translator.add_knowledge_base("Silver", 17)
+    translator.add_knowledge_base("Silver", 20)
+    translator.save_data()
+    translator.bulk_load([("product", "Silver", "45/2"), ("product", "Gold", 100)])
+    translator.journal.close()
+
+    loaded = Translator(path, journal=True, price_history=True)
+    loaded.load_data()
+    assert loaded.get_product_price("Silver") == Price(45, 2)
+    assert loaded.get_product_price_at("Silver", 1) == 17
+    assert loaded.get_product_price_at("Silver", 2) == 20
+    assert loaded.get_product_price_at("Silver", 3) == Price(45, 2)
+    assert loaded.get_product_price_at("Gold", 4) == 100
+    with pytest.raises(KeyError):
+        loaded.get_product_price_at("Gold", 3)
+
+    with pytest.raises(ProductException):
+        Translator(backup_path=None).get_product_price_at("Silver", 1)
+
+
+def test_price_history_numbering_continues_without_load_and_after_reset(tmp_path):
+    path = str(tmp_path / "backup.pkl")
+    translator = Translator(path, price_history=True)
+    translator.add_knowledge_base("Silver", 17)
+    translator.add_knowledge_base("Silver", 20)
+    translator.save_data()
+
+    # the knowledge is never loaded, the versions still continue after the history file
+    unloaded = Translator(path, price_history=True)
+    unloaded.add_knowledge_base("Gold", 100)
+    assert unloaded.history.versions("Gold") == [(3, Price(100))]
+
+    unloaded.delete_backup()
+    assert unloaded.history.version == 3
+    assert PriceHistory(unloaded.history.path).version == 3
+    reset = Translator(path, price_history=True)
+    reset.load_data()
+    reset.add_knowledge_base("Iron", 5)
+    assert reset.history.versions("Iron") == [(4, Price(5))]
@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import pytest
+
+from Solution1.Pricing import Price
+
+
+def test_price_is_reduced_and_exact():
+    price = Price(10, 3)
+    assert price.times(3) == 10
+    assert price.times(3).format() == "10"
+    assert Price(34, 2) == Price(17) == 17
+    assert (Price(34, 2).numerator, Price(34, 2).denominator) == (17, 1)
+    assert hash(Price(17)) == hash(17)
+
+
+def test_price_format():
+    assert Price(391, 2).format() == "195.5"
+    assert Price(1, 8).format() == "0.125"
+    assert Price(-3, 4).format() == "-0.75"
+    assert Price(10, 3).format() == "10/3"
+
+
+def test_price_rounding_modes():
+    assert Price(10, 3).format("floor") == "3"
+    assert Price(10, 3).format("ceil") == "4"
+    assert Price(5, 2).format("half_up") == "3"
+    assert Price(5, 2).format("half_even") == "2"
+    assert Price(7, 2).format("half_even") == "4"
+    with pytest.raises(ValueError):
+        Price(5, 2).format("nearest")
+
+
+def test_price_from_value():
+    assert Price.from_value(195.5) == Price(391, 2)
+    assert Price.from_value(10 / 3) == Price(10, 3)
+    assert Price.from_value("3/2") == Price.from_value("1.5") == Price(3, 2)
+    with pytest.raises(ValueError):
+        Price.from_value("abc")
@@ -0,0 +1,153 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import json
+import socket
+
+import pytest
+
+from Solution1.ConcurrentTranslator import ConcurrentTranslator
+from Solution1.Pricing import Price
+from Solution1.Replication import ReplicationPrimary, ReplicationReplica, decode_event, encode_event
+from Solution1.Translator import Translator
+
+
+def free_address() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+def test_translator_emits_ordered_events(tmp_path, capsys):
+    translator = Translator(str(tmp_path / "backup.pkl"))
+    events = []
+    translator.subscribe(events.append)
+    translator.add_foreign_number("unu", "I")
+    translator.add_knowledge_base("Silver", 17)
+    translator.add_knowledge_base("Silver", 17)
+    translator.clear_knowledge_base()
+    translator.save_data()
+    translator.load_data()
+    translator.delete_backup()
+    assert [operation for _, operation, _ in events] == ["foreign_number", "knowledge_base", "clear_knowledge_base",
+                                                        "restore_snapshot", "reset"]
+    assert [seq for seq, _, _ in events] == sorted(seq for seq, _, _ in events)
+    assert events[-1][0] == translator.generation
+
+    copy = Translator(backup_path=None)
+    for event in events[:2]:
+        copy.apply_event(decode_event(json.loads(encode_event(event))))
+    assert copy.get_product_price("Silver") == 17
+
+
+def test_applying_events_keeps_own_files_and_history(tmp_path, capsys):
+    path = str(tmp_path / "replica.pkl")
+    replica = Translator(path, journal=True, price_history=True)
+    replica.apply_event((1, "knowledge_base", ("Silver", Price(17))))
+    replica.save_data()
+    replica.apply_event((2, "knowledge_base", ("Silver", Price(20))))
+    # sent again, e.g. after a snapshot which already contained it
+    replica.apply_event((2, "knowledge_base", ("Silver", Price(20))))
+    assert replica.history.versions("Silver") == [(1, Price(17)), (2, Price(20))]
+    replica.save_data()
+
+    replica.apply_event((3, "reset", ()))
+    assert os.path.exists(path)
+    replica.journal.close()
+    loaded = Translator(path, journal=True, price_history=True)
+    loaded.load_data()
+    assert loaded.get_product_price("Silver") == 20
+    assert loaded.get_product_price_at("Silver", 1) == 17
+    loaded.journal.close()
+
+
+def test_replica_follows_primary_and_catches_up(capsys):
+    address = free_address()
+    primary_translator = Translator(backup_path=None)
+    primary_translator.add_foreign_number("unu", "I")
+    primary = ReplicationPrimary(primary_translator, address, log_size=4)
+    primary.start()
+
+    replica_translator = ConcurrentTranslator()
+    replica = ReplicationReplica(replica_translator, address, retry_delay=0.01)
+    replica.start()
+    try:
+        primary_translator.add_knowledge_base("Silver", Price(17, 2))
+        primary_translator.add_exchange_rate(1, "credit", 3, "coins")
+        assert replica.wait_for(primary_translator.generation)
+        # the state before the replica connected arrived with the snapshot
+        assert replica_translator.evaluate_foreign_numbers(["unu"]) == 1
+        assert replica_translator.get_product_price("Silver") == Price(17, 2)
+        assert replica_translator.convert(1, "credit", "coins") == 3
+
+        # after a disconnect only the missed changes are sent
+        replica.stop()
+        primary_translator.add_knowledge_base("Gold", 100)
+        resumed = ReplicationReplica(replica_translator, address, retry_delay=0.01)
+        resumed.epoch, resumed.seq = replica.epoch, replica.seq
+        replica = resumed
+        replica.start()
+        assert replica.wait_for(primary_translator.generation)
+        assert replica.applied == 1
+        assert replica_translator.get_product_price("Gold") == 100
+
+        # a replica behind the event log gets a snapshot
+        late = ReplicationReplica(Translator(backup_path=None), address, retry_delay=0.01)
+        late.epoch, late.seq = primary.epoch, 1
+        for i in range(10):
+            primary_translator.add_knowledge_base(f"Product{i}", i + 1)
+        late.start()
+        assert late.wait_for(primary_translator.generation)
+        assert late.applied == 0
+        assert late.translator.get_knowledge_base() == primary_translator.get_knowledge_base()
+        late.stop()
+    finally:
+        replica.stop()
+        primary.close()
+
+
+def test_replica_catches_up_in_few_batches(capsys):
+    address = free_address()
+    primary_translator = Translator(backup_path=None)
+    primary = ReplicationPrimary(primary_translator, address, log_size=10000)
+    primary.start()
+    replica_translator = ConcurrentTranslator()
+    publish = replica_translator._publish
+    publishes = []
+    replica_translator._publish = lambda: publishes.append(1) or publish()
+    replica = ReplicationReplica(replica_translator, address, retry_delay=0.01)
+    replica.epoch, replica.seq = primary.epoch, primary_translator.generation
+    for i in range(5000):
+        primary_translator.add_knowledge_base(f"Product{i}", i + 1)
+    replica.start()
+    try:
+        assert replica.wait_for(primary_translator.generation)
+        assert replica.applied == 5000
+        # a snapshot is published per received block of events, not per event
+        assert len(publishes) < 500
+        assert dict(replica_translator.get_knowledge_base()) == primary_translator.get_knowledge_base()
+    finally:
+        replica.stop()
+        primary.close()
+
+
+@pytest.mark.parametrize("operation", ["clear_knowledge_base", "clear_foreign_numbers", "clear_exchange_rates"])
+def test_replica_applies_clear(operation, capsys):
+    address = free_address()
+    primary_translator = Translator(backup_path=None)
+    primary = ReplicationPrimary(primary_translator, address)
+    primary.start()
+    replica = ReplicationReplica(Translator(backup_path=None), address, retry_delay=0.01)
+    replica.start()
+    try:
+        assert replica.connected.wait(5)
+        primary_translator.add_foreign_number("unu", "I")
+        primary_translator.add_knowledge_base("Silver", 17)
+        primary_translator.add_exchange_rate(1, "credit", 3, "coins")
+        getattr(primary_translator, operation)()
+        assert replica.wait_for(primary_translator.generation)
+        assert replica.translator.get_snapshot() == primary_translator.get_snapshot()
+    finally:
+        replica.stop()
+        primary.close()
@@ -0,0 +1,65 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import pytest
+
+from Solution1.Pricing import Price
+from Solution1.SharedSnapshot import SharedSnapshot
+from Solution1.Translator import Translator
+from Solution1.TranslatorExceptions import ForeignNumberException
+
+
+def test_shared_snapshot_lookups(tmp_path):
+    path = str(tmp_path / "knowledge.snapshot")
+    translator = Translator(backup_path=None)
+    huge = Price(2 ** 70, 3)
+    # only the denominator is beyond int64, the products after it still get their own prices
+    tiny = Price(3, 2 ** 70)
+    translator.restore_snapshot([{"Silver": Price(17, 2), "Gold": 14450, "Ĳzer": huge, "Iron": Price(391, 20),
+                                  "Tin": tiny, "Zinc": Price(5, 7)}, {"glob": "I", "prok": "V"}])
+    translator.export_snapshot(path)
+
+    snapshot = SharedSnapshot(path)
+    assert len(snapshot) == 6
+    assert snapshot.generation == translator.generation
+    assert snapshot.get_product_price("Silver") == Price(17, 2)
+    assert snapshot.get_product_price("Iron") == Price(391, 20)
+    assert snapshot.get_product_price("Ĳzer") == huge
+    assert snapshot.get_product_price("Tin") == tiny
+    assert snapshot.get_product_price("Zinc") == Price(5, 7)
+    assert "Gold" in snapshot and "Copper" not in snapshot
+    assert snapshot.product_id("Gold") == 0
+    with pytest.raises(KeyError):
+        snapshot.get_product_price("Copper")
+    assert snapshot.evaluate_foreign_numbers(["glob", "prok"]) == 4
+    assert snapshot.int_to_foreign(6) == "prok glob"
+    with pytest.raises(ForeignNumberException):
+        snapshot.evaluate_foreign_numbers(["pish"])
+
+
+def test_shared_snapshot_refresh_switches_to_new_snapshot(tmp_path):
+    path = str(tmp_path / "knowledge.snapshot")
+    translator = Translator(backup_path=None)
+    translator.restore_snapshot([{f"product{i}": i + 1 for i in range(1000)}, {"glob": "I"}])
+    translator.export_snapshot(path)
+    snapshot = SharedSnapshot(path)
+    assert not snapshot.refresh()
+    assert all(snapshot.get_product_price(f"product{i}") == i + 1 for i in range(0, 1000, 7))
+
+    translator.restore_snapshot([{"Silver": 17}, {"glob": "I"}])
+    translator.export_snapshot(path)
+    # attached readers keep the old snapshot until they refresh
+    assert snapshot.get_product_price("product5") == 6
+    assert snapshot.refresh()
+    assert len(snapshot) == 1
+    assert snapshot.get_product_price("Silver") == 17
+    assert snapshot.generation == translator.generation
+
+
+def test_empty_shared_snapshot(tmp_path):
+    path = str(tmp_path / "knowledge.snapshot")
+    Translator(backup_path=None).export_snapshot(path)
+    snapshot = SharedSnapshot(path)
+    assert len(snapshot) == 0
+    assert "Silver" not in snapshot
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Solution1.Suggestions import SuggestionIndex, edit_distance
+
+
+def test_edit_distance():
+    assert edit_distance('silver', 'silver', 2) == 0
+    assert edit_distance('silver', 'silevr', 2) == 1
+    assert edit_distance('silver', 'slvr', 2) == 2
+    assert edit_distance('silver', 'gold', 2) == 3
+
+
+def test_suggest_one_and_two_edits():
+    index = SuggestionIndex(['Silver', 'Gold', 'Iron'])
+    assert index.suggest('silver') == 'Silver'
+    assert index.suggest('Slver') == 'Silver'
+    assert index.suggest('Glod') == 'Gold'
+    assert index.suggest('Irn') == 'Iron'
+    assert index.suggest('Platinum') is None
+
+    index.add('Goldy')
+    assert index.suggest('Goldyy') == 'Goldy'
+
+
+def test_large_index_only_suggests_one_edit():
+    index = SuggestionIndex([f'Product{number}' for number in range(5000)], scan_limit=1000)
+    assert index.suggest('Prodcut42') == 'Product42'
+    assert index.suggest('Prdcut42') is None
@@ -1,11 +1,15 @@
 import os
 import sys
 
-from Solution1.TranslatorExceptions import ForeignNumberException
+from Solution1.TranslatorExceptions import ForeignNumberException, RomanNumeralException
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 import pytest
 
+from Solution1.BulkImport import import_file
+from Solution1.CompactStorage import CompactKnowledgeBase
+from Solution1.Journal import Journal
+from Solution1.Pricing import Price
 from Solution1.Translator import Translator
 
 
@@ -72,3 +76,312 @@ def test_save_data_invalid_path(tmp_path):
     t = Translator(invalid_path)
     with pytest.raises(FileNotFoundError):
         t.save_data()
+
+
+def test_calc_foreign_numbers_cache_hits_and_invalidation():
+    t = Translator()
+    t.add_foreign_number('unu', 'I')
+    t.add_foreign_number('du', 'V')
+    assert t.calc_foreign_numbers(['unu', 'du']) == 4
+    assert t.calc_foreign_numbers(['unu', 'du']) == 4
+    assert t.numeral_cache.stats()['hits'] == 1
+    assert t.numeral_cache.stats()['misses'] == 1
+
+    t.add_foreign_number('du', 'X')
+    assert t.calc_foreign_numbers(['unu', 'du']) == 9
+    t.clear_foreign_numbers()
+    with pytest.raises(KeyError):
+        t.calc_foreign_numbers(['unu', 'du'])
+
+
+def test_calc_foreign_numbers_cache_is_bounded():
+    t = Translator(cache_size=2)
+    t.add_foreign_number('unu', 'I')
+    for length in range(1, 5):
+        t.calc_foreign_numbers(['unu'] * length)
+    assert t.numeral_cache.stats()['size'] == 2
+    assert t.numeral_cache.stats()['evictions'] == 2
+
+
+def test_evaluate_foreign_numbers_valid_and_invalid():
+    t = Translator()
+    for foreign, roman in [('unu', 'I'), ('kvin', 'V'), ('dek', 'X'), ('kvindek', 'L'), ('cent', 'C'), ('mil', 'M')]:
+        t.add_foreign_number(foreign, roman)
+    assert t.evaluate_foreign_numbers(['dek', 'kvindek', 'unu', 'unu']) == 42
+    assert t.evaluate_foreign_numbers(['mil', 'cent', 'mil', 'dek', 'kvindek', 'unu', 'kvin']) == 1944
+    with pytest.raises(RomanNumeralException):
+        t.evaluate_foreign_numbers(['dek', 'dek', 'dek', 'dek'])
+    with pytest.raises(RomanNumeralException):
+        t.evaluate_foreign_numbers(['unu', 'cent'])
+    with pytest.raises(RomanNumeralException):
+        t.evaluate_foreign_numbers([])
+
+
+def test_evaluate_foreign_numbers_stops_at_first_invalid_token():
+    t = Translator()
+    t.add_foreign_number('kvin', 'V')
+    with pytest.raises(RomanNumeralException):
+        t.evaluate_foreign_numbers(['kvin', 'kvin', 'foo'])
+    with pytest.raises(ForeignNumberException, match="foo"):
+        t.evaluate_foreign_numbers(['foo', 'kvin', 'kvin'])
+
+
+def test_calc_batch_matches_calc_foreign_numbers():
+    np = pytest.importorskip("numpy")
+    t = Translator()
+    for foreign, roman in [('unu', 'I'), ('kvin', 'V'), ('dek', 'X'), ('kvindek', 'L')]:
+        t.add_foreign_number(foreign, roman)
+    phrases = [['dek', 'kvindek', 'unu', 'unu'], 'unu kvin dek', ['unu', 'foo'], [], ['dek'] * 4, ['unu', 'dek']]
+    values, invalid = t.calc_batch(phrases)
+    assert values.dtype == np.int64
+    assert invalid.tolist() == [False, False, True, False, False, False]
+    for phrase, value, is_invalid in zip(phrases, values, invalid):
+        if not is_invalid:
+            tokens = phrase.split() if isinstance(phrase, str) else phrase
+            assert value == t.calc_foreign_numbers(tokens)
+
+    _, invalid = t.calc_batch(phrases, validate=True)
+    assert invalid.tolist() == [False, True, True, True, True, False]
+
+
+def test_journal_replays_unsaved_changes(tmp_path):
+    path = str(tmp_path / "backup.pkl")
+    t = Translator(path, journal=True)
+    t.add_foreign_number('unu', 'I')
+    t.save_data()
+    t.add_knowledge_base('Silver', 10)
+    t.add_foreign_number('du', 'V')
+    t.journal.close()  # crash without saving
+
+    t2 = Translator(path, journal=True)
+    t2.load_data()
+    assert t2.get_foreign_numbers() == {'unu': 'I', 'du': 'V'}
+    assert t2.get_knowledge_base() == {'Silver': 10}
+    assert t2.calc_foreign_numbers(['unu', 'du']) == 4
+
+
+def test_journal_compaction_and_torn_record(tmp_path):
+    path = str(tmp_path / "backup.pkl")
+    t = Translator(path, journal=True, compact_every=3)
+    for index in range(5):
+        t.add_knowledge_base(f'Product{index}', index)
+    assert t.journal.records == 2
+    t.journal.close()
+    with open(path + ".journal", "ab") as f:
+        f.write(b"\x80\x05\x95")
+
+    t2 = Translator(path, journal=True)
+    t2.load_data()
+    assert t2.get_knowledge_base() == {f'Product{index}': index for index in range(5)}
+    t2.add_knowledge_base('Gold', 7)
+    t2.journal.close()
+
+    t3 = Translator(path, journal=True)
+    t3.load_data()
+    assert t3.get_knowledge_base()['Gold'] == 7
+
+
+def test_bulk_load_summary(capsys):
+    t = Translator()
+    t.add_knowledge_base('Gold', 5.0)
+    capsys.readouterr()
+    summary = t.bulk_load([
+        ('foreign_number', 'unu', 'I'),
+        ('foreign_number', 'du', 'Q'),
+        ('product', 'Silver', '17'),
+        ('product', 'Silver', 17),
+        ('product', 'Gold', 6),
+        ('product', 'Iron', -1),
+        ('metal', 'Tin', 1),
+        # free products are allowed like in a definition
+        ('product', 'Sand', 0),
+    ], batch_size=2)
+    assert summary.counts == {"added": 3, "overwritten": 1, "duplicate": 1, "rejected": 3}
+    assert capsys.readouterr().out == ""
+    assert t.get_knowledge_base() == {'Gold': 6.0, 'Silver': 17.0, 'Sand': 0}
+    with pytest.raises(ValueError):
+        t.add_knowledge_base('Iron', -1)
+    assert t.evaluate_foreign_numbers(['unu']) == 1
+
+
+def test_import_file_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "prices.csv"
+    csv_path.write_text("type,name,value\nforeign_number,unu,I\nproduct,Silver,17\nbroken\n")
+    jsonl_path = tmp_path / "prices.jsonl"
+    jsonl_path.write_text('{"type": "product", "name": "Gold", "value": 3}\nnot json\n')
+    t = Translator()
+    assert import_file(t, str(csv_path)).counts == {"added": 2, "overwritten": 0, "duplicate": 0, "rejected": 1}
+    assert import_file(t, str(jsonl_path)).counts == {"added": 1, "overwritten": 0, "duplicate": 0, "rejected": 1}
+    assert t.get_knowledge_base() == {'Silver': 17.0, 'Gold': 3.0}
+
+
+def test_int_to_foreign_round_trip_and_missing_symbol():
+    t = Translator()
+    for token, roman in [('unu', 'I'), ('kvin', 'V'), ('dek', 'X'), ('kvindek', 'L'), ('cent', 'C'),
+                         ('kvincent', 'D'), ('mil', 'M'), ('alia', 'I')]:
+        t.add_foreign_number(token, roman)
+    assert t.int_to_foreign(1944) == 'mil cent mil dek kvindek unu kvin'
+    for number in range(1, 4000):
+        assert t.evaluate_foreign_numbers(t.int_to_foreign(number).split()) == number
+    with pytest.raises(RomanNumeralException):
+        t.int_to_foreign(4000)
+
+    t.clear_foreign_numbers()
+    t.add_foreign_number('unu', 'I')
+    assert t.int_to_foreign(3) == 'unu unu unu'
+    with pytest.raises(ForeignNumberException):
+        t.int_to_foreign(4)
+
+
+def test_compact_knowledge_base_behaves_like_dict(tmp_path):
+    t = Translator(str(tmp_path / 'backup.pkl'), compact=True)
+    assert not hasattr(t, '__dict__')
+    t.add_knowledge_base('Silver', 17)
+    t.add_knowledge_base('Gold', '10/3')
+    t.add_knowledge_base('Iron', 2 ** 70)
+    t.add_knowledge_base('Silver', 18)
+    assert t.get_product_price('Silver') == 18
+    assert t.get_product_price('Iron') == 2 ** 70
+    assert t.get_knowledge_base() == {'Silver': 18, 'Gold': Price(10, 3), 'Iron': 2 ** 70}
+    assert repr(t.get_knowledge_base()) == "{'Silver': 18, 'Gold': 10/3, 'Iron': %d}" % 2 ** 70
+    with pytest.raises(KeyError):
+        t.get_product_price('Copper')
+
+    t.save_data()
+    t2 = Translator(str(tmp_path / 'backup.pkl'), compact=True)
+    t2.load_data()
+    assert list(t2.get_knowledge_base().items()) == list(t.get_knowledge_base().items())
+
+
+def test_compact_knowledge_base_deletes_and_grows():
+    compact = CompactKnowledgeBase()
+    expected = {}
+    for index in range(1000):
+        compact[f'P{index % 300}'] = index + 1
+        expected[f'P{index % 300}'] = index + 1
+        if index % 3 == 0:
+            del compact[f'P{index % 7}']
+            del expected[f'P{index % 7}']
+            compact[f'P{index % 7}'] = 1
+            expected[f'P{index % 7}'] = 1
+    assert list(compact.items()) == list(expected.items())
+    assert len(compact) == len(expected)
+
+
+def test_suggestions_follow_changes():
+    t = Translator()
+    t.add_foreign_number('kvindek', 'L')
+    t.add_knowledge_base('Silver', 17)
+    assert t.suggest_foreign_number('kvindel') == 'kvindek'
+    assert t.suggest_product('Silvre') == 'Silver'
+
+    t.add_knowledge_base('Gold', 5)
+    t.bulk_load([('product', 'Copper', 3)])
+    assert t.suggest_product('Gol') == 'Gold'
+    assert t.suggest_product('Coper') == 'Copper'
+
+    t.clear_knowledge_base()
+    assert t.suggest_product('Silvre') is None
+
+
+def test_load_lazily_defers_backup_and_reuses_tables(tmp_path):
+    t = Translator(str(tmp_path / 'backup.pkl'))
+    t.add_foreign_number('unu', 'I')
+    t.add_foreign_number('kvin', 'V')
+    t.add_knowledge_base('Silver', 17)
+    assert t.int_to_foreign(4) == 'unu kvin'
+    t.save_data()
+
+    t2 = Translator(str(tmp_path / 'backup.pkl'))
+    t2.load_lazily()
+    assert t2._pending_load
+    assert t2.get_product_price('Silver') == 17
+    assert not t2._pending_load
+    # the encoding index was stored with the backup and is not built again
+    assert t2.get_numeral_table()._encoding_index is not None
+    assert t2.int_to_foreign(6) == 'kvin unu'
+
+    t3 = Translator(str(tmp_path / 'backup.pkl'))
+    t3.load_lazily()
+    t3.clear_knowledge_base()
+    assert t3.get_foreign_numbers() == {'unu': 'I', 'kvin': 'V'}
+    assert t3.get_knowledge_base() == {}
+
+    # reset deletes the backup, but keeps the runtime knowledge, which was not loaded yet
+    t4 = Translator(str(tmp_path / 'backup.pkl'))
+    t4.load_lazily()
+    t4.delete_backup()
+    assert not os.path.exists(tmp_path / 'backup.pkl')
+    assert t4.get_product_price('Silver') == 17
+
+
+def test_translator_imports_optional_modules_on_first_use():
+    import subprocess
+
+    code = ("import sys; from Solution1.Translator import Translator; Translator(backup_path=None); "
+            "print(sorted(name for name in sys.modules if name.startswith('Solution1.')))")
+    modules = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                             env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}).stdout
+    for module in ("Baskets", "BulkImport", "CompactStorage", "Currencies", "Journal", "Numerals", "PriceHistory",
+                   "Suggestions"):
+        assert f"Solution1.{module}'" not in modules
+
+
+def test_journal_records_survive_a_crash_of_the_process(tmp_path):
+    import subprocess
+
+    path = str(tmp_path / "backup.pkl")
+    code = (f"import os; from Solution1.Translator import Translator; t = Translator({path!r}, journal=True); "
+            "t.add_foreign_number('unu', 'I'); t.add_knowledge_base('Silver', 17); os._exit(1)")
+    subprocess.run([sys.executable, "-c", code], capture_output=True,
+                   env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)})
+    loaded = Translator(path, journal=True)
+    loaded.load_data()
+    assert loaded.get_product_price("Silver") == 17
+    assert loaded.evaluate_foreign_numbers(["unu"]) == 1
+    loaded.journal.close()
+
+
+def test_generation_counts_every_change(tmp_path):
+    t = Translator(str(tmp_path / 'backup.pkl'))
+    generations = [t.generation]
+    t.add_foreign_number('unu', 'I')
+    generations.append(t.generation)
+    t.add_foreign_number('unu', 'I')  # unchanged
+    assert t.generation == generations[-1]
+    t.add_knowledge_base('Silver', 17)
+    t.bulk_load([('product', 'Gold', 5)])
+    t.save_data()
+    t.load_data()
+    t.clear_knowledge_base()
+    t.clear_foreign_numbers()
+    t.delete_backup()
+    assert t.generation == generations[-1] + 6
+
+
+def test_journal_is_not_kept_alive_until_exit(tmp_path):
+    import gc
+    import weakref
+
+    journal = Journal(str(tmp_path / "backup.pkl.journal"))
+    journal.append(("foreign_number", "unu", "I"))
+    reference = weakref.ref(journal)
+    del journal
+    gc.collect()
+    assert reference() is None
+    assert list(Journal(str(tmp_path / "backup.pkl.journal")).replay()) == [("foreign_number", "unu", "I")]
+
+
+def test_bulk_load_journal_compaction_saves_current_numeral_tables(tmp_path, capsys):
+    path = str(tmp_path / "backup.pkl")
+    translator = Translator(path, journal=True, compact_every=3)
+    translator.add_foreign_number("unu", "I")
+    assert translator.evaluate_foreign_numbers(["unu"]) == 1
+    # the third record (dek) compacts the journal, i.e. saves the numeral tables, within the bulk load
+    translator.bulk_load([("foreign_number", "kvin", "V"), ("foreign_number", "dek", "X")])
+    translator.journal.close()
+
+    loaded = Translator(path, journal=True)
+    loaded.load_data()
+    assert loaded.evaluate_foreign_numbers(["kvin"]) == 5
+    assert loaded.evaluate_foreign_numbers(["dek", "unu"]) == 11
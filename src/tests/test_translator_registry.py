@@ -0,0 +1,68 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import pytest
+
+from Solution1.Translator import Translator
+from Solution1.TranslatorExceptions import MemoryBudgetException
+from Solution1.TranslatorRegistry import TranslatorRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def write_backup(path, knowledge_base, foreign_numbers):
+    t = Translator(str(path))
+    t.restore_snapshot([knowledge_base, foreign_numbers])
+    t.save_data()
+
+
+def test_tenants_share_vocabulary_until_one_changes(tmp_path):
+    vocabulary = {'unu': 'I', 'kvin': 'V'}
+    write_backup(tmp_path / 'north.pkl', {'Silver': 17}, vocabulary)
+    write_backup(tmp_path / 'south.pkl', {'Gold': 100}, vocabulary)
+    registry = TranslatorRegistry(str(tmp_path))
+
+    north, south = registry.get('north'), registry.get('south')
+    assert north.foreign_numbers is south.foreign_numbers
+    assert north.get_numeral_table() is south.get_numeral_table()
+    assert registry.stats()['vocabularies'] == 1
+
+    south.add_foreign_number('dek', 'X')
+    assert 'dek' not in north.foreign_numbers
+    assert north.evaluate_foreign_numbers(['unu', 'kvin']) == 4
+    assert south.evaluate_foreign_numbers(['dek', 'unu']) == 11
+    assert registry.stats()['vocabularies'] == 1
+
+
+def test_idle_tenants_are_saved_and_reloaded(tmp_path):
+    clock = FakeClock()
+    registry = TranslatorRegistry(str(tmp_path), idle_timeout=10, clock=clock)
+    registry.get('north').add_knowledge_base('Silver', 17)
+
+    clock.now = 20
+    registry.get('south')
+    assert 'north' not in registry.tenants
+    assert registry.get('north').get_product_price('Silver') == 17
+
+    with pytest.raises(ValueError):
+        registry.get('../north')
+
+
+def test_memory_budget_refuses_new_entries(tmp_path):
+    registry = TranslatorRegistry(str(tmp_path), memory_budget=1000)
+    tenant = registry.get('north')
+    with pytest.raises(MemoryBudgetException):
+        for index in range(100):
+            tenant.add_knowledge_base(f'Product{index}', index + 1)
+    assert 0 < len(tenant.knowledge_base) < 100
+    assert tenant.estimated_bytes <= 1000
+
+    summary = tenant.bulk_load([('product', 'Extra', 5)])
+    assert summary.counts['rejected'] == 1
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Solution1.Translator import Translator
+from Solution1.TranslatorServer import TranslatorServer
+
+
+async def talk(port, lines):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    # all lines are pipelined before the first answer is read
+    writer.write("".join(line + "\n" for line in lines).encode())
+    await writer.drain()
+    answer = await reader.read()
+    writer.close()
+    return answer.decode()
+
+
+async def run_clients():
+    server = TranslatorServer(Translator())
+    listener = await server.start("127.0.0.1:0")
+    port = listener.sockets[0].getsockname()[1]
+    first = await talk(port, ["unu is I", "kvin is V", "unu Silver is 17 coins", "exit"])
+    answers = await asyncio.gather(*[
+        talk(port, ["how much is unu kvin ?", "how many coins is unu kvin Silver ?", "exit", "how much is unu ?"])
+        for _ in range(20)
+    ])
+    listener.close()
+    await listener.wait_closed()
+    return first, answers, server.sessions
+
+
+def test_server_shares_translator_between_pipelining_clients():
+    first, answers, sessions = asyncio.run(run_clients())
+    assert "Adding new knowledge base 'Silver'" in first
+    assert first.endswith("Exiting...\n")
+    for answer in answers:
+        assert answer == "unu kvin is 4\nunu kvin Silver is 68 coins\nExiting...\n"
+    assert sessions == {}
+
+
+async def run_restricted_client(backup_path):
+    server = TranslatorServer(Translator(backup_path=backup_path))
+    listener = await server.start("127.0.0.1:0")
+    port = listener.sockets[0].getsockname()[1]
+    answer = await talk(port, ["unu is I", "unu Silver is 17 coins", "save", "reset", "print knowledge_base",
+                               "stats export /tmp/stats.txt", "how many coins is unu Silver ?", "exit"])
+    listener.close()
+    await listener.wait_closed()
+    return answer
+
+
+def test_server_refuses_file_and_reset_commands(tmp_path):
+    backup_path = str(tmp_path / "backup.pkl")
+    answer = asyncio.run(run_restricted_client(backup_path))
+    assert "Saving current knowledge to file...\n" in answer
+    assert "The command 'reset' is not available on the server\n" in answer
+    assert "The command 'print' is not available on the server\n" in answer
+    assert "The command 'stats' is not available on the server\n" in answer
+    assert answer.endswith("unu Silver is 17 coins\nExiting...\n")
+    assert os.path.exists(backup_path)